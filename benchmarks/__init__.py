@@ -0,0 +1 @@
+"""Benchmarks for pipeline construction, planning and execution."""
@@ -0,0 +1,229 @@
+"""Time pipeline construction, planning and execution and write the results as JSON.
+
+Run with `python -m benchmarks --help` for options.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+from collections.abc import Callable
+from contextlib import suppress
+from importlib import metadata
+from pathlib import Path
+from time import perf_counter
+from typing import TypedDict
+
+from benchmarks.shapes import PAYLOAD_SIZES, SHAPES, make_payload
+from timothy import (
+    DAGPipelineStageRunner,
+    MemoryPipelineStorage,
+    SQLitePipelineStorage,
+    StreamingDAGPipelineStageRunner,
+    ThreadedDAGPipelineStageRunner,
+    WriteBehindPipelineStorage,
+)
+from timothy._pipelinestorage_impl import JSONFilePipelineStorage
+from timothy.core import Pipeline, PipelineStageRunner, PipelineStageSet, PipelineStorage
+
+STORAGES = ["memory", "json", "json-write-behind", "sqlite"]
+PAYLOADS = sorted(PAYLOAD_SIZES)
+ENTRY_POINTS = {"runner": "execute", "pipeline": "pipeline_run"}
+RUNNERS: dict[str, Callable[[], PipelineStageRunner]] = {
+    "dag": DAGPipelineStageRunner,
+    "threaded": ThreadedDAGPipelineStageRunner,
+    "streaming": StreamingDAGPipelineStageRunner,
+}
+
+
+class BenchmarkResult(TypedDict):
+    """One timed measurement."""
+
+    shape: str
+    n_stages: int
+    phase: str
+    storage: str | None
+    runner: str | None
+    payload: str | None
+    seconds: float
+
+
+def _best_of(
+    repeat: int,
+    func: Callable[[], object],
+    setup: Callable[[], None] | None = None,
+) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started_at = perf_counter()
+        func()
+        best = min(best, perf_counter() - started_at)
+    return best
+
+
+def _register_all(shape: str, n_stages: int) -> None:
+    pipeline = Pipeline("benchmark")
+    for stage in SHAPES[shape](n_stages, None):
+        pipeline.register(stage.returns, name=stage.name, params=stage.params)(stage.func)
+
+
+def time_construction(shape: str, n_stages: int, repeat: int) -> list[BenchmarkResult]:
+    """Time building a stage set directly and by registering each stage on a pipeline."""
+    stages = SHAPES[shape](n_stages, None)
+    timed_phases = {
+        "stage_set": lambda: PipelineStageSet(*stages),
+        "register": lambda: _register_all(shape, n_stages),
+    }
+    return [
+        BenchmarkResult(
+            shape=shape,
+            n_stages=n_stages,
+            phase=phase,
+            storage=None,
+            runner=None,
+            payload=None,
+            seconds=_best_of(repeat, func),
+        )
+        for phase, func in timed_phases.items()
+    ]
+
+
+def time_planning(shape: str, n_stages: int, repeat: int) -> list[BenchmarkResult]:
+    """Time compiling the execution plan of a fresh stage set."""
+    stages = SHAPES[shape](n_stages, None)
+    return [
+        BenchmarkResult(
+            shape=shape,
+            n_stages=n_stages,
+            phase="plan",
+            storage=None,
+            runner=None,
+            payload=None,
+            seconds=_best_of(repeat, lambda: PipelineStageSet(*stages).plan),
+        ),
+    ]
+
+
+def time_execution(  # noqa: PLR0913
+    shape: str,
+    n_stages: int,
+    storage_name: str,
+    runner_name: str,
+    payload_size: str,
+    repeat: int,
+    entry_point: str = "runner",
+) -> BenchmarkResult:
+    """Time running a planned stage set with the given storage, runner and payload size.
+
+    The "runner" entry point calls the stage runner directly; "pipeline" goes through
+    `Pipeline.run`, which also attaches the run report collector.
+    """
+    stage_set = PipelineStageSet(*SHAPES[shape](n_stages, make_payload(payload_size)))
+    stage_set.plan  # noqa: B018
+    runner = RUNNERS[runner_name]()
+    pipeline = Pipeline("benchmark", stages=stage_set)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage: PipelineStorage = MemoryPipelineStorage()
+
+        def setup() -> None:
+            nonlocal storage
+            if storage_name == "json":
+                storage = JSONFilePipelineStorage(Path(tempfile.mkdtemp(dir=tmp_dir)))
+            elif storage_name == "json-write-behind":
+                location = Path(tempfile.mkdtemp(dir=tmp_dir))
+                storage = WriteBehindPipelineStorage(JSONFilePipelineStorage(location))
+            elif storage_name == "sqlite":
+                storage = SQLitePipelineStorage(Path(tempfile.mkdtemp(dir=tmp_dir)) / "db.sqlite")
+            else:
+                storage = MemoryPipelineStorage()
+            storage.store_one("input", make_payload(payload_size))
+
+        def execute() -> None:
+            if entry_point == "pipeline":
+                pipeline.bind(storage=storage, stagerunner=runner).run()
+            else:
+                runner(stage_set, storage)
+
+        seconds = _best_of(repeat, execute, setup=setup)
+
+    return BenchmarkResult(
+        shape=shape,
+        n_stages=n_stages,
+        phase=ENTRY_POINTS[entry_point],
+        storage=storage_name,
+        runner=runner_name,
+        payload=payload_size,
+        seconds=seconds,
+    )
+
+
+def _get_args_from_cli() -> argparse.Namespace:
+    parser = argparse.ArgumentParser("python -m benchmarks", description=__doc__)
+    parser.add_argument("--shapes", nargs="+", choices=sorted(SHAPES), default=sorted(SHAPES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 1_000, 10_000])
+    parser.add_argument("--storages", nargs="+", choices=STORAGES, default=STORAGES)
+    parser.add_argument("--runners", nargs="+", choices=sorted(RUNNERS), default=["dag"])
+    parser.add_argument("--payloads", nargs="+", choices=PAYLOADS, default=PAYLOADS)
+    parser.add_argument(
+        "--entry-points",
+        nargs="+",
+        choices=sorted(ENTRY_POINTS),
+        default=sorted(ENTRY_POINTS),
+    )
+    parser.add_argument("--max-file-stages", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=None)
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run the selected benchmarks and write the results as JSON."""
+    args = _get_args_from_cli()
+    results: list[BenchmarkResult] = []
+    for shape in args.shapes:
+        for n_stages in args.sizes:
+            results.extend(time_construction(shape, n_stages, args.repeat))
+            results.extend(time_planning(shape, n_stages, args.repeat))
+            for storage_name in args.storages:
+                if storage_name != "memory" and n_stages > args.max_file_stages:
+                    continue
+                results.extend(
+                    time_execution(
+                        shape,
+                        n_stages,
+                        storage_name,
+                        runner_name,
+                        payload_size,
+                        args.repeat,
+                        entry_point,
+                    )
+                    for runner_name in args.runners
+                    for payload_size in args.payloads
+                    for entry_point in args.entry_points
+                )
+
+    timothy_version = None
+    with suppress(metadata.PackageNotFoundError):
+        timothy_version = metadata.version("timothy")
+
+    output = {
+        "timothy_version": timothy_version,
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output is None:
+        json.dump(output, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with args.output.open("w") as f:
+            json.dump(output, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
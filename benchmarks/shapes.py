@@ -0,0 +1,77 @@
+"""Synthetic pipeline shapes for benchmarking."""
+
+import random
+from collections.abc import Callable, Sequence
+from inspect import Parameter, Signature
+
+from timothy.core import Obj, PipelineStage
+
+PAYLOAD_SIZES = {"small": 1, "large": 10_000}
+
+
+class SyntheticStageFunction:
+    """Stage function taking a fixed number of params and returning a fixed payload."""
+
+    def __init__(self, name: str, arity: int, payload: Obj) -> None:
+        """Create a function called `name` with `arity` positional params."""
+        self.__name__ = name
+        self.__signature__ = Signature(
+            [Parameter(f"p{i}", Parameter.POSITIONAL_OR_KEYWORD) for i in range(arity)],
+        )
+        self._payload = payload
+
+    def __call__(self, *args: Obj) -> Obj:
+        """Ignore the inputs and return the payload."""
+        del args
+        return self._payload
+
+
+def make_payload(size: str) -> list[float]:
+    """Make a JSON-serializable payload of the named size."""
+    return [float(i) for i in range(PAYLOAD_SIZES[size])]
+
+
+def _stage(index: int, params: Sequence[str], payload: Obj) -> PipelineStage:
+    name = f"stage{index}"
+    func = SyntheticStageFunction(name, len(params), payload)
+    return PipelineStage(func, [f"obj{index}"], params=params)
+
+
+def chain(n_stages: int, payload: Obj) -> list[PipelineStage]:
+    """Each stage consumes the output of the previous one."""
+    return [_stage(i, ["input"] if i == 0 else [f"obj{i - 1}"], payload) for i in range(n_stages)]
+
+
+def fan(n_stages: int, payload: Obj) -> list[PipelineStage]:
+    """One stage fans out to all middle stages, which all fan in to a final stage."""
+    if n_stages < 3:  # noqa: PLR2004
+        return chain(n_stages, payload)
+    middle = range(1, n_stages - 1)
+    return [
+        _stage(0, ["input"], payload),
+        *(_stage(i, ["obj0"], payload) for i in middle),
+        _stage(n_stages - 1, [f"obj{i}" for i in middle], payload),
+    ]
+
+
+def random_dag(
+    n_stages: int,
+    payload: Obj,
+    *,
+    max_parents: int = 3,
+    seed: int = 0,
+) -> list[PipelineStage]:
+    """Each stage consumes the outputs of up to `max_parents` random earlier stages."""
+    rng = random.Random(seed)  # noqa: S311
+    stages = [_stage(0, ["input"], payload)] if n_stages else []
+    for i in range(1, n_stages):
+        parents = rng.sample(range(i), k=min(i, rng.randint(1, max_parents)))
+        stages.append(_stage(i, [f"obj{p}" for p in sorted(parents)], payload))
+    return stages
+
+
+SHAPES: dict[str, Callable[[int, Obj], list[PipelineStage]]] = {
+    "chain": chain,
+    "fan": fan,
+    "random": random_dag,
+}
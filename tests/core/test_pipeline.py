@@ -1,9 +1,11 @@
+import asyncio
 from copy import deepcopy
 
 import pytest
 
 from tests.stubs import StubPipelineStageRunner, StubPipelineStorage
 from timothy.core._pipeline import Pipeline
+from timothy.core._pipelinehooks import PipelineHooks
 from timothy.exceptions import PipelineConfigError
 
 
@@ -57,6 +59,171 @@ class TestPipeline:
         values = ready_made_pipeline.get_values()
         assert values == {"num1": 5, "num2": 7.3, "num3": 25, "num4": 389.017, "num5": 414.017}
 
+    def test_run_returns_report_with_timing_of_each_stage(self, ready_made_pipeline: Pipeline):
+        ready_made_pipeline.set_values(num1=5, num2=7.3)
+        report = ready_made_pipeline.run()
+        assert set(report.stages) == {"add_num3_and_num4", "cube_num2", "square_num1"}
+        assert report.critical_path[-1] == "add_num3_and_num4"
+
+    def test_run_calls_user_hooks(self, ready_made_pipeline: Pipeline):
+        ended: list[str] = []
+
+        class EndRecordingHooks(PipelineHooks):
+            def on_stage_end(self, stage, timing) -> None:
+                del timing
+                ended.append(stage.name)
+
+        ready_made_pipeline.set_values(num1=5, num2=7.3)
+        ready_made_pipeline.run(hooks=[EndRecordingHooks()])
+        assert sorted(ended) == ["add_num3_and_num4", "cube_num2", "square_num1"]
+
+    def test_run_with_targets_only_runs_required_stages(self, ready_made_pipeline: Pipeline):
+        ready_made_pipeline.set_values(num1=5)
+        ready_made_pipeline.run(targets=["num3"])
+        values = ready_made_pipeline.get_values()
+        assert values == {"num1": 5, "num3": 25}
+
+    def test_run_with_targets_reuses_stored_objects(self, ready_made_pipeline: Pipeline):
+        ready_made_pipeline.set_values(num3=2, num4=3.0)
+        ready_made_pipeline.run(targets=["num5"])
+        values = ready_made_pipeline.get_values()
+        assert values == {"num3": 2, "num4": 3.0, "num5": 5.0}
+
+    def test_run_with_resume_continues_from_first_unfinished_stage(
+        self,
+        ready_made_pipeline: Pipeline,
+    ):
+        ready_made_pipeline.set_values(num1=5, num2=7.3, num3=2, num4=3.0)
+        ready_made_pipeline.run(resume=True)
+        values = ready_made_pipeline.get_values()
+        assert values == {"num1": 5, "num2": 7.3, "num3": 2, "num4": 3.0, "num5": 5.0}
+
+    def test_run_with_resume_reruns_stages_downstream_of_missing_outputs(
+        self,
+        ready_made_pipeline: Pipeline,
+    ):
+        ready_made_pipeline.set_values(num1=5, num2=7.3, num4=3.0, num5=0.0)
+        ready_made_pipeline.run(resume=True)
+        values = ready_made_pipeline.get_values()
+        assert values == {"num1": 5, "num2": 7.3, "num3": 25, "num4": 3.0, "num5": 28.0}
+
+    def test_run_with_run_id_stores_inputs_and_outputs_in_its_namespace(
+        self,
+        ready_made_pipeline: Pipeline,
+    ):
+        ready_made_pipeline.set_values(num1=1, num2=1.0)
+        ready_made_pipeline.run(run_id="run1", inputs={"num1": 5, "num2": 7.3})
+        values = ready_made_pipeline.get_values(run_id="run1")
+        assert values == {"num1": 5, "num2": 7.3, "num3": 25, "num4": 389.017, "num5": 414.017}
+        assert "num3" not in ready_made_pipeline.storage.list_names()
+
+    def test_run_with_evict_deletes_consumed_intermediates(self, ready_made_pipeline: Pipeline):
+        ready_made_pipeline.set_values(num1=5, num2=7.3)
+        ready_made_pipeline.run(evict=True)
+        values = ready_made_pipeline.get_values()
+        assert values == {"num1": 5, "num2": 7.3, "num5": 414.017}
+
+    def test_run_with_evict_keeps_pinned_and_target_objects(self, ready_made_pipeline: Pipeline):
+        ready_made_pipeline.set_values(num1=5, num2=7.3)
+        ready_made_pipeline.run(targets=["num3", "num5"], evict=True, pinned=["num4"])
+        values = ready_made_pipeline.get_values()
+        assert values == {"num1": 5, "num2": 7.3, "num3": 25, "num4": 389.017, "num5": 414.017}
+
+    def test_run_many_runs_invariant_stages_once(self, ready_made_pipeline: Pipeline):
+        calls: list[str] = []
+
+        class EndRecordingHooks(PipelineHooks):
+            def on_stage_end(self, stage, timing) -> None:
+                del timing
+                calls.append(stage.name)
+
+        inputs = [{"num1": 5, "num2": 1.0}, {"num1": 5, "num2": 2.0}, {"num1": 5, "num2": 3.0}]
+        report = ready_made_pipeline.run_many(
+            inputs,
+            hooks_factory=lambda: [EndRecordingHooks()],
+        )
+        assert calls.count("square_num1") == 1
+        assert calls.count("cube_num2") == len(inputs)
+        assert calls.count("add_num3_and_num4") == len(inputs)
+        assert set(report.shared.stages) == {"square_num1"}
+        assert list(report.runs) == ["variation0", "variation1", "variation2"]
+        assert ready_made_pipeline.get_values("num3") == {"num3": 25}
+        for run_id, num2 in zip(report.runs, [1.0, 2.0, 3.0], strict=True):
+            values = ready_made_pipeline.get_values(run_id=run_id)
+            assert values == {"num2": num2, "num4": num2**3, "num5": 25 + num2**3}
+
+    def test_run_many_uses_given_run_ids(self, ready_made_pipeline: Pipeline):
+        report = ready_made_pipeline.run_many(
+            [{"num1": 1, "num2": 2.0}, {"num1": 2, "num2": 2.0}],
+            run_ids=["a", "b"],
+            shared_run_id="shared",
+        )
+        assert list(report.runs) == ["a", "b"]
+        assert ready_made_pipeline.get_values("num4", run_id="shared") == {"num4": 8.0}
+        assert ready_made_pipeline.get_values("num5", run_id="b") == {"num5": 12.0}
+
+    def test_run_many_rejects_mismatched_run_ids(self, ready_made_pipeline: Pipeline):
+        with pytest.raises(PipelineConfigError):
+            ready_made_pipeline.run_many([{"num1": 1}, {"num1": 2}], run_ids=["a"])
+
+    def test_run_many_rejects_inputs_missing_from_some_variations(
+        self,
+        ready_made_pipeline: Pipeline,
+    ):
+        ready_made_pipeline.set_values(num2=1.0)
+        with pytest.raises(PipelineConfigError, match="num2"):
+            ready_made_pipeline.run_many([{"num1": 1, "num2": 2.0}, {"num1": 2}])
+
+    def test_run_many_makes_new_hooks_for_every_run(self, ready_made_pipeline: Pipeline):
+        made: list[PipelineHooks] = []
+
+        def make_hooks() -> list[PipelineHooks]:
+            made.append(PipelineHooks())
+            return made[-1:]
+
+        inputs = [{"num1": 5, "num2": 1.0}, {"num1": 5, "num2": 2.0}]
+        ready_made_pipeline.run_many(inputs, hooks_factory=make_hooks)
+        assert len(made) == len({id(hooks) for hooks in made}) == 1 + len(inputs)
+
+    def test_run_supports_runners_that_do_not_accept_hooks(self, ready_made_pipeline: Pipeline):
+        stub_runner = StubPipelineStageRunner()
+
+        def runner_without_hooks(stages, storage) -> None:
+            stub_runner(stages, storage)
+
+        pipeline = ready_made_pipeline.bind(stagerunner=runner_without_hooks)
+        pipeline.set_values(num1=5, num2=7.3)
+        report = pipeline.run()
+        assert pipeline.get_values("num5") == {"num5": 414.017}
+        assert report.stages == {}
+        with pytest.raises(PipelineConfigError):
+            pipeline.run(evict=True)
+
+    def test_run_with_evict_rejects_storage_that_cannot_delete(
+        self,
+        ready_made_pipeline: Pipeline,
+    ):
+        class AppendOnlyStorage:
+            def __init__(self) -> None:
+                self._objs = StubPipelineStorage()
+                self.fetch_one = self._objs.fetch_one
+                self.fetch_many = self._objs.fetch_many
+                self.store_one = self._objs.store_one
+                self.store_many = self._objs.store_many
+                self.list_names = self._objs.list_names
+
+        pipeline = ready_made_pipeline.bind(storage=AppendOnlyStorage())
+        pipeline.set_values(num1=5, num2=7.3)
+        pipeline.run()
+        with pytest.raises(PipelineConfigError):
+            pipeline.run(evict=True)
+
+    def test_arun_runs_pipeline_and_stores_correct_values(self, ready_made_pipeline: Pipeline):
+        ready_made_pipeline.set_values(num1=5, num2=7.3)
+        asyncio.run(ready_made_pipeline.arun())
+        values = ready_made_pipeline.get_values()
+        assert values == {"num1": 5, "num2": 7.3, "num3": 25, "num4": 389.017, "num5": 414.017}
+
     def test_pipeline_can_be_instantiated_with_existing_stages(self, ready_made_pipeline: Pipeline):
         new_pipeline = concrete_pipeline(
             Pipeline("new_pipeline", stages=ready_made_pipeline.stages),
@@ -64,6 +231,74 @@ class TestPipeline:
         for stage in ready_made_pipeline.stages:
             assert new_pipeline.stages[stage.name].func is stage.func
 
+    def test_registering_does_not_change_previously_retrieved_stages(
+        self,
+        ready_made_pipeline: Pipeline,
+    ):
+        stages_before = ready_made_pipeline.stages
+
+        @ready_made_pipeline.register(returns=["num6"])
+        def negate_num5(num5: float) -> float:
+            return -num5
+
+        assert "negate_num5" not in stages_before.names()
+        assert "negate_num5" in ready_made_pipeline.stages.names()
+
+    def test_registering_does_not_change_stages_pipeline_was_created_with(
+        self,
+        ready_made_pipeline: Pipeline,
+    ):
+        new_pipeline = Pipeline("new_pipeline", stages=ready_made_pipeline.stages)
+
+        @new_pipeline.register(returns=["num6"])
+        def negate_num5(num5: float) -> float:
+            return -num5
+
+        assert "negate_num5" not in ready_made_pipeline.stages.names()
+        assert "negate_num5" in new_pipeline.stages.names()
+
+    def test_bind_shares_stages_but_not_storage(self, ready_made_pipeline: Pipeline):
+        ready_made_pipeline.set_values(num1=5)
+        storage = StubPipelineStorage()
+
+        bound = ready_made_pipeline.bind(storage=storage)
+
+        assert bound.storage is storage
+        assert bound.stagerunner is ready_made_pipeline.stagerunner
+        assert bound.stages is ready_made_pipeline.stages
+        assert "num1" not in bound.get_values()
+
+    def test_registering_on_bound_pipeline_does_not_change_original(
+        self,
+        ready_made_pipeline: Pipeline,
+    ):
+        bound = ready_made_pipeline.bind(storage=StubPipelineStorage())
+
+        @bound.register(returns=["num6"])
+        def negate_num5(num5: float) -> float:
+            return -num5
+
+        @ready_made_pipeline.register(returns=["num7"])
+        def double_num5(num5: float) -> float:
+            return 2 * num5
+
+        assert "negate_num5" not in ready_made_pipeline.stages.names()
+        assert "double_num5" not in bound.stages.names()
+
+    def test_registered_map_stage_combines_partition_results(self):
+        p = concrete_pipeline(Pipeline("map_pipeline"))
+
+        partitions = 3
+
+        @p.register(returns=["total"], map_over="nums", partitions=partitions, combine=sum)
+        def total(nums: list[int]) -> int:
+            return sum(nums)
+
+        p.set_values(nums=list(range(100)))
+        p.run()
+        assert p.get_values("total") == {"total": 4950}
+        assert p.stages["total"].partitions == partitions
+
     def test_accessing_storage_attribute_raises_if_storage_not_set(self):
         new_pipeline = Pipeline("new_pipeline")
         with pytest.raises(PipelineConfigError):
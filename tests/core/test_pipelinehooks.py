@@ -0,0 +1,66 @@
+from tests.stubs import StubPipelineStorage
+from timothy.core._pipelinehooks import ConsumerCountingEvictor, StageTiming
+from timothy.core._pipelinestage import PipelineStage, PipelineStageSet
+
+
+def square_num1(num1: int) -> int:
+    return num1**2
+
+
+def add_one_to_num2(num2: int) -> int:
+    return num2 + 1
+
+
+def double_num2(num2: int) -> int:
+    return num2 * 2
+
+
+def add_num3_and_num4(num3: int, num4: int) -> int:
+    return num3 + num4
+
+
+class TestConsumerCountingEvictor:
+    def run_stages_with_evictor(
+        self,
+        evictor: ConsumerCountingEvictor,
+    ) -> tuple[StubPipelineStorage, list[list[str]]]:
+        stages = PipelineStageSet(
+            PipelineStage(square_num1, ["num2"]),
+            PipelineStage(add_one_to_num2, ["num3"]),
+            PipelineStage(double_num2, ["num4"]),
+            PipelineStage(add_num3_and_num4, ["num5"]),
+        )
+        storage = StubPipelineStorage(num1=3)
+        names_after_each_stage: list[list[str]] = []
+
+        evictor.on_run_start(stages, storage)
+        for stage in stages:
+            return_objs = stage.call(storage.fetch_many(*stage.params))
+            storage.store_many(**dict(zip(stage.returns, return_objs, strict=True)))
+            evictor.on_stage_end(stage, StageTiming(stage.name, 0.0, 0.0))
+            names_after_each_stage.append(list(storage.list_names()))
+
+        return storage, names_after_each_stage
+
+    def test_intermediates_are_deleted_after_last_consumer_ends(self):
+        storage, names_after_each_stage = self.run_stages_with_evictor(ConsumerCountingEvictor())
+
+        assert names_after_each_stage == [
+            ["num1", "num2"],
+            ["num1", "num2", "num3"],
+            ["num1", "num3", "num4"],
+            ["num1", "num5"],
+        ]
+        assert storage.fetch_many("num5") == [28]
+
+    def test_kept_intermediates_are_not_deleted(self):
+        _, names_after_each_stage = self.run_stages_with_evictor(
+            ConsumerCountingEvictor(keep=["num2", "num4"]),
+        )
+
+        assert names_after_each_stage[-1] == ["num1", "num2", "num4", "num5"]
+
+
+class TestStageTiming:
+    def test_wall_seconds_is_time_between_start_and_end(self):
+        assert StageTiming("stage", started_at=1.5, ended_at=4.0).wall_seconds == 4.0 - 1.5
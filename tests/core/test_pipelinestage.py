@@ -1,14 +1,24 @@
+import asyncio
+from collections.abc import Iterator
+from inspect import isgenerator
+
 import pytest
 
 from timothy.core._exceptions import (
     CannotCallStageError,
+    CannotRunPipelineError,
     DuplicateReturnError,
     DuplicateStageError,
     InvalidParamsError,
     InvalidResultsError,
     MissingPipelineStageError,
 )
-from timothy.core._pipelinestage import PipelineStage, PipelineStageSet
+from timothy.core._pipelinestage import (
+    PipelineStage,
+    PipelineStagePlan,
+    PipelineStageSet,
+    concatenate,
+)
 
 
 def zero_func(foo, bar) -> tuple[int, str]:
@@ -48,6 +58,15 @@ class TestPipelineStage:
         zero_stage = PipelineStage(zero_func, returns=["baz", "bazstr"])
         assert zero_stage.returns == ["baz", "bazstr"]
 
+    @pytest.mark.parametrize("run_in_process", [None, True, False])
+    def test_run_in_process_is_correct(self, run_in_process):
+        zero_stage = PipelineStage(
+            zero_func,
+            returns=["baz", "bazstr"],
+            run_in_process=run_in_process,
+        )
+        assert zero_stage.run_in_process is run_in_process
+
     @pytest.mark.parametrize(
         "params_specified",
         [
@@ -126,6 +145,43 @@ class TestPipelineStage:
         with pytest.raises(InvalidResultsError):
             pipeline_stage.call(["param_a", "param_b"])
 
+    def test_call_awaits_async_function(self):
+        async def some_function(param_a, param_b) -> str:
+            await asyncio.sleep(0)
+            return f"{param_a}{param_b}"
+
+        pipeline_stage = PipelineStage(some_function, returns=["joined"])
+
+        assert pipeline_stage.is_async
+        assert pipeline_stage.call(["a", "b"]) == ["ab"]
+
+    def test_call_awaits_async_function_inside_running_event_loop(self):
+        async def some_function(param_a, param_b) -> str:
+            await asyncio.sleep(0)
+            return f"{param_a} and {param_b}"
+
+        async def call_from_async_code() -> list[object]:
+            return list(PipelineStage(some_function, ["result"]).call(["a", "b"]))
+
+        assert asyncio.run(call_from_async_code()) == ["a and b"]
+
+    @pytest.mark.parametrize("is_async", [True, False])
+    def test_acall_calls_function_and_returns_correct_values(self, is_async):
+        def sync_function(param_a, param_b) -> tuple[str, str]:
+            return param_b, param_a
+
+        async def async_function(param_a, param_b) -> tuple[str, str]:
+            await asyncio.sleep(0)
+            return param_b, param_a
+
+        pipeline_stage = PipelineStage(
+            async_function if is_async else sync_function,
+            returns=["b", "a"],
+        )
+
+        assert pipeline_stage.is_async is is_async
+        assert asyncio.run(pipeline_stage.acall(["a", "b"])) == ["b", "a"]
+
     @pytest.mark.parametrize(
         "call_with",
         [
@@ -142,6 +198,103 @@ class TestPipelineStage:
         with pytest.raises(CannotCallStageError):
             pipeline_stage.call(call_with)
 
+    def test_map_stage_splits_mapped_param_into_balanced_partitions(self):
+        def scale(nums: list[int], factor: int) -> list[int]:
+            return [n * factor for n in nums]
+
+        stage = PipelineStage(
+            scale,
+            ["scaled"],
+            map_over="nums",
+            partitions=3,
+            combine=concatenate,
+        )
+        partitions = stage.split([[1, 2, 3, 4, 5, 6, 7], 10])
+        assert partitions == [[[1, 2, 3], 10], [[4, 5], 10], [[6, 7], 10]]
+        assert stage.call([[1, 2, 3, 4, 5, 6, 7], 10]) == [[10, 20, 30, 40, 50, 60, 70]]
+
+    def test_map_stage_never_makes_more_partitions_than_items(self):
+        def total(nums: list[int]) -> int:
+            return sum(nums)
+
+        stage = PipelineStage(total, ["total"], map_over="nums", partitions=4, combine=sum)
+        assert stage.split([[1, 2]]) == [[[1]], [[2]]]
+        assert stage.split([[]]) == [[[]]]
+
+    def test_map_stage_reduces_partition_results_with_combine(self):
+        def sum_and_count(nums: list[int]) -> tuple[int, int]:
+            return sum(nums), len(nums)
+
+        def combine(results: list[tuple[int, int]]) -> tuple[int, int]:
+            return sum(r[0] for r in results), sum(r[1] for r in results)
+
+        stage = PipelineStage(
+            sum_and_count,
+            ["total", "count"],
+            map_over="nums",
+            partitions=2,
+            combine=combine,
+        )
+        assert stage.call([list(range(10))]) == [45, 10]
+
+    def test_async_map_stage_partitions_are_awaited(self):
+        async def double(nums: list[int]) -> list[int]:
+            await asyncio.sleep(0)
+            return [n * 2 for n in nums]
+
+        stage = PipelineStage(
+            double,
+            ["doubled"],
+            map_over="nums",
+            partitions=2,
+            combine=concatenate,
+        )
+        assert asyncio.run(stage.acall([[1, 2, 3]])) == [[2, 4, 6]]
+        assert stage.call([[1, 2, 3]]) == [[2, 4, 6]]
+
+    @pytest.mark.parametrize(
+        "map_options",
+        [
+            {"map_over": "baz"},
+            {"map_over": "foo"},
+            {"map_over": "foo", "partitions": 0, "combine": concatenate},
+            {"partitions": 2},
+            {"combine": sum},
+        ],
+    )
+    def test_invalid_map_options_are_rejected(self, map_options):
+        with pytest.raises(InvalidParamsError):
+            PipelineStage(zero_func, ["baz", "bazstr"], **map_options)
+
+    def test_generator_results_are_returned_lazily(self):
+        def count_to(num: int) -> Iterator[int]:
+            yield from range(num)
+
+        (nums,) = PipelineStage(count_to, ["nums"]).call([3])
+        assert isgenerator(nums)
+        assert list(nums) == [0, 1, 2]
+        assert PipelineStage(count_to, ["nums"]).is_generator
+
+    def test_stage_cannot_both_map_and_stream(self):
+        with pytest.raises(InvalidParamsError):
+            PipelineStage(
+                zero_func,
+                ["baz", "bazstr"],
+                map_over="foo",
+                combine=concatenate,
+                streaming=True,
+            )
+
+    def test_map_stage_cannot_map_over_non_iterable(self):
+        stage = PipelineStage(zero_func, ["baz", "bazstr"], map_over="foo", combine=concatenate)
+        with pytest.raises(CannotCallStageError):
+            stage.call([1, 2])
+
+    def test_map_stage_cannot_map_over_mapping(self):
+        stage = PipelineStage(zero_func, ["baz", "bazstr"], map_over="foo", combine=concatenate)
+        with pytest.raises(CannotCallStageError):
+            stage.call([{"a": 1, "b": 2}, 2])
+
 
 class TestPipelineStageSet:
     def test_init_raises_if_duplicate_name(self):
@@ -204,6 +357,60 @@ class TestPipelineStageSet:
         assert pipeline_stage_set2 is not pipeline_stage_set1
         assert list(pipeline_stage_set2) == [stage1, stage2]
 
+    def test_add_adds_stage_in_place(self):
+        def name1() -> str:
+            return "1"
+
+        def name2() -> str:
+            return "2"
+
+        stage1 = PipelineStage(name1, ["one"])
+        stage2 = PipelineStage(name2, ["two"])
+        pipeline_stage_set = PipelineStageSet(stage1)
+        plan_before = pipeline_stage_set.plan
+
+        pipeline_stage_set.add(stage2)
+
+        assert list(pipeline_stage_set) == [stage1, stage2]
+        assert dict(**pipeline_stage_set.returns) == {"one": stage1, "two": stage2}
+        assert pipeline_stage_set.plan is not plan_before
+        assert pipeline_stage_set.plan.order == ("name1", "name2")
+
+    def test_add_raises_if_duplicate_name(self):
+        def foo() -> None:
+            return None
+
+        pipeline_stage_set = PipelineStageSet(PipelineStage(foo, []))
+        with pytest.raises(DuplicateStageError):
+            pipeline_stage_set.add(PipelineStage(foo, []))
+
+    @pytest.mark.parametrize("bar_returns", [["baz"], ["qux", "qux"]])
+    def test_add_raises_if_duplicate_return(self, bar_returns):
+        def foo() -> str:
+            return "hello"
+
+        def bar() -> tuple[str, str]:
+            return "world", "!"
+
+        pipeline_stage_set = PipelineStageSet(PipelineStage(foo, ["baz"]))
+        with pytest.raises(DuplicateReturnError):
+            pipeline_stage_set.add(PipelineStage(bar, bar_returns))
+        assert list(pipeline_stage_set.names()) == ["foo"]
+
+    def test_copy_is_independent_of_original(self):
+        def name1() -> None:
+            pass
+
+        def name2() -> None:
+            pass
+
+        pipeline_stage_set1 = PipelineStageSet(PipelineStage(name1, []))
+        pipeline_stage_set2 = pipeline_stage_set1.copy()
+        pipeline_stage_set2.add(PipelineStage(name2, []))
+
+        assert list(pipeline_stage_set1.names()) == ["name1"]
+        assert list(pipeline_stage_set2.names()) == ["name1", "name2"]
+
     def test_names_produce_correct_names(self):
         def foo() -> None:
             pass
@@ -259,3 +466,155 @@ class TestPipelineStageSet:
             "world": {foostage},
             "there": {barstage},
         }
+
+    @pytest.fixture()
+    def chain_and_branch_stage_set(self) -> PipelineStageSet:
+        def square_num1(num1: int) -> int:
+            return num1**2
+
+        def add_one_to_num2(num2: int) -> int:
+            return num2 + 1
+
+        def negate_num1(num1: int) -> int:
+            return -num1
+
+        return PipelineStageSet(
+            PipelineStage(square_num1, ["num2"]),
+            PipelineStage(add_one_to_num2, ["num3"]),
+            PipelineStage(negate_num1, ["num4"]),
+        )
+
+    def test_required_produces_ancestors_of_targets(self, chain_and_branch_stage_set):
+        required = chain_and_branch_stage_set.required(["num3"])
+        assert tuple(required.names()) == ("square_num1", "add_one_to_num2")
+
+    def test_required_accepts_targets_from_a_generator(self, chain_and_branch_stage_set):
+        required = chain_and_branch_stage_set.required(t for t in ["num3"])
+        assert tuple(required.names()) == ("square_num1", "add_one_to_num2")
+
+    def test_required_skips_stages_whose_outputs_are_available(self, chain_and_branch_stage_set):
+        required = chain_and_branch_stage_set.required(["num3"], available=["num2"])
+        assert tuple(required.names()) == ("add_one_to_num2",)
+
+    def test_required_is_empty_if_targets_are_available(self, chain_and_branch_stage_set):
+        required = chain_and_branch_stage_set.required(["num3"], available=["num3"])
+        assert tuple(required.names()) == ()
+
+    def test_required_raises_if_target_cannot_be_produced(self, chain_and_branch_stage_set):
+        with pytest.raises(MissingPipelineStageError):
+            chain_and_branch_stage_set.required(["num5"])
+
+    def test_unfinished_skips_stages_whose_outputs_are_available(
+        self,
+        chain_and_branch_stage_set,
+    ):
+        unfinished = chain_and_branch_stage_set.unfinished(available=["num2", "num4"])
+        assert tuple(unfinished.names()) == ("add_one_to_num2",)
+
+    def test_unfinished_includes_stages_downstream_of_unfinished_stages(
+        self,
+        chain_and_branch_stage_set,
+    ):
+        unfinished = chain_and_branch_stage_set.unfinished(available=["num3", "num4"])
+        assert tuple(unfinished.names()) == ("square_num1", "add_one_to_num2")
+
+    def test_unfinished_includes_stages_without_returns(self):
+        def num1_to_num2(num1: int) -> int:
+            return num1 + 1
+
+        def report(num2: int) -> None:
+            del num2
+
+        stage_set = PipelineStageSet(
+            PipelineStage(num1_to_num2, ["num2"]),
+            PipelineStage(report, []),
+        )
+        unfinished = stage_set.unfinished(available=["num2"])
+        assert tuple(unfinished.names()) == ("report",)
+
+    def test_downstream_includes_transitive_consumers_of_names(self, chain_and_branch_stage_set):
+        downstream = chain_and_branch_stage_set.downstream(["num2"])
+        assert tuple(downstream.names()) == ("add_one_to_num2",)
+        downstream = chain_and_branch_stage_set.downstream(["num1"])
+        assert set(downstream.names()) == {"square_num1", "add_one_to_num2", "negate_num1"}
+
+    def test_downstream_is_empty_for_unconsumed_names(self, chain_and_branch_stage_set):
+        assert len(chain_and_branch_stage_set.downstream(["num3", "num5"])) == 0
+
+    def test_plan_is_built_once(self, chain_and_branch_stage_set):
+        plan = chain_and_branch_stage_set.plan
+        assert isinstance(plan, PipelineStagePlan)
+        assert chain_and_branch_stage_set.plan is plan
+
+    def test_with_prefix_prefixes_params_and_returns(self, chain_and_branch_stage_set):
+        prefixed = chain_and_branch_stage_set.with_prefix("run1.")
+        assert tuple(prefixed.names()) == tuple(chain_and_branch_stage_set.names())
+        assert set(prefixed.returns) == {f"run1.{n}" for n in chain_and_branch_stage_set.returns}
+        assert set(prefixed.params) == {f"run1.{n}" for n in chain_and_branch_stage_set.params}
+
+
+class TestPipelineStagePlan:
+    @pytest.fixture()
+    def diamond_stage_set(self) -> PipelineStageSet:
+        def split(num1: int) -> tuple[int, int]:
+            return num1, -num1
+
+        def double_num2(num2: int) -> int:
+            return num2 * 2
+
+        def triple_num3(num3: int) -> int:
+            return num3 * 3
+
+        def add_num4_and_num5(num4: int, num5: int) -> int:
+            return num4 + num5
+
+        return PipelineStageSet(
+            PipelineStage(add_num4_and_num5, ["num6"]),
+            PipelineStage(triple_num3, ["num5"]),
+            PipelineStage(double_num2, ["num4"]),
+            PipelineStage(split, ["num2", "num3"]),
+        )
+
+    def test_levels_group_stages_by_depth(self, diamond_stage_set):
+        plan = PipelineStagePlan(diamond_stage_set)
+        assert [set(level) for level in plan.levels] == [
+            {"split"},
+            {"triple_num3", "double_num2"},
+            {"add_num4_and_num5"},
+        ]
+
+    def test_order_is_topological(self, diamond_stage_set):
+        plan = PipelineStagePlan(diamond_stage_set)
+        assert plan.order[0] == "split"
+        assert plan.order[-1] == "add_num4_and_num5"
+        assert len(plan.order) == len(diamond_stage_set)
+
+    def test_dependencies_are_correct(self, diamond_stage_set):
+        plan = PipelineStagePlan(diamond_stage_set)
+        assert plan.dependencies["split"] == ()
+        assert plan.dependencies["double_num2"] == ("split",)
+        assert set(plan.dependencies["add_num4_and_num5"]) == {"double_num2", "triple_num3"}
+
+    def test_producers_and_consumers_are_correct(self, diamond_stage_set):
+        plan = PipelineStagePlan(diamond_stage_set)
+        assert plan.producers["num3"] is plan.stages["split"]
+        assert set(plan.consumers["num4"]) == {plan.stages["add_num4_and_num5"]}
+
+    def test_sorter_yields_dependency_order(self, diamond_stage_set):
+        sorter = PipelineStagePlan(diamond_stage_set).sorter()
+        assert sorter.get_ready() == ("split",)
+
+    def test_init_raises_if_cycle_detected(self):
+        def doubles_num1_to_get_num2(num1: int) -> int:
+            return num1 * 2
+
+        def halves_num2_to_get_num1(num2: int) -> int:
+            return num2 // 2
+
+        stage_set = PipelineStageSet(
+            PipelineStage(doubles_num1_to_get_num2, ["num2"]),
+            PipelineStage(halves_num2_to_get_num1, ["num1"]),
+        )
+
+        with pytest.raises(CannotRunPipelineError):
+            PipelineStagePlan(stage_set)
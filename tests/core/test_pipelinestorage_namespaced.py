@@ -0,0 +1,76 @@
+import pytest
+
+from tests.stubs import AppendOnlyPipelineStorage, RecordingPipelineStorage, StubPipelineStorage
+from tests.test_pipelinestorage_impl import BaseTestAnyPipelineStorage
+from timothy._pipelinestagerunner_impl import DAGPipelineStageRunner
+from timothy.core import (
+    DeletablePipelineStorage,
+    NamespacedPipelineStorage,
+    PipelineHooks,
+    PipelineStage,
+    PipelineStageSet,
+)
+from timothy.exceptions import PipelineConfigError
+
+
+class TestNamespacedPipelineStorage(BaseTestAnyPipelineStorage[NamespacedPipelineStorage]):
+    @pytest.fixture()
+    def empty_storage(self) -> NamespacedPipelineStorage:
+        return NamespacedPipelineStorage(StubPipelineStorage(), "run1")
+
+    def test_names_are_prefixed_in_inner_storage(self, empty_storage: NamespacedPipelineStorage):
+        empty_storage.store_one("name", 1)
+        assert empty_storage.inner == {"run1.name": 1}
+
+    def test_namespaces_do_not_see_each_others_names(
+        self,
+        empty_storage: NamespacedPipelineStorage,
+    ):
+        other = NamespacedPipelineStorage(empty_storage.inner, "run2")
+        empty_storage.store_one("name", 1)
+        other.store_one("name", 2)
+        empty_storage.inner.store_one("name", 3)
+        assert list(empty_storage.list_names()) == ["name"]
+        assert empty_storage.fetch_many("name") == [1]
+        assert other.fetch_many("name") == [2]
+
+    @pytest.mark.parametrize("namespace", ["", "run.1", "/abs", "a/b", "a\\b"])
+    def test_invalid_namespaces_are_rejected(self, namespace: str):
+        with pytest.raises(PipelineConfigError):
+            NamespacedPipelineStorage(StubPipelineStorage(), namespace)
+
+    def test_is_hooks_only_if_inner_storage_is_hooks(self, empty_storage):
+        assert not isinstance(empty_storage, PipelineHooks)
+        hooked = NamespacedPipelineStorage(RecordingPipelineStorage(), "run1")
+        assert isinstance(hooked, PipelineHooks)
+        assert isinstance(hooked, NamespacedPipelineStorage)
+
+    def test_is_deletable_only_if_inner_storage_is_deletable(self, empty_storage):
+        assert isinstance(empty_storage, DeletablePipelineStorage)
+        hooked = NamespacedPipelineStorage(RecordingPipelineStorage(), "run1")
+        assert isinstance(hooked, DeletablePipelineStorage)
+        append_only = NamespacedPipelineStorage(AppendOnlyPipelineStorage(), "run1")
+        assert not isinstance(append_only, DeletablePipelineStorage)
+        nested = NamespacedPipelineStorage(append_only, "run2")
+        assert not isinstance(nested, DeletablePipelineStorage)
+
+    def test_hooks_are_forwarded_with_prefixed_names(self):
+        inner = RecordingPipelineStorage(num1=1)
+        storage = NamespacedPipelineStorage(inner, "run1")
+        storage.store_one("num1", 1)
+
+        def add_one(num1: int) -> int:
+            return num1 + 1
+
+        stages = PipelineStageSet(PipelineStage(add_one, ["num2"]))
+        DAGPipelineStageRunner()(stages, storage)
+
+        assert inner.events == [
+            ("on_run_start", ("run1.num2",)),
+            ("on_stage_start", ("run1.num1",)),
+            ("on_fetch", ("run1.num1",)),
+            ("on_store", ("run1.num2",)),
+            ("on_stage_end", ("run1.num1",)),
+            ("on_run_end", ()),
+        ]
+        assert inner.fetch_many("run1.num2") == [2]
@@ -0,0 +1,61 @@
+import pytest
+
+from tests.stubs import AppendOnlyPipelineStorage, RecordingPipelineStorage, StubPipelineStorage
+from tests.test_pipelinestorage_impl import BaseTestAnyPipelineStorage
+from timothy._pipelinestagerunner_impl import DAGPipelineStageRunner
+from timothy.core import (
+    DeletablePipelineStorage,
+    OverlayPipelineStorage,
+    PipelineHooks,
+    PipelineStage,
+    PipelineStageSet,
+)
+
+
+class TestOverlayPipelineStorage(BaseTestAnyPipelineStorage[OverlayPipelineStorage]):
+    @pytest.fixture()
+    def empty_storage(self) -> OverlayPipelineStorage:
+        return OverlayPipelineStorage(StubPipelineStorage(), StubPipelineStorage())
+
+    def test_reads_fall_back_to_base(self):
+        base = StubPipelineStorage(shared=1, overridden=2)
+        storage = OverlayPipelineStorage(StubPipelineStorage(), base)
+        storage.store_one("overridden", 3)
+        assert storage.fetch_many("shared", "overridden") == [1, 3]
+        assert storage.list_names() == ["overridden", "shared"]
+
+    def test_writes_and_deletes_do_not_touch_base(self):
+        base = StubPipelineStorage(shared=1)
+        storage = OverlayPipelineStorage(StubPipelineStorage(), base)
+        storage.store_one("own", 2)
+        storage.delete_one("shared")
+        assert base == {"shared": 1}
+
+    def test_is_deletable_only_if_top_is_deletable(self, empty_storage):
+        assert isinstance(empty_storage, DeletablePipelineStorage)
+        hooked = OverlayPipelineStorage(RecordingPipelineStorage(), AppendOnlyPipelineStorage())
+        assert isinstance(hooked, DeletablePipelineStorage)
+        append_only = OverlayPipelineStorage(AppendOnlyPipelineStorage(), StubPipelineStorage())
+        assert not isinstance(append_only, DeletablePipelineStorage)
+
+    def test_hooks_are_forwarded_to_top(self):
+        top = RecordingPipelineStorage()
+        storage = OverlayPipelineStorage(top, StubPipelineStorage(num1=1))
+        assert isinstance(storage, PipelineHooks)
+
+        def add_one(num1: int) -> int:
+            return num1 + 1
+
+        DAGPipelineStageRunner()(PipelineStageSet(PipelineStage(add_one, ["num2"])), storage)
+
+        assert top.events[0] == ("on_run_start", ("num2",))
+        assert top.events[-1] == ("on_run_end", ())
+        assert top.fetch_many("num2") == [2]
+
+    def test_objects_already_in_top_are_not_visible(self):
+        top = StubPipelineStorage(stale=1, shared=2)
+        storage = OverlayPipelineStorage(top, StubPipelineStorage(shared=3))
+        assert storage.list_names() == ["shared"]
+        assert storage.fetch_many("shared") == [3]
+        storage.store_one("shared", 4)
+        assert storage.fetch_many("shared") == [4]
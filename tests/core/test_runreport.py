@@ -0,0 +1,65 @@
+import pytest
+
+from tests.stubs import StubPipelineStorage
+from timothy.core._pipelinehooks import StageTiming
+from timothy.core._pipelinestage import PipelineStage, PipelineStageSet
+from timothy.core._runreport import RunReport, RunReportCollector
+
+
+def split(num1: int) -> tuple[int, int]:
+    return num1, -num1
+
+
+def double_num2(num2: int) -> int:
+    return num2 * 2
+
+
+def triple_num3(num3: int) -> int:
+    return num3 * 3
+
+
+def add_num4_and_num5(num4: int, num5: int) -> int:
+    return num4 + num5
+
+
+WALL_SECONDS = {
+    "split": 1.0,
+    "double_num2": 5.0,
+    "triple_num3": 2.0,
+    "add_num4_and_num5": 1.0,
+}
+
+
+class TestRunReportCollector:
+    @pytest.fixture()
+    def report(self) -> RunReport:
+        stages = PipelineStageSet(
+            PipelineStage(split, ["num2", "num3"]),
+            PipelineStage(double_num2, ["num4"]),
+            PipelineStage(triple_num3, ["num5"]),
+            PipelineStage(add_num4_and_num5, ["num6"]),
+        )
+
+        collector = RunReportCollector()
+        collector.on_run_start(stages, StubPipelineStorage())
+        for stage in stages:
+            collector.on_stage_end(stage, StageTiming(stage.name, 0.0, WALL_SECONDS[stage.name]))
+        collector.on_run_end()
+
+        return collector.report
+
+    def test_report_contains_timing_of_every_stage(self, report: RunReport):
+        assert set(report.stages) == {"split", "double_num2", "triple_num3", "add_num4_and_num5"}
+        assert report.stages["double_num2"].wall_seconds == WALL_SECONDS["double_num2"]
+
+    def test_report_contains_critical_path(self, report: RunReport):
+        assert report.critical_path == ("split", "double_num2", "add_num4_and_num5")
+        assert report.critical_path_seconds == sum(WALL_SECONDS[n] for n in report.critical_path)
+
+    def test_report_of_empty_run_is_empty(self):
+        collector = RunReportCollector()
+        collector.on_run_start(PipelineStageSet(), StubPipelineStorage())
+        collector.on_run_end()
+
+        assert collector.report.stages == {}
+        assert collector.report.critical_path == ()
@@ -1,14 +1,19 @@
 from collections.abc import Sequence
 from contextlib import suppress
+from time import perf_counter
 
 from timothy.core import (
     Obj,
+    PipelineHooks,
+    PipelineStage,
     PipelineStageSet,
     PipelineStorage,
+    StageTiming,
+    StorageAccess,
 )
 
 
-class StubPipelineStorage(dict):
+class AppendOnlyPipelineStorage(dict):
     def fetch_one(self, name: str) -> Obj:
         return self[name]
 
@@ -25,8 +30,53 @@ class StubPipelineStorage(dict):
         return sorted(self.keys())
 
 
+class StubPipelineStorage(AppendOnlyPipelineStorage):
+    def delete_one(self, name: str) -> None:
+        self.pop(name, None)
+
+    def delete_many(self, *names: str) -> None:
+        for name in names:
+            self.delete_one(name)
+
+
+class RecordingPipelineStorage(StubPipelineStorage, PipelineHooks):
+    def __init__(self, **objs: object) -> None:
+        super().__init__(**objs)
+        self.events: list[tuple[str, tuple[str, ...]]] = []
+
+    def on_run_start(self, stages: PipelineStageSet, storage: PipelineStorage) -> None:
+        del storage
+        self.events.append(("on_run_start", tuple(stages.returns)))
+
+    def on_stage_start(self, stage: PipelineStage) -> None:
+        self.events.append(("on_stage_start", tuple(stage.params)))
+
+    def on_fetch(self, stage: PipelineStage, access: StorageAccess) -> None:
+        del stage
+        self.events.append(("on_fetch", access.names))
+
+    def on_store(self, stage: PipelineStage, access: StorageAccess) -> None:
+        del stage
+        self.events.append(("on_store", access.names))
+
+    def on_stage_end(self, stage: PipelineStage, timing: StageTiming) -> None:
+        del timing
+        self.events.append(("on_stage_end", tuple(stage.params)))
+
+    def on_run_end(self) -> None:
+        self.events.append(("on_run_end", ()))
+
+
 class StubPipelineStageRunner:
-    def __call__(self, stages: PipelineStageSet, storage: PipelineStorage) -> None:
+    def __call__(
+        self,
+        stages: PipelineStageSet,
+        storage: PipelineStorage,
+        *,
+        hooks: Sequence[PipelineHooks] = (),
+    ) -> None:
+        for hook in hooks:
+            hook.on_run_start(stages, storage)
         stage_names = list(stages.names())
         called: list[str] = []
         attempts = 100
@@ -47,3 +97,8 @@ class StubPipelineStageRunner:
                         ),
                     )
                     called.append(stage.name)
+                    timing = StageTiming(stage.name, perf_counter(), perf_counter())
+                    for hook in hooks:
+                        hook.on_stage_end(stage, timing)
+        for hook in hooks:
+            hook.on_run_end()
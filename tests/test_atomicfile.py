@@ -0,0 +1,45 @@
+import os
+import stat
+
+import pytest
+
+from timothy._atomicfile import atomic_write
+
+
+class TestAtomicWrite:
+    def test_writes_file_contents(self, tmp_path):
+        path = tmp_path / "file.txt"
+        with atomic_write(path) as f:
+            f.write("hello")
+        assert path.read_text() == "hello"
+
+    def test_failed_write_leaves_no_files(self, tmp_path):
+        path = tmp_path / "file.txt"
+
+        def write_then_fail() -> None:
+            with atomic_write(path) as f:
+                f.write("hello")
+                raise RuntimeError
+
+        with pytest.raises(RuntimeError):
+            write_then_fail()
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.skipif(os.name != "posix", reason="POSIX permissions")
+    def test_new_files_get_default_permissions(self, tmp_path):
+        umask = os.umask(0)
+        os.umask(umask)
+        path = tmp_path / "file.txt"
+        with atomic_write(path) as f:
+            f.write("hello")
+        assert stat.S_IMODE(path.stat().st_mode) == 0o666 & ~umask
+
+    @pytest.mark.skipif(os.name != "posix", reason="POSIX permissions")
+    def test_replaced_files_keep_their_permissions(self, tmp_path):
+        path = tmp_path / "file.txt"
+        mode = 0o640
+        path.write_text("old")
+        path.chmod(mode)
+        with atomic_write(path) as f:
+            f.write("new")
+        assert stat.S_IMODE(path.stat().st_mode) == mode
@@ -0,0 +1,20 @@
+import pytest
+
+from timothy._codecs import Codec, decompress
+
+
+@pytest.mark.parametrize("name", ["none", "zlib", "bz2", "lzma"])
+def test_compressed_data_is_detected_and_decompressed(name):
+    data = b'{"hello": ["world", "world", "world", "world"]}'
+    assert decompress(Codec(name, level=1).compress(data)) == data
+
+
+@pytest.mark.parametrize("name", ["zlib", "bz2", "lzma"])
+def test_compression_shrinks_repetitive_data(name):
+    data = b"[" + b"1, " * 1000 + b"1]"
+    assert len(Codec(name).compress(data)) < len(data)
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError, match="codec"):
+        Codec("gzip")  # type: ignore[arg-type]
@@ -0,0 +1,25 @@
+import threading
+
+from timothy._filelock import file_lock
+
+
+class TestFileLock:
+    def test_shared_locks_can_be_held_together(self, tmp_path):
+        path = tmp_path / ".lock"
+        with file_lock(path, shared=True), file_lock(path, shared=True):
+            assert path.exists()
+
+    def test_exclusive_lock_waits_for_shared_lock(self, tmp_path):
+        path = tmp_path / ".lock"
+        acquired = threading.Event()
+
+        def lock_exclusively() -> None:
+            with file_lock(path):
+                acquired.set()
+
+        locker = threading.Thread(target=lock_exclusively)
+        with file_lock(path, shared=True):
+            locker.start()
+            assert not acquired.wait(timeout=0.1)
+        locker.join()
+        assert acquired.is_set()
@@ -1,7 +1,22 @@
-from timothy._pipeline_impl import json_pipeline, memory_pipeline
-from timothy._pipelinestagerunner_impl import DAGPipelineStageRunner
+import time
+import tracemalloc
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tests.stubs import AppendOnlyPipelineStorage
+from timothy._pipeline_impl import json_pipeline, memory_pipeline, sqlite_pipeline
+from timothy._pipelinestagerunner_impl import (
+    DAGPipelineStageRunner,
+    StreamingDAGPipelineStageRunner,
+    ThreadedDAGPipelineStageRunner,
+)
 from timothy._pipelinestorage_impl import JSONFilePipelineStorage, MemoryPipelineStorage
+from timothy._pipelinestorage_sqlite import SQLitePipelineStorage
+from timothy._pipelinestorage_writebehind import WriteBehindPipelineStorage
 from timothy.core import Pipeline
+from timothy.exceptions import PipelineConfigError
 
 
 def test_memory_pipeline_produces_pipeline_with_correct_attributes():
@@ -15,3 +30,194 @@ def test_json_pipeline_produces_pipeline_with_correct_attributes(tmp_path):
     assert isinstance(pipeline.stagerunner, DAGPipelineStageRunner)
     assert isinstance(pipeline.storage, JSONFilePipelineStorage)
     assert pipeline.storage.location == tmp_path
+
+
+def test_sqlite_pipeline_produces_pipeline_with_correct_attributes(tmp_path):
+    pipeline = sqlite_pipeline(Pipeline("a_pipeline"), tmp_path / "storage.sqlite")
+    assert isinstance(pipeline.stagerunner, DAGPipelineStageRunner)
+    assert isinstance(pipeline.storage, SQLitePipelineStorage)
+    assert pipeline.storage.location == tmp_path / "storage.sqlite"
+
+
+def test_json_pipeline_can_stream_rows_between_stages(tmp_path):
+    pipeline = json_pipeline(Pipeline("a_pipeline"), tmp_path)
+    pipeline.storage = JSONFilePipelineStorage(tmp_path, rows=["data", "filtered"])
+
+    @pipeline.register(returns=["filtered"])
+    def remove_odd(data: Iterable[int]) -> Iterator[int]:
+        return (n for n in data if n % 2 == 0)
+
+    @pipeline.register(returns=["total"])
+    def total(filtered: Iterable[int]) -> int:
+        return sum(filtered)
+
+    pipeline.set_values(data=range(10))
+    pipeline.run()
+
+    assert pipeline.get_values("total") == {"total": 0 + 2 + 4 + 6 + 8}
+    assert list(pipeline.get_values("filtered")["filtered"]) == [0, 2, 4, 6, 8]
+
+
+def test_json_pipeline_writes_generated_rows_without_materializing_them(tmp_path):
+    pipeline = json_pipeline(Pipeline("a_pipeline"), tmp_path)
+    pipeline.storage = JSONFilePipelineStorage(tmp_path, rows=["rows"])
+
+    @pipeline.register(returns=["rows"])
+    def read_rows(n_rows: int) -> Iterator[dict[str, int]]:
+        for i in range(n_rows):
+            yield {"id": i, "cost": i}
+
+    n_rows, max_peak_bytes = 20_000, 1_000_000
+    pipeline.set_values(n_rows=n_rows)
+    tracemalloc.start()
+    try:
+        pipeline.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak < max_peak_bytes
+    assert sum(1 for _ in pipeline.get_values("rows")["rows"]) == n_rows
+
+
+def test_pipeline_helpers_share_stages_and_leave_original_storage_alone():
+    pipeline = memory_pipeline(Pipeline("a_pipeline"))
+    pipeline.set_values(num1=1)
+
+    @pipeline.register(returns=["num2"])
+    def add_one(num1: int) -> int:
+        return num1 + 1
+
+    bound = memory_pipeline(pipeline)
+
+    assert bound.stages is pipeline.stages
+    assert bound.storage is not pipeline.storage
+    assert bound.get_values() == {}
+
+
+def test_concurrent_runs_with_run_ids_are_isolated():
+    pipeline = Pipeline("a_pipeline").bind(
+        storage=MemoryPipelineStorage(),
+        stagerunner=ThreadedDAGPipelineStageRunner(),
+    )
+
+    @pipeline.register(returns=["num2"])
+    def slow_square(num1: int) -> int:
+        time.sleep(0.01)
+        return num1**2
+
+    @pipeline.register(returns=["num3"])
+    def add_one(num2: int) -> int:
+        return num2 + 1
+
+    def run(i: int) -> None:
+        pipeline.run(run_id=f"run{i}", inputs={"num1": i})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(run, range(16)))
+
+    for i in range(16):
+        assert pipeline.get_values("num3", run_id=f"run{i}") == {"num3": i**2 + 1}
+
+
+def test_evicting_run_fails_before_any_stage_if_storage_cannot_delete():
+    pipeline = memory_pipeline(Pipeline("a_pipeline"))
+    pipeline.storage = AppendOnlyPipelineStorage()
+    calls: list[str] = []
+
+    @pipeline.register(returns=["num2"])
+    def square(num1: int) -> int:
+        calls.append("square")
+        return num1**2
+
+    @pipeline.register(returns=["num3"])
+    def add_one(num2: int) -> int:
+        calls.append("add_one")
+        return num2 + 1
+
+    pipeline.set_values(num1=3)
+    with pytest.raises(PipelineConfigError, match="cannot delete"):
+        pipeline.run(run_id="run1", evict=True)
+    assert calls == []
+
+
+def test_run_many_shares_invariant_stages_between_variations():
+    pipeline = memory_pipeline(Pipeline("a_pipeline"))
+    calls: list[int] = []
+
+    @pipeline.register(returns=["num3"])
+    def square_num1(num1: int) -> int:
+        calls.append(num1)
+        return num1**2
+
+    @pipeline.register(returns=["num4"])
+    def add_num2_and_num3(num2: int, num3: int) -> int:
+        return num2 + num3
+
+    inputs = [{"num1": 3, "num2": i} for i in range(10)]
+    report = pipeline.run_many(inputs, max_workers=4)
+
+    assert calls == [3]
+    assert len(report.runs) == len(inputs)
+    for i, run_id in enumerate(report.runs):
+        assert pipeline.get_values("num4", run_id=run_id) == {"num4": 9 + i}
+
+
+def test_run_many_ignores_stale_objects_in_reused_variation_namespaces():
+    pipeline = memory_pipeline(Pipeline("a_pipeline"))
+
+    @pipeline.register(returns=["total"])
+    def add(x: int, y: int) -> int:
+        return x + y
+
+    pipeline.run_many([{"x": 1, "y": 1}, {"x": 3, "y": 1}])
+    report = pipeline.run_many([{"x": 100, "y": 1}, {"x": 100, "y": 2}])
+
+    totals = [pipeline.get_values("total", run_id=run_id)["total"] for run_id in report.runs]
+    assert totals == [100 + 1, 100 + 2]
+
+
+def test_run_many_runs_storage_hooks_for_every_variation():
+    inner = MemoryPipelineStorage()
+    pipeline = Pipeline("a_pipeline").bind(
+        storage=WriteBehindPipelineStorage(inner),
+        stagerunner=ThreadedDAGPipelineStageRunner(),
+    )
+
+    @pipeline.register(returns=["num3"])
+    def square_num1(num1: int) -> int:
+        return num1**2
+
+    @pipeline.register(returns=["num4"])
+    def add_num2_and_num3(num2: int, num3: int) -> int:
+        return num2 + num3
+
+    report = pipeline.run_many([{"num1": 3, "num2": i} for i in range(4)], max_workers=4)
+
+    for i, run_id in enumerate(report.runs):
+        assert inner.fetch_one(f"{run_id}.num4") == 9 + i
+
+
+def test_streaming_pipeline_stores_only_materialized_objects():
+    pipeline = Pipeline("a_pipeline").bind(
+        storage=MemoryPipelineStorage(),
+        stagerunner=StreamingDAGPipelineStageRunner(queue_size=4),
+    )
+
+    @pipeline.register(returns=["rows"])
+    def read_rows(n_rows: int) -> Iterator[dict[str, int]]:
+        for i in range(n_rows):
+            yield {"id": i, "cost": i * 2}
+
+    @pipeline.register(returns=["costs"], streaming=True)
+    def select_costs(rows: Iterable[dict[str, int]]) -> Iterator[int]:
+        for row in rows:
+            yield row["cost"]
+
+    @pipeline.register(returns=["total_cost"], streaming=True)
+    def total_cost(costs: Iterable[int]) -> int:
+        return sum(costs)
+
+    pipeline.run(inputs={"n_rows": 1000})
+
+    assert pipeline.get_values() == {"n_rows": 1000, "total_cost": 999000}
@@ -1,15 +1,79 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from collections.abc import Iterable, Iterator
+
 import pytest
 
 from tests.stubs import StubPipelineStorage
-from timothy._pipelinestagerunner_impl import DAGPipelineStageRunner
+from timothy._pipelinestagerunner_impl import (
+    AsyncDAGPipelineStageRunner,
+    DAGPipelineStageRunner,
+    ProcessPoolDAGPipelineStageRunner,
+    StreamingDAGPipelineStageRunner,
+    ThreadedDAGPipelineStageRunner,
+)
+from timothy._pipelinestorage_impl import JSONFilePipelineStorage, MemoryPipelineStorage
+from timothy._stagecache_impl import FingerprintStageCache
 from timothy.core import (
+    ConsumerCountingEvictor,
+    HookedPipelineStageRunner,
+    PipelineHooks,
     PipelineStage,
+    PipelineStageRunner,
     PipelineStageSet,
+    StageTiming,
+    StorageAccess,
+    concatenate,
 )
-from timothy.exceptions import CannotRunPipelineError
+from timothy.exceptions import CannotRunPipelineError, UnpicklableStageError
+
+
+def square_num1_and_get_pid(num1: int) -> tuple[int, int]:
+    return num1**2, os.getpid()
+
+
+def square_nums_and_get_pids(nums: list[int]) -> list[tuple[int, int]]:
+    return [(num**2, os.getpid()) for num in nums]
+
+
+def add_one_to_num2_and_get_pid(num2: int) -> tuple[int, int]:
+    return num2 + 1, os.getpid()
+
 
+class RecordingHooks(PipelineHooks):
+    def __init__(self) -> None:
+        self.events: list[tuple[str, str]] = []
+        self.accesses: dict[tuple[str, str], StorageAccess] = {}
+        self.timings: dict[str, StageTiming] = {}
 
-class TestDAGPipelineStageRunner:
+    def on_run_start(self, stages, storage) -> None:
+        del stages, storage
+        self.events.append(("run_start", ""))
+
+    def on_stage_start(self, stage) -> None:
+        self.events.append(("stage_start", stage.name))
+
+    def on_fetch(self, stage, access) -> None:
+        self.events.append(("fetch", stage.name))
+        self.accesses["fetch", stage.name] = access
+
+    def on_store(self, stage, access) -> None:
+        self.events.append(("store", stage.name))
+        self.accesses["store", stage.name] = access
+
+    def on_stage_end(self, stage, timing) -> None:
+        self.events.append(("stage_end", stage.name))
+        self.timings[stage.name] = timing
+
+    def on_run_end(self) -> None:
+        self.events.append(("run_end", ""))
+
+
+class BaseTestAnyDAGPipelineStageRunner:
     @pytest.fixture()
     def runner_input_and_call_list(
         self,
@@ -32,8 +96,7 @@ class TestDAGPipelineStageRunner:
 
         return storage, stages, calls
 
-    def test_call_raises_if_stage_dependency_cycle_detected(self):
-        runner = DAGPipelineStageRunner()
+    def test_call_raises_if_stage_dependency_cycle_detected(self, runner: PipelineStageRunner):
         storage = StubPipelineStorage()
 
         def doubles_num1_to_get_num2(num1: int) -> int:
@@ -50,18 +113,709 @@ class TestDAGPipelineStageRunner:
         with pytest.raises(CannotRunPipelineError):
             runner(stages, storage)
 
-    def test_call_stagerunner_calls_stages_with_correct_arguments(self, runner_input_and_call_list):
-        runner = DAGPipelineStageRunner()
+    def test_call_stagerunner_calls_stages_with_correct_arguments(
+        self,
+        runner: PipelineStageRunner,
+        runner_input_and_call_list,
+    ):
         storage, stages, calls = runner_input_and_call_list
 
         runner(stages, storage)
 
         assert calls == [(123, "helloworld")]
 
-    def test_call_stagerunner_stores_return_value_in_storage(self, runner_input_and_call_list):
-        runner = DAGPipelineStageRunner()
+    def test_call_stagerunner_stores_return_value_in_storage(
+        self,
+        runner: PipelineStageRunner,
+        runner_input_and_call_list,
+    ):
         storage, stages, _ = runner_input_and_call_list
 
         runner(stages, storage)
 
         assert storage.fetch_one("str2") == "called with 123 and helloworld"
+
+    def test_call_stagerunner_runs_dependent_stages_in_order(self, runner: PipelineStageRunner):
+        storage = StubPipelineStorage()
+        storage.store_many(num1=3)
+
+        def square_num1(num1: int) -> int:
+            return num1**2
+
+        def add_one_to_num2(num2: int) -> int:
+            return num2 + 1
+
+        def double_num3(num3: int) -> int:
+            return num3 * 2
+
+        stages = PipelineStageSet(
+            PipelineStage(double_num3, ["num4"]),
+            PipelineStage(add_one_to_num2, ["num3"]),
+            PipelineStage(square_num1, ["num2"]),
+        )
+
+        runner(stages, storage)
+
+        assert storage.fetch_many("num2", "num3", "num4") == [9, 10, 20]
+
+    def test_call_propagates_stage_errors(self, runner: PipelineStageRunner):
+        storage = StubPipelineStorage()
+
+        def fails() -> int:
+            msg = "stage failed"
+            raise ValueError(msg)
+
+        with pytest.raises(ValueError, match="stage failed"):
+            runner(PipelineStageSet(PipelineStage(fails, ["num1"])), storage)
+
+    def test_hooks_are_called_and_can_evict_intermediates(
+        self,
+        runner: HookedPipelineStageRunner,
+    ):
+        storage = StubPipelineStorage()
+        storage.store_many(num1=3)
+
+        def square_num1(num1: int) -> int:
+            return num1**2
+
+        def add_one_to_num2(num2: int) -> int:
+            return num2 + 1
+
+        stages = PipelineStageSet(
+            PipelineStage(square_num1, ["num2"]),
+            PipelineStage(add_one_to_num2, ["num3"]),
+        )
+
+        runner(stages, storage, hooks=[ConsumerCountingEvictor()])
+
+        assert storage == {"num1": 3, "num3": 10}
+
+    def test_instrumentation_hooks_are_called_in_order(self, runner: HookedPipelineStageRunner):
+        storage = StubPipelineStorage()
+        storage.store_many(num1=3)
+        hooks = RecordingHooks()
+
+        def square_num1(num1: int) -> int:
+            return num1**2
+
+        runner(PipelineStageSet(PipelineStage(square_num1, ["num2"])), storage, hooks=[hooks])
+
+        assert hooks.events == [
+            ("run_start", ""),
+            ("stage_start", "square_num1"),
+            ("fetch", "square_num1"),
+            ("store", "square_num1"),
+            ("stage_end", "square_num1"),
+            ("run_end", ""),
+        ]
+        assert hooks.accesses["fetch", "square_num1"].names == ("num1",)
+        assert hooks.accesses["store", "square_num1"].names == ("num2",)
+        timing = hooks.timings["square_num1"]
+        assert timing.fetch == hooks.accesses["fetch", "square_num1"]
+        assert timing.store == hooks.accesses["store", "square_num1"]
+        assert timing.wall_seconds >= timing.compute_seconds >= 0
+        assert timing.cpu_seconds is not None
+        assert not timing.cached
+
+    def test_instrumentation_reports_raw_and_compressed_sizes(
+        self,
+        runner: HookedPipelineStageRunner,
+        tmp_path,
+    ):
+        storage = JSONFilePipelineStorage(tmp_path, codec="zlib")
+        storage.store_one("num1", 3)
+        hooks = RecordingHooks()
+
+        def repeat_num1(num1: int) -> list[int]:
+            return [num1] * 1000
+
+        runner(PipelineStageSet(PipelineStage(repeat_num1, ["nums"])), storage, hooks=[hooks])
+
+        access = hooks.accesses["store", "repeat_num1"]
+        assert access.raw_nbytes == len(json.dumps([3] * 1000))
+        assert access.nbytes is not None
+        assert access.nbytes < access.raw_nbytes
+
+    def test_storage_that_is_also_hooks_receives_hook_calls(self, runner: PipelineStageRunner):
+        class RecordingStorage(StubPipelineStorage, RecordingHooks):
+            def __init__(self) -> None:
+                StubPipelineStorage.__init__(self)
+                RecordingHooks.__init__(self)
+
+        storage = RecordingStorage()
+        storage.store_many(num1=3)
+
+        def square_num1(num1: int) -> int:
+            return num1**2
+
+        runner(PipelineStageSet(PipelineStage(square_num1, ["num2"])), storage)
+
+        assert ("stage_end", "square_num1") in storage.events
+        assert storage.events[-1] == ("run_end", "")
+
+    def test_cached_stages_are_skipped_if_inputs_unchanged_and_outputs_exist(
+        self,
+        cached_runner: PipelineStageRunner,
+    ):
+        storage = StubPipelineStorage()
+        storage.store_many(num1=3)
+        calls: list[int] = []
+
+        def square_num1(num1: int) -> int:
+            calls.append(num1)
+            return num1**2
+
+        stages = PipelineStageSet(PipelineStage(square_num1, ["num2"]))
+
+        cached_runner(stages, storage)
+        cached_runner(stages, storage)
+        storage.store_many(num1=4)
+        cached_runner(stages, storage)
+        del storage["num2"]
+        cached_runner(stages, storage)
+
+        assert calls == [3, 4, 4]
+        assert storage.fetch_many("num2") == [16]
+
+    def test_cached_stages_rerun_if_outputs_changed_or_storage_differs(
+        self,
+        cached_runner: PipelineStageRunner,
+    ):
+        storage = StubPipelineStorage()
+        storage.store_many(num1=3)
+        other_storage = StubPipelineStorage()
+        other_storage.store_many(num1=3, num2=0)
+        calls: list[int] = []
+
+        def square_num1(num1: int) -> int:
+            calls.append(num1)
+            return num1**2
+
+        stages = PipelineStageSet(PipelineStage(square_num1, ["num2"]))
+
+        cached_runner(stages, storage)
+        cached_runner(stages, other_storage)
+        storage.store_many(num2=100)
+        cached_runner(stages, storage)
+
+        assert calls == [3, 3, 3]
+        assert storage.fetch_many("num2") == other_storage.fetch_many("num2") == [9]
+
+    def test_map_stage_results_are_combined(self, runner: HookedPipelineStageRunner):
+        storage = StubPipelineStorage()
+        storage.store_many(nums=list(range(10)), offset=1)
+
+        def add_offset(nums: list[int], offset: int) -> list[int]:
+            return [num + offset for num in nums]
+
+        def total(shifted: list[int]) -> int:
+            return sum(shifted)
+
+        stages = PipelineStageSet(
+            PipelineStage(
+                add_offset,
+                ["shifted"],
+                map_over="nums",
+                partitions=3,
+                combine=concatenate,
+            ),
+            PipelineStage(total, ["total"], map_over="shifted", combine=sum),
+        )
+        hooks = RecordingHooks()
+        runner(stages, storage, hooks=[hooks])
+
+        assert storage.fetch_many("shifted", "total") == [list(range(1, 11)), 55]
+        assert set(hooks.timings) == {"add_offset", "total"}
+
+    def test_generator_stage_results_are_materialized(self, runner: PipelineStageRunner):
+        storage = StubPipelineStorage()
+        storage.store_many(num1=3)
+
+        def count_to_num1(num1: int) -> Iterator[int]:
+            yield from range(num1)
+
+        runner(PipelineStageSet(PipelineStage(count_to_num1, ["nums"])), storage)
+
+        assert storage.fetch_one("nums") == [0, 1, 2]
+
+
+class TestDAGPipelineStageRunner(BaseTestAnyDAGPipelineStageRunner):
+    @pytest.fixture()
+    def runner(self) -> DAGPipelineStageRunner:
+        return DAGPipelineStageRunner()
+
+    @pytest.fixture()
+    def cached_runner(self) -> DAGPipelineStageRunner:
+        return DAGPipelineStageRunner(cache=FingerprintStageCache(MemoryPipelineStorage()))
+
+
+class TestThreadedDAGPipelineStageRunner(BaseTestAnyDAGPipelineStageRunner):
+    @pytest.fixture()
+    def runner(self) -> ThreadedDAGPipelineStageRunner:
+        return ThreadedDAGPipelineStageRunner(max_workers=2)
+
+    @pytest.fixture()
+    def cached_runner(self) -> ThreadedDAGPipelineStageRunner:
+        return ThreadedDAGPipelineStageRunner(
+            max_workers=2,
+            cache=FingerprintStageCache(MemoryPipelineStorage()),
+        )
+
+    def test_stage_starts_when_own_inputs_ready_without_waiting_for_slow_sibling(
+        self,
+        runner: ThreadedDAGPipelineStageRunner,
+    ):
+        storage = StubPipelineStorage()
+        downstream_of_fast_ran = threading.Event()
+
+        def slow() -> bool:
+            return downstream_of_fast_ran.wait(timeout=5)
+
+        def fast() -> int:
+            return 1
+
+        def downstream_of_fast(fast_result: int) -> int:
+            downstream_of_fast_ran.set()
+            return fast_result + 1
+
+        stages = PipelineStageSet(
+            PipelineStage(slow, ["slow_result"]),
+            PipelineStage(fast, ["fast_result"]),
+            PipelineStage(downstream_of_fast, ["downstream_result"]),
+        )
+
+        runner(stages, storage)
+
+        assert storage.fetch_many("slow_result", "downstream_result") == [True, 2]
+
+    def test_map_stage_partitions_run_concurrently_on_workers(
+        self,
+        runner: ThreadedDAGPipelineStageRunner,
+    ):
+        storage = StubPipelineStorage()
+        storage.store_many(nums=[1, 2])
+        barrier = threading.Barrier(2, timeout=5)
+
+        def wait_for_other_partition(nums: list[int]) -> list[int]:
+            barrier.wait()
+            return nums
+
+        stages = PipelineStageSet(
+            PipelineStage(
+                wait_for_other_partition,
+                ["same"],
+                map_over="nums",
+                partitions=2,
+                combine=concatenate,
+            ),
+        )
+        runner(stages, storage)
+
+        assert storage.fetch_one("same") == [1, 2]
+
+    def test_map_stage_does_not_deadlock_single_worker(self):
+        runner = ThreadedDAGPipelineStageRunner(max_workers=1)
+        storage = StubPipelineStorage()
+        storage.store_many(nums=list(range(8)))
+
+        def same(nums: list[int]) -> list[int]:
+            return nums
+
+        stages = PipelineStageSet(
+            PipelineStage(same, ["same"], map_over="nums", partitions=4, combine=concatenate),
+        )
+        runner(stages, storage)
+
+        assert storage.fetch_one("same") == list(range(8))
+
+
+class TestProcessPoolDAGPipelineStageRunner(BaseTestAnyDAGPipelineStageRunner):
+    @pytest.fixture()
+    def runner(self) -> ProcessPoolDAGPipelineStageRunner:
+        return ProcessPoolDAGPipelineStageRunner(max_workers=2, default_run_in_process=False)
+
+    @pytest.fixture()
+    def cached_runner(self) -> ProcessPoolDAGPipelineStageRunner:
+        return ProcessPoolDAGPipelineStageRunner(
+            max_workers=2,
+            default_run_in_process=False,
+            cache=FingerprintStageCache(MemoryPipelineStorage()),
+        )
+
+    def test_stages_run_in_worker_processes_and_store_results_in_parent(self):
+        runner = ProcessPoolDAGPipelineStageRunner(max_workers=2)
+        storage = StubPipelineStorage()
+        storage.store_many(num1=3)
+
+        stages = PipelineStageSet(
+            PipelineStage(square_num1_and_get_pid, ["num2", "pid1"]),
+            PipelineStage(add_one_to_num2_and_get_pid, ["num3", "pid2"], params=["num2"]),
+        )
+
+        runner(stages, storage)
+
+        assert storage.fetch_many("num2", "num3") == [9, 10]
+        assert os.getpid() not in storage.fetch_many("pid1", "pid2")
+
+    def test_stage_can_opt_out_of_process_execution(self):
+        runner = ProcessPoolDAGPipelineStageRunner(max_workers=2)
+        storage = StubPipelineStorage()
+        storage.store_many(num1=3)
+
+        stages = PipelineStageSet(
+            PipelineStage(square_num1_and_get_pid, ["num2", "pid"], run_in_process=False),
+        )
+
+        runner(stages, storage)
+
+        assert storage.fetch_many("num2", "pid") == [9, os.getpid()]
+
+    def test_map_stage_partitions_run_in_worker_processes(self):
+        runner = ProcessPoolDAGPipelineStageRunner(max_workers=2)
+        storage = StubPipelineStorage()
+        storage.store_many(nums=[1, 2, 3, 4])
+
+        stages = PipelineStageSet(
+            PipelineStage(
+                square_nums_and_get_pids,
+                ["squares"],
+                map_over="nums",
+                partitions=2,
+                combine=concatenate,
+            ),
+        )
+        runner(stages, storage)
+
+        squares = storage.fetch_one("squares")
+        assert [square for square, _ in squares] == [1, 4, 9, 16]
+        assert os.getpid() not in {pid for _, pid in squares}
+
+    def test_call_raises_if_stage_function_cannot_be_pickled(self):
+        runner = ProcessPoolDAGPipelineStageRunner(max_workers=2)
+        storage = StubPipelineStorage()
+
+        def local_func() -> int:
+            return 1
+
+        with pytest.raises(UnpicklableStageError, match="local_func"):
+            runner(PipelineStageSet(PipelineStage(local_func, ["num1"])), storage)
+
+
+class TestAsyncDAGPipelineStageRunner(BaseTestAnyDAGPipelineStageRunner):
+    @pytest.fixture()
+    def runner(self) -> AsyncDAGPipelineStageRunner:
+        return AsyncDAGPipelineStageRunner(max_concurrency=2)
+
+    @pytest.fixture()
+    def cached_runner(self) -> AsyncDAGPipelineStageRunner:
+        return AsyncDAGPipelineStageRunner(
+            max_concurrency=2,
+            cache=FingerprintStageCache(MemoryPipelineStorage()),
+        )
+
+    def test_async_stages_are_awaited_and_results_stored(self, runner: AsyncDAGPipelineStageRunner):
+        storage = StubPipelineStorage()
+        storage.store_many(num1=3)
+
+        async def square_num1(num1: int) -> int:
+            await asyncio.sleep(0)
+            return num1**2
+
+        def add_one_to_num2(num2: int) -> int:
+            return num2 + 1
+
+        stages = PipelineStageSet(
+            PipelineStage(square_num1, ["num2"]),
+            PipelineStage(add_one_to_num2, ["num3"]),
+        )
+
+        runner(stages, storage)
+
+        assert storage.fetch_many("num2", "num3") == [9, 10]
+
+    def test_call_works_inside_running_event_loop(self, runner: AsyncDAGPipelineStageRunner):
+        storage = StubPipelineStorage()
+        storage.store_many(num1=3)
+
+        async def square_num1(num1: int) -> int:
+            await asyncio.sleep(0)
+            return num1**2
+
+        async def run_from_async_code() -> None:
+            runner(PipelineStageSet(PipelineStage(square_num1, ["num2"])), storage)
+
+        asyncio.run(run_from_async_code())
+
+        assert storage.fetch_many("num2") == [9]
+
+    def test_async_stages_run_concurrently(self, runner: AsyncDAGPipelineStageRunner):
+        storage = StubPipelineStorage()
+        first_started = asyncio.Event()
+        second_started = asyncio.Event()
+
+        async def first() -> bool:
+            first_started.set()
+            await asyncio.wait_for(second_started.wait(), timeout=5)
+            return True
+
+        async def second() -> bool:
+            second_started.set()
+            await asyncio.wait_for(first_started.wait(), timeout=5)
+            return True
+
+        stages = PipelineStageSet(
+            PipelineStage(first, ["first_result"]),
+            PipelineStage(second, ["second_result"]),
+        )
+
+        asyncio.run(runner.arun(stages, storage))
+
+        assert storage.fetch_many("first_result", "second_result") == [True, True]
+
+    def test_number_of_stages_in_flight_is_capped(self):
+        runner = AsyncDAGPipelineStageRunner(max_concurrency=2)
+        storage = StubPipelineStorage()
+        in_flight = 0
+        max_in_flight = 0
+
+        async def track() -> None:
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+        stages = PipelineStageSet(*(PipelineStage(track, [], name=f"track{i}") for i in range(6)))
+
+        runner(stages, storage)
+
+        assert max_in_flight == runner.max_concurrency
+
+
+class TestStreamingDAGPipelineStageRunner(BaseTestAnyDAGPipelineStageRunner):
+    @pytest.fixture()
+    def runner(self) -> StreamingDAGPipelineStageRunner:
+        return StreamingDAGPipelineStageRunner(max_workers=3, queue_size=2)
+
+    @pytest.fixture()
+    def cached_runner(self) -> StreamingDAGPipelineStageRunner:
+        return StreamingDAGPipelineStageRunner(
+            max_workers=2,
+            cache=FingerprintStageCache(MemoryPipelineStorage()),
+        )
+
+    def test_streamed_chunks_are_consumed_while_produced_in_bounded_memory(
+        self,
+        runner: StreamingDAGPipelineStageRunner,
+    ):
+        storage = StubPipelineStorage()
+        storage.store_many(n_rows=100)
+        produced = 0
+        max_ahead = 0
+
+        def read_rows(n_rows: int) -> Iterator[int]:
+            nonlocal produced
+            for row in range(n_rows):
+                produced += 1
+                yield row
+
+        def total(rows: Iterable[int]) -> int:
+            nonlocal max_ahead
+            result = 0
+            for consumed, row in enumerate(rows, start=1):
+                max_ahead = max(max_ahead, produced - consumed)
+                result += row
+            return result
+
+        stages = PipelineStageSet(
+            PipelineStage(read_rows, ["rows"]),
+            PipelineStage(total, ["total"], streaming=True),
+        )
+        hooks = RecordingHooks()
+        runner(stages, storage, hooks=[hooks])
+
+        assert storage.fetch_one("total") == sum(range(100))
+        assert "rows" not in storage
+        assert max_ahead <= runner.queue_size + 1
+        assert set(hooks.timings) == {"read_rows", "total"}
+
+    def test_streams_can_be_chained_and_materialized_for_whole_object_consumers(
+        self,
+        runner: StreamingDAGPipelineStageRunner,
+    ):
+        storage = StubPipelineStorage()
+        storage.store_many(n_rows=10)
+
+        def read_rows(n_rows: int) -> Iterator[int]:
+            yield from range(n_rows)
+
+        def double(rows: Iterable[int]) -> Iterator[int]:
+            for row in rows:
+                yield row * 2
+
+        def total(doubled: Iterable[int]) -> int:
+            return sum(doubled)
+
+        def last(doubled: list[int]) -> int:
+            return doubled[-1]
+
+        stages = PipelineStageSet(
+            PipelineStage(read_rows, ["rows"]),
+            PipelineStage(double, ["doubled"], streaming=True),
+            PipelineStage(total, ["total"], streaming=True),
+            PipelineStage(last, ["last"]),
+        )
+        runner(stages, storage)
+
+        assert storage.fetch_many("doubled", "total", "last") == [list(range(0, 20, 2)), 90, 18]
+        assert "rows" not in storage
+
+    def test_consumer_may_stop_reading_stream_early(self, runner: StreamingDAGPipelineStageRunner):
+        storage = StubPipelineStorage()
+
+        def endless() -> Iterator[int]:
+            yield from itertools.islice(itertools.count(), 1000)
+
+        def first_three(numbers: Iterable[int]) -> list[int]:
+            return list(itertools.islice(numbers, 3))
+
+        stages = PipelineStageSet(
+            PipelineStage(endless, ["numbers"]),
+            PipelineStage(first_three, ["first"], streaming=True),
+        )
+        runner(stages, storage)
+
+        assert storage.fetch_one("first") == [0, 1, 2]
+
+    def test_producer_errors_propagate_to_caller(self, runner: StreamingDAGPipelineStageRunner):
+        storage = StubPipelineStorage()
+
+        def failing() -> Iterator[int]:
+            yield 1
+            msg = "boom"
+            raise RuntimeError(msg)
+
+        def total(numbers: Iterable[int]) -> int:
+            return sum(numbers)
+
+        stages = PipelineStageSet(
+            PipelineStage(failing, ["numbers"]),
+            PipelineStage(total, ["total"], streaming=True),
+        )
+        with pytest.raises(RuntimeError, match="boom"):
+            runner(stages, storage)
+        assert "total" not in storage
+
+    def test_whole_object_dependency_inside_stream_group_is_rejected(
+        self,
+        runner: StreamingDAGPipelineStageRunner,
+    ):
+        def read_rows() -> Iterator[int]:
+            yield 1
+
+        def count(rows: Iterable[int]) -> int:
+            return sum(1 for _ in rows)
+
+        def scale(rows: Iterable[int], n_rows: int) -> list[float]:
+            return [row / n_rows for row in rows]
+
+        stages = PipelineStageSet(
+            PipelineStage(read_rows, ["rows"]),
+            PipelineStage(count, ["n_rows"], streaming=True),
+            PipelineStage(scale, ["scaled"], streaming=True),
+        )
+        with pytest.raises(CannotRunPipelineError):
+            runner(stages, StubPipelineStorage())
+
+    def test_consumer_errors_wake_a_blocked_producer(self, runner: StreamingDAGPipelineStageRunner):
+        def endless() -> Iterator[int]:
+            yield from itertools.count()
+
+        def failing(numbers: Iterable[int]) -> int:
+            next(iter(numbers))
+            msg = "boom"
+            raise RuntimeError(msg)
+
+        stages = PipelineStageSet(
+            PipelineStage(endless, ["numbers"]),
+            PipelineStage(failing, ["total"], streaming=True),
+        )
+        with pytest.raises(RuntimeError, match="boom"):
+            runner(stages, StubPipelineStorage())
+
+    def test_stream_group_threads_count_against_max_workers(self):
+        runner = StreamingDAGPipelineStageRunner(max_workers=2, queue_size=1)
+        storage = StubPipelineStorage()
+        lock = threading.Lock()
+        active = 0
+        max_active = 0
+
+        def track(delta: int) -> None:
+            nonlocal active, max_active
+            with lock:
+                active += delta
+                max_active = max(max_active, active)
+
+        def produce() -> Iterator[int]:
+            track(1)
+            try:
+                yield from range(10)
+            finally:
+                track(-1)
+
+        def total(numbers: Iterable[int]) -> int:
+            track(1)
+            try:
+                time.sleep(0.01)
+                return sum(numbers)
+            finally:
+                track(-1)
+
+        stages = PipelineStageSet(
+            *(PipelineStage(produce, [f"numbers{i}"], name=f"produce{i}") for i in range(3)),
+            *(
+                PipelineStage(
+                    total,
+                    [f"total{i}"],
+                    name=f"total{i}",
+                    params=[f"numbers{i}"],
+                    streaming=True,
+                )
+                for i in range(3)
+            ),
+        )
+        runner(stages, storage)
+
+        assert storage.fetch_many("total0", "total1", "total2") == [45, 45, 45]
+        assert max_active <= runner.max_workers
+
+    def test_stream_group_larger_than_max_workers_is_rejected(self):
+        def read_rows() -> Iterator[int]:
+            yield 1
+
+        def total(rows: Iterable[int]) -> int:
+            return sum(rows)
+
+        stages = PipelineStageSet(
+            PipelineStage(read_rows, ["rows"]),
+            PipelineStage(total, ["total"], streaming=True),
+        )
+        with pytest.raises(CannotRunPipelineError, match="max_workers"):
+            StreamingDAGPipelineStageRunner(max_workers=1)(stages, StubPipelineStorage())
+
+    def test_stream_groups_cannot_be_cached(
+        self,
+        cached_runner: StreamingDAGPipelineStageRunner,
+    ):
+        def read_rows() -> Iterator[int]:
+            yield 1
+
+        def total(rows: Iterable[int]) -> int:
+            return sum(rows)
+
+        stages = PipelineStageSet(
+            PipelineStage(read_rows, ["rows"]),
+            PipelineStage(total, ["total"], streaming=True),
+        )
+        with pytest.raises(CannotRunPipelineError, match="cached"):
+            cached_runner(stages, StubPipelineStorage())
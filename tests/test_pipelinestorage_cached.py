@@ -0,0 +1,157 @@
+import pytest
+
+from tests.stubs import AppendOnlyPipelineStorage, StubPipelineStorage
+from tests.test_pipelinestorage_impl import BaseTestAnyPipelineStorage
+from timothy._pipelinestagerunner_impl import DAGPipelineStageRunner
+from timothy._pipelinestorage_cached import CachedPipelineStorage, approximate_nbytes
+from timothy._pipelinestorage_impl import JSONFilePipelineStorage, MemoryPipelineStorage
+from timothy.core import DeletablePipelineStorage, PipelineStage, PipelineStageSet
+
+
+class CountingPipelineStorage(MemoryPipelineStorage):
+    def __init__(self) -> None:
+        super().__init__()
+        self.fetched: list[str] = []
+        self.stored: list[str] = []
+
+    def fetch_one(self, name: str) -> object:
+        self.fetched.append(name)
+        return super().fetch_one(name)
+
+    def store_many(self, **name_to_obj_map: object) -> None:
+        self.stored.extend(name_to_obj_map)
+        super().store_many(**name_to_obj_map)
+
+
+class TestWriteThroughCachedPipelineStorage(BaseTestAnyPipelineStorage[CachedPipelineStorage]):
+    @pytest.fixture()
+    def empty_storage(self, tmp_path) -> CachedPipelineStorage:
+        return CachedPipelineStorage(JSONFilePipelineStorage(tmp_path), max_bytes=10_000)
+
+    def test_stores_reach_inner_storage_immediately(self, empty_storage: CachedPipelineStorage):
+        empty_storage.store_one("name", [1, 2])
+        assert empty_storage.inner.fetch_one("name") == [1, 2]
+
+    def test_nbytes_is_delegated_to_inner_storage(self, empty_storage: CachedPipelineStorage):
+        empty_storage.store_one("name", [1, 2])
+        assert empty_storage.nbytes("name") == len("[1, 2]")
+
+
+class TestWriteBackCachedPipelineStorage(BaseTestAnyPipelineStorage[CachedPipelineStorage]):
+    @pytest.fixture()
+    def empty_storage(self) -> CachedPipelineStorage:
+        return CachedPipelineStorage(StubPipelineStorage(), max_bytes=10_000, mode="write-back")
+
+    def test_stores_reach_inner_storage_on_flush(self, empty_storage: CachedPipelineStorage):
+        empty_storage.store_one("name", [1, 2])
+        assert "name" not in empty_storage.inner.list_names()
+        empty_storage.flush()
+        assert empty_storage.inner.fetch_one("name") == [1, 2]
+
+    def test_dirty_objects_are_written_when_evicted(self):
+        inner = StubPipelineStorage()
+        storage = CachedPipelineStorage(inner, max_bytes=approximate_nbytes("a"), mode="write-back")
+        storage.store_one("name1", "a")
+        storage.store_one("name2", "b")
+        assert inner == {"name1": "a"}
+        assert storage.fetch_many("name1", "name2") == ["a", "b"]
+
+    def test_deleted_dirty_objects_are_never_written(self, empty_storage: CachedPipelineStorage):
+        assert isinstance(empty_storage, DeletablePipelineStorage)
+        empty_storage.store_one("name", 1)
+        empty_storage.delete_one("name")
+        empty_storage.flush()
+        assert list(empty_storage.inner.list_names()) == []
+
+
+class TestCachedPipelineStorage:
+    def test_repeated_fetches_read_inner_storage_once(self):
+        inner = CountingPipelineStorage()
+        inner.store_one("name", [1, 2, 3])
+        storage = CachedPipelineStorage(inner, max_bytes=10_000)
+
+        for _ in range(5):
+            assert storage.fetch_one("name") == [1, 2, 3]
+
+        assert inner.fetched == ["name"]
+        assert (storage.stats.hits, storage.stats.misses) == (4, 1)
+        assert storage.stats.hit_rate == pytest.approx(0.8)
+
+    def test_least_recently_used_object_is_evicted_first(self):
+        inner = CountingPipelineStorage()
+        storage = CachedPipelineStorage(inner, max_bytes=2 * approximate_nbytes("a"))
+        storage.store_many(name1="a", name2="b")
+        storage.fetch_one("name1")
+        storage.store_one("name3", "c")
+        inner.fetched.clear()
+
+        storage.fetch_many("name1", "name2", "name3")
+
+        assert inner.fetched == ["name2"]
+        assert (storage.stats.misses, storage.stats.evictions) == (1, 2)
+
+    def test_first_in_object_is_evicted_first_with_fifo_policy(self):
+        inner = CountingPipelineStorage()
+        storage = CachedPipelineStorage(inner, max_bytes=2 * approximate_nbytes("a"), policy="fifo")
+        storage.store_many(name1="a", name2="b")
+        storage.fetch_one("name1")
+        storage.store_one("name3", "c")
+        inner.fetched.clear()
+
+        storage.fetch_many("name2", "name3")
+
+        assert inner.fetched == []
+
+    def test_objects_larger_than_cache_are_not_cached(self):
+        inner = CountingPipelineStorage()
+        storage = CachedPipelineStorage(inner, max_bytes=10)
+        storage.store_one("name", "a" * 100)
+        storage.fetch_one("name")
+        storage.fetch_one("name")
+        assert inner.fetched == ["name", "name"]
+        assert storage.stats.nbytes == 0
+
+    def test_unknown_policy_is_rejected(self):
+        with pytest.raises(ValueError, match="policy"):
+            CachedPipelineStorage(
+                StubPipelineStorage(),
+                max_bytes=1,
+                policy="mru",  # type: ignore[arg-type]
+            )
+
+    def test_is_deletable_only_if_inner_storage_is_deletable(self):
+        deletable = CachedPipelineStorage(StubPipelineStorage(), max_bytes=1)
+        assert isinstance(deletable, DeletablePipelineStorage)
+        append_only = CachedPipelineStorage(AppendOnlyPipelineStorage(), max_bytes=1)
+        assert not isinstance(append_only, DeletablePipelineStorage)
+
+    def test_approximate_nbytes_grows_with_contents(self):
+        assert approximate_nbytes({"a": [1, 2, 3]}) > approximate_nbytes({"a": []})
+
+    def test_cached_objects_are_shared_by_default(self):
+        storage = CachedPipelineStorage(StubPipelineStorage(), max_bytes=10_000)
+        obj = [1, 2]
+        storage.store_one("name", obj)
+        assert storage.fetch_one("name") is obj
+
+    def test_fetched_objects_are_copies_when_sharing_is_disabled(self):
+        storage = CachedPipelineStorage(
+            StubPipelineStorage(),
+            max_bytes=10_000,
+            share_objects=False,
+        )
+        storage.store_one("name", [1, 2])
+        storage.fetch_one("name").append(3)
+        assert storage.fetch_one("name") == [1, 2]
+
+    def test_write_back_objects_are_flushed_when_a_run_ends(self):
+        inner = StubPipelineStorage()
+        inner.store_many(num1=3)
+        storage = CachedPipelineStorage(inner, max_bytes=10_000, mode="write-back")
+
+        def square_num1(num1: int) -> int:
+            return num1**2
+
+        DAGPipelineStageRunner()(PipelineStageSet(PipelineStage(square_num1, ["num2"])), storage)
+
+        assert inner == {"num1": 3, "num2": 9}
@@ -0,0 +1,103 @@
+import os
+import threading
+
+import pytest
+
+from tests.test_pipelinestorage_impl import BaseTestAnyPipelineStorage
+from timothy._filelock import file_lock
+from timothy._pipelinestorage_cas import ContentAddressedPipelineStorage, main
+
+
+def _blob_count(storage: ContentAddressedPipelineStorage) -> int:
+    return len(list((storage.root / "blobs").glob("*/*.json")))
+
+
+class TestContentAddressedPipelineStorage(
+    BaseTestAnyPipelineStorage[ContentAddressedPipelineStorage],
+):
+    @pytest.fixture()
+    def empty_storage(self, tmp_path) -> ContentAddressedPipelineStorage:
+        return ContentAddressedPipelineStorage(tmp_path)
+
+    def test_identical_objects_are_stored_once(
+        self,
+        empty_storage: ContentAddressedPipelineStorage,
+    ):
+        empty_storage.store_many(name1=[1, 2], name2=[1, 2], name3=[3])
+        assert empty_storage.digest("name1") == empty_storage.digest("name2")
+        assert _blob_count(empty_storage) == len({"[1, 2]", "[3]"})
+
+    def test_namespaces_share_blobs_but_not_names(
+        self,
+        empty_storage: ContentAddressedPipelineStorage,
+    ):
+        other = ContentAddressedPipelineStorage(empty_storage.root, namespace="other")
+        empty_storage.store_one("name1", [1, 2])
+        other.store_one("name2", [1, 2])
+        assert list(empty_storage.list_names()) == ["name1"]
+        assert list(other.list_names()) == ["name2"]
+        assert _blob_count(empty_storage) == 1
+        assert empty_storage.refcounts() == {empty_storage.digest("name1"): 2}
+
+    def test_name_can_be_linked_to_existing_blob(
+        self,
+        empty_storage: ContentAddressedPipelineStorage,
+    ):
+        empty_storage.store_one("name1", {"a": 1})
+        empty_storage.link("name2", empty_storage.digest("name1"))
+        assert empty_storage.fetch_one("name2") == {"a": 1}
+        with pytest.raises(KeyError):
+            empty_storage.link("name3", "0" * 64)
+
+    def test_garbage_collection_removes_only_unreferenced_blobs(
+        self,
+        empty_storage: ContentAddressedPipelineStorage,
+    ):
+        empty_storage.store_many(name1=[1], name2=[2], name3=[1])
+        empty_storage.delete_many("name1", "name2")
+
+        assert empty_storage.collect_garbage(min_age_seconds=0) == 1
+        assert _blob_count(empty_storage) == 1
+        assert empty_storage.fetch_one("name3") == [1]
+
+    def test_garbage_collection_spares_recent_blobs(
+        self,
+        empty_storage: ContentAddressedPipelineStorage,
+    ):
+        empty_storage.store_one("name", [1])
+        blob_path = next((empty_storage.root / "blobs").glob("*/*.json"))
+        empty_storage.delete_one("name")
+        assert empty_storage.collect_garbage() == 0
+
+        os.utime(blob_path, (0, 0))
+        assert empty_storage.collect_garbage() == 1
+
+    def test_garbage_collection_waits_for_stores_in_progress(
+        self,
+        empty_storage: ContentAddressedPipelineStorage,
+    ):
+        empty_storage.store_one("name", [1])
+        empty_storage.delete_one("name")
+        collected: list[int] = []
+        collector = threading.Thread(
+            target=lambda: collected.append(empty_storage.collect_garbage(min_age_seconds=0)),
+        )
+
+        with file_lock(empty_storage.root / ".lock", shared=True):
+            collector.start()
+            collector.join(timeout=0.1)
+            assert collector.is_alive()
+        collector.join()
+
+        assert collected == [1]
+
+    def test_command_line_collects_garbage(
+        self,
+        empty_storage: ContentAddressedPipelineStorage,
+        capsys,
+    ):
+        empty_storage.store_one("name", [1])
+        empty_storage.delete_one("name")
+        main([str(empty_storage.root), "--min-age-seconds", "0"])
+        assert capsys.readouterr().out == "Removed 1 unreferenced blobs\n"
+        assert _blob_count(empty_storage) == 0
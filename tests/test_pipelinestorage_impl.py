@@ -1,10 +1,23 @@
 import json
+import threading
 from typing import Generic, TypeVar
 
 import pytest
 
-from timothy._pipelinestorage_impl import JSONFilePipelineStorage, MemoryPipelineStorage
-from timothy.core import PipelineStorage
+from timothy._codecs import Codec
+from timothy._pipelinestorage_impl import (
+    JSONFilePipelineStorage,
+    MemoryPipelineStorage,
+    RowStream,
+)
+from timothy.core import (
+    DeletablePipelineStorage,
+    LazyPipelineStorage,
+    NamespacedPipelineStorage,
+    OverlayPipelineStorage,
+    PipelineStorage,
+)
+from timothy.exceptions import StaleRowStreamError
 
 _Storage = TypeVar("_Storage", bound=PipelineStorage)
 
@@ -35,6 +48,12 @@ class BaseTestAnyPipelineStorage(Generic[_Storage]):
         empty_storage.store_many(name1=obj1, name2=obj2)
         assert list(empty_storage.fetch_many("name1", "name2")) == [obj1, obj2]
 
+    def test_deleted_objs_are_no_longer_listed(self, empty_storage: DeletablePipelineStorage):
+        empty_storage.store_many(name1="hello", name2="world", name3="!")
+        empty_storage.delete_one("name1")
+        empty_storage.delete_many("name3", "name4")
+        assert list(empty_storage.list_names()) == ["name2"]
+
     def test_list_names_correctly_lists_names(self, empty_storage: PipelineStorage):
         obj1 = "hello"
         obj2 = "world"
@@ -59,3 +78,285 @@ class TestJSONFilePipelineStorage(BaseTestAnyPipelineStorage[JSONFilePipelineSto
         with (empty_storage.location / "name.json").open("r") as f:
             stored = json.load(f)
         assert stored == obj
+
+    def test_nbytes_is_total_size_of_stored_files(self, empty_storage: JSONFilePipelineStorage):
+        empty_storage.store_many(name1="hello", name2=[1, 2])
+        assert empty_storage.nbytes("name1", "name2") == len('"hello"') + len("[1, 2]")
+        assert empty_storage.nbytes("name1", "name3") is None
+
+    def test_failed_write_leaves_previous_file_intact(self, empty_storage: JSONFilePipelineStorage):
+        empty_storage.store_one("name", [1, 2])
+        with pytest.raises(TypeError):
+            empty_storage.store_one("name", [3, object()])
+        assert empty_storage.fetch_one("name") == [1, 2]
+        assert list(empty_storage.location.glob("*.tmp")) == []
+
+    def test_failed_first_write_is_not_listed(self, empty_storage: JSONFilePipelineStorage):
+        with pytest.raises(TypeError):
+            empty_storage.store_one("name", object())
+        assert list(empty_storage.list_names()) == []
+
+    def test_externally_placed_files_are_indexed_on_reindex(
+        self,
+        empty_storage: JSONFilePipelineStorage,
+    ):
+        empty_storage.store_one("name", 1)
+        (empty_storage.location / "external.json").write_text("[2]")
+        (empty_storage.location / "notes.txt").write_text("hello")
+        assert empty_storage.nbytes("external") == len("[2]")
+        reopened = JSONFilePipelineStorage(empty_storage.location)
+        assert list(reopened.list_names()) == ["name"]
+        reopened.reindex()
+        assert list(reopened.list_names()) == ["external", "name"]
+        assert list(JSONFilePipelineStorage(empty_storage.location).list_names()) == [
+            "external",
+            "name",
+        ]
+
+    def test_names_stored_by_another_instance_are_listed(
+        self,
+        empty_storage: JSONFilePipelineStorage,
+    ):
+        empty_storage.store_one("name1", 1)
+        assert list(empty_storage.list_names()) == ["name1"]
+        JSONFilePipelineStorage(empty_storage.location).store_one("name2", 2)
+        assert list(empty_storage.list_names()) == ["name1", "name2"]
+
+    def test_existing_files_are_indexed_when_there_is_no_manifest(self, tmp_path):
+        (tmp_path / "name1.json").write_text("1")
+        (tmp_path / "name2.json").write_text("[2]")
+        storage = JSONFilePipelineStorage(tmp_path)
+        assert list(storage.list_names()) == ["name1", "name2"]
+        assert storage.nbytes("name1", "name2") == len("1") + len("[2]")
+
+    def test_manifest_records_size_and_time_of_stored_objects(
+        self,
+        empty_storage: JSONFilePipelineStorage,
+    ):
+        empty_storage.store_one("name", [1, 2])
+        entry = empty_storage.manifest["name"]
+        assert entry.nbytes == len("[1, 2]")
+        assert entry.stored_at > 0
+
+    def test_compacting_manifest_keeps_names(self, empty_storage: JSONFilePipelineStorage):
+        for i in range(5):
+            empty_storage.store_one("name1", i)
+        empty_storage.store_one("name2", 2)
+        empty_storage.delete_one("name2")
+        empty_storage.compact_manifest()
+        manifest_lines = (empty_storage.location / ".manifest.jsonl").read_text().splitlines()
+        assert [json.loads(line).get("name") for line in manifest_lines] == [None, "name1"]
+        assert list(JSONFilePipelineStorage(empty_storage.location).list_names()) == ["name1"]
+
+    def test_reading_does_not_modify_manifest(self, empty_storage: JSONFilePipelineStorage):
+        empty_storage.store_one("name", 1)
+        manifest_path = empty_storage.location / ".manifest.jsonl"
+        with manifest_path.open("a") as f:
+            f.write('{"name": "na')
+        before = manifest_path.read_bytes()
+        reopened = JSONFilePipelineStorage(empty_storage.location)
+        assert list(reopened.list_names()) == ["name"]
+        assert reopened.nbytes("name") == 1
+        assert manifest_path.read_bytes() == before
+
+    def test_concurrent_appends_survive_compaction(self, empty_storage: JSONFilePipelineStorage):
+        n_threads, n_names = 4, 20
+
+        def store(i: int) -> None:
+            storage = JSONFilePipelineStorage(empty_storage.location)
+            for j in range(n_names):
+                storage.store_one(f"name{i}_{j}", j)
+                if j % 5 == 0:
+                    storage.compact_manifest()
+
+        threads = [threading.Thread(target=store, args=(i,)) for i in range(n_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        manifest_lines = (empty_storage.location / ".manifest.jsonl").read_text().splitlines()
+        recorded = {record["name"] for record in map(json.loads, manifest_lines[1:])}
+        assert len(recorded) == n_threads * n_names
+
+    def test_truncated_manifest_line_is_ignored(self, empty_storage: JSONFilePipelineStorage):
+        empty_storage.store_one("name1", 1)
+        with (empty_storage.location / ".manifest.jsonl").open("a") as f:
+            f.write('{"name": "na')
+        reopened = JSONFilePipelineStorage(empty_storage.location)
+        reopened.store_one("name2", 2)
+        assert list(JSONFilePipelineStorage(empty_storage.location).list_names()) == [
+            "name1",
+            "name2",
+        ]
+
+
+class TestShardedJSONFilePipelineStorage(BaseTestAnyPipelineStorage[JSONFilePipelineStorage]):
+    @pytest.fixture()
+    def empty_storage(self, tmp_path) -> JSONFilePipelineStorage:
+        return JSONFilePipelineStorage(tmp_path, shard_depth=2)
+
+    def test_files_are_stored_in_shard_subdirectories(
+        self,
+        empty_storage: JSONFilePipelineStorage,
+    ):
+        empty_storage.store_one("name", 1)
+        (path,) = empty_storage.location.glob("*/*/name.json")
+        assert [len(path.parent.name), len(path.parent.parent.name)] == [2, 2]
+
+    def test_reopening_with_different_shard_depth_raises(
+        self,
+        empty_storage: JSONFilePipelineStorage,
+    ):
+        empty_storage.store_one("name", 1)
+        with pytest.raises(ValueError, match="shard_depth"):
+            JSONFilePipelineStorage(empty_storage.location).list_names()
+
+
+class TestCompressedJSONFilePipelineStorage(BaseTestAnyPipelineStorage[JSONFilePipelineStorage]):
+    @pytest.fixture()
+    def empty_storage(self, tmp_path) -> JSONFilePipelineStorage:
+        return JSONFilePipelineStorage(tmp_path, codec=Codec("zlib", level=9))
+
+    def test_files_are_compressed(self, empty_storage: JSONFilePipelineStorage):
+        obj = ["row"] * 1000
+        empty_storage.store_one("name", obj)
+        raw_nbytes = len(json.dumps(obj))
+        assert empty_storage.raw_nbytes("name") == raw_nbytes
+        nbytes = (empty_storage.location / "name.json").stat().st_size
+        assert empty_storage.nbytes("name") == nbytes
+        assert nbytes < raw_nbytes
+
+    def test_codec_is_chosen_by_name_inside_a_namespace(self, tmp_path):
+        storage = JSONFilePipelineStorage(tmp_path, codecs={"big": "lzma"})
+        NamespacedPipelineStorage(storage, "r1").store_one("big", [1, 2])
+        storage.store_one("big", [1, 2])
+        assert storage.codec_for("r1.big") == storage.codec_for("big")
+        assert (tmp_path / "r1.big.json").read_bytes() == (tmp_path / "big.json").read_bytes()
+        assert (tmp_path / "big.json").read_bytes() != b"[1, 2]"
+
+    def test_codec_can_be_chosen_per_name(self, tmp_path):
+        storage = JSONFilePipelineStorage(tmp_path, codec="lzma", codecs={"plain": "none"})
+        storage.store_many(plain=[1, 2], packed=[1, 2])
+        assert (tmp_path / "plain.json").read_text() == "[1, 2]"
+        assert (tmp_path / "packed.json").read_bytes().startswith(b"\xfd7zXZ")
+
+    def test_codec_is_detected_on_read(self, empty_storage: JSONFilePipelineStorage):
+        empty_storage.store_one("name", {"hello": "world"})
+        reader = JSONFilePipelineStorage(empty_storage.location, codec="bz2")
+        assert reader.fetch_one("name") == {"hello": "world"}
+
+
+class TestRowsJSONFilePipelineStorage:
+    @pytest.fixture()
+    def storage(self, tmp_path) -> JSONFilePipelineStorage:
+        return JSONFilePipelineStorage(tmp_path, rows=["rows"])
+
+    def test_rows_are_written_as_json_lines(self, storage: JSONFilePipelineStorage):
+        storage.store_one("rows", ({"n": i} for i in range(3)))
+        lines = (storage.location / "rows.jsonl").read_text().splitlines()
+        assert lines == ['{"n": 0}', '{"n": 1}', '{"n": 2}']
+        assert list(storage.list_names()) == ["rows"]
+
+    def test_fetched_rows_are_a_lazy_reiterable_stream(self, storage: JSONFilePipelineStorage):
+        storage.store_one("rows", [{"n": 1}, {"n": 2}])
+        stream = storage.fetch_one("rows")
+        assert isinstance(stream, RowStream)
+        rows = [{"n": 1}, {"n": 2}]
+        assert list(stream) == rows
+        assert list(stream) == rows
+        assert len(stream) == len(rows)
+
+    def test_streams_can_be_stored_again(self, storage: JSONFilePipelineStorage, tmp_path):
+        storage.store_one("rows", [1, 2, 3])
+        other = JSONFilePipelineStorage(tmp_path / "other", rows=["rows"])
+        stream = storage.fetch_one("rows")
+        assert isinstance(stream, RowStream)
+        kept = [1, 3]
+        other.store_one("rows", (n for n in stream if n in kept))
+        fetched = other.fetch_one("rows")
+        assert isinstance(fetched, RowStream)
+        assert list(fetched) == kept
+
+    def test_overwritten_rows_are_not_read_through_old_streams(
+        self,
+        storage: JSONFilePipelineStorage,
+    ):
+        storage.store_one("rows", [1, 2])
+        stream = storage.fetch_one("rows")
+        assert isinstance(stream, RowStream)
+        storage.store_one("rows", [3])
+        with pytest.raises(StaleRowStreamError, match="overwritten"):
+            list(stream)
+        with pytest.raises(StaleRowStreamError, match="overwritten"):
+            len(stream)
+
+    def test_deleted_rows_are_not_read_through_old_streams(
+        self,
+        storage: JSONFilePipelineStorage,
+    ):
+        storage.store_one("rows", [1, 2])
+        stream = storage.fetch_one("rows")
+        assert isinstance(stream, RowStream)
+        storage.delete_one("rows")
+        with pytest.raises(StaleRowStreamError, match="deleted"):
+            list(stream)
+
+    def test_started_iteration_keeps_reading_fetched_rows(
+        self,
+        storage: JSONFilePipelineStorage,
+    ):
+        storage.store_one("rows", [1, 2])
+        stream = storage.fetch_one("rows")
+        assert isinstance(stream, RowStream)
+        rows = iter(stream)
+        first = next(rows)
+        storage.store_one("rows", [3])
+        assert [first, *rows] == [1, 2]
+
+    def test_other_names_are_stored_as_plain_json(self, storage: JSONFilePipelineStorage):
+        storage.store_many(rows=[1], other=[2])
+        assert storage.fetch_one("other") == [2]
+        assert (storage.location / "other.json").exists()
+
+    def test_non_iterable_rows_are_rejected(self, storage: JSONFilePipelineStorage):
+        with pytest.raises(TypeError, match="rows"):
+            storage.store_one("rows", {"n": 1})
+        assert list(storage.list_names()) == []
+
+    def test_json_lines_files_are_only_indexed_for_rows_names(self, tmp_path):
+        (tmp_path / "rows.jsonl").write_text("1\n")
+        (tmp_path / "other.jsonl").write_text("2\n")
+        (tmp_path / "rows.json").write_text("[3]")
+        storage = JSONFilePipelineStorage(tmp_path, rows=["rows"])
+        assert list(storage.list_names()) == ["rows"]
+        assert storage.nbytes("rows") == len("1\n")
+
+    def test_namespaced_rows_names_are_stored_as_rows(self, storage: JSONFilePipelineStorage):
+        NamespacedPipelineStorage(storage, "run1").store_one("rows", [1, 2])
+        assert (storage.location / "run1.rows.jsonl").read_text() == "1\n2\n"
+        stream = NamespacedPipelineStorage(storage, "run1").fetch_one("rows")
+        assert isinstance(stream, RowStream)
+        assert list(stream) == [1, 2]
+
+    def test_nested_namespaced_rows_names_are_stored_as_rows(
+        self,
+        storage: JSONFilePipelineStorage,
+    ):
+        inner = NamespacedPipelineStorage(storage, "run1")
+        NamespacedPipelineStorage(inner, "part1").store_one("rows", [1, 2])
+        assert (storage.location / "run1.part1.rows.jsonl").read_text() == "1\n2\n"
+
+    def test_unnamespaced_dotted_names_are_not_rows(self, storage: JSONFilePipelineStorage):
+        storage.store_one("other.rows", [1, 2])
+        assert storage.fetch_one("other.rows") == [1, 2]
+        assert (storage.location / "other.rows.json").exists()
+
+    def test_only_rows_names_are_stored_lazily(self, storage: JSONFilePipelineStorage):
+        namespaced = NamespacedPipelineStorage(storage, "run1")
+        overlay = OverlayPipelineStorage(namespaced, MemoryPipelineStorage())
+        lazy_storages: tuple[LazyPipelineStorage, ...] = (storage, namespaced, overlay)
+        for lazy_storage in lazy_storages:
+            assert lazy_storage.stores_lazily("rows")
+            assert not lazy_storage.stores_lazily("other")
+        assert not OverlayPipelineStorage(MemoryPipelineStorage(), storage).stores_lazily("rows")
@@ -0,0 +1,67 @@
+import array
+
+import pytest
+
+from tests.test_pipelinestorage_impl import BaseTestAnyPipelineStorage
+from timothy._pipelinestorage_pickle import PicklePipelineStorage
+
+
+class TestPicklePipelineStorage(BaseTestAnyPipelineStorage[PicklePipelineStorage]):
+    @pytest.fixture()
+    def empty_storage(self, tmp_path) -> PicklePipelineStorage:
+        return PicklePipelineStorage(tmp_path, min_buffer_bytes=16)
+
+    def test_arbitrary_python_objects_round_trip(self, empty_storage: PicklePipelineStorage):
+        obj = {"tuple": (1, 2), "set": {3}, "bytes": b"\x00\x01"}
+        empty_storage.store_one("name", obj)
+        assert empty_storage.fetch_one("name") == obj
+
+    def test_large_buffers_are_stored_in_sidecar_files(self, empty_storage: PicklePipelineStorage):
+        empty_storage.store_one("name", {"large": b"x" * 100, "small": b"y"})
+        assert len(list((empty_storage.location / "name.buffers").iterdir())) == 1
+
+    @pytest.mark.parametrize(
+        "obj",
+        [
+            b"x" * 100,
+            bytearray(b"x" * 100),
+            array.array("d", range(100)),
+        ],
+    )
+    def test_large_buffers_round_trip_with_their_type(
+        self,
+        empty_storage: PicklePipelineStorage,
+        obj: bytes | bytearray | array.array,
+    ):
+        empty_storage.store_one("name", obj)
+        fetched = empty_storage.fetch_one("name")
+        assert type(fetched) is type(obj)
+        assert fetched == obj
+
+    def test_memoryviews_are_mapped_from_their_sidecar_file(
+        self,
+        empty_storage: PicklePipelineStorage,
+    ):
+        view = memoryview(array.array("i", range(100)))
+        empty_storage.store_one("name", view)
+        fetched = empty_storage.fetch_one("name")
+        assert isinstance(fetched, memoryview)
+        assert fetched.format == "i"
+        assert fetched.tolist() == view.tolist()
+
+    def test_storing_again_replaces_old_sidecar_files(self, empty_storage: PicklePipelineStorage):
+        empty_storage.store_one("name", [b"x" * 100, b"y" * 100])
+        empty_storage.store_one("name", "small")
+        assert empty_storage.fetch_one("name") == "small"
+        assert not (empty_storage.location / "name.buffers").exists()
+
+    def test_deleting_removes_sidecar_files(self, empty_storage: PicklePipelineStorage):
+        empty_storage.store_one("name", b"x" * 100)
+        empty_storage.delete_one("name")
+        assert list(empty_storage.location.iterdir()) == []
+
+    def test_nbytes_includes_sidecar_files(self, empty_storage: PicklePipelineStorage):
+        data = b"x" * 100
+        empty_storage.store_one("name", data)
+        assert (empty_storage.nbytes("name") or 0) > len(data)
+        assert empty_storage.nbytes("name", "missing") is None
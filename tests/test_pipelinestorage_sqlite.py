@@ -0,0 +1,75 @@
+import gc
+import threading
+
+import pytest
+
+from tests.test_pipelinestorage_impl import BaseTestAnyPipelineStorage
+from timothy._pipelinestorage_sqlite import SQLitePipelineStorage
+
+
+class TestSQLitePipelineStorage(BaseTestAnyPipelineStorage[SQLitePipelineStorage]):
+    @pytest.fixture()
+    def empty_storage(self, tmp_path) -> SQLitePipelineStorage:
+        return SQLitePipelineStorage(tmp_path / "storage.sqlite")
+
+    def test_objects_persist_across_instances(self, empty_storage: SQLitePipelineStorage):
+        empty_storage.store_many(name1={"hello": ["world"]}, name2=2)
+        empty_storage.close()
+
+        reopened = SQLitePipelineStorage(empty_storage.location)
+        assert reopened.fetch_many("name2", "name1") == [2, {"hello": ["world"]}]
+
+    def test_fetch_many_raises_if_any_name_missing(self, empty_storage: SQLitePipelineStorage):
+        empty_storage.store_one("name1", 1)
+        with pytest.raises(KeyError):
+            empty_storage.fetch_many("name1", "name2")
+
+    def test_fetch_many_handles_more_names_than_one_query_allows(
+        self,
+        empty_storage: SQLitePipelineStorage,
+    ):
+        objs = {f"name{i}": i for i in range(2_000)}
+        empty_storage.store_many(**objs)
+        assert list(empty_storage.fetch_many(*objs)) == list(objs.values())
+
+    def test_failed_store_many_stores_nothing(self, empty_storage: SQLitePipelineStorage):
+        with pytest.raises(TypeError):
+            empty_storage.store_many(name1=1, name2=object())
+        assert list(empty_storage.list_names()) == []
+
+    def test_other_connections_see_stored_objects(self, empty_storage: SQLitePipelineStorage):
+        reader = SQLitePipelineStorage(empty_storage.location)
+        empty_storage.store_one("name1", "hello")
+        assert reader.fetch_one("name1") == "hello"
+
+    def test_storage_can_be_used_from_many_threads(self, empty_storage: SQLitePipelineStorage):
+        def store(i: int) -> None:
+            empty_storage.store_one(f"name{i}", i)
+
+        threads = [threading.Thread(target=store, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert list(empty_storage.list_names()) == sorted(f"name{i}" for i in range(8))
+
+    def test_connections_of_finished_threads_are_closed(
+        self,
+        empty_storage: SQLitePipelineStorage,
+    ):
+        def store(i: int) -> None:
+            empty_storage.store_one(f"name{i}", i)
+
+        for i in range(8):
+            thread = threading.Thread(target=store, args=(i,))
+            thread.start()
+            thread.join()
+        gc.collect()
+
+        assert len(empty_storage._connections) == 1  # noqa: SLF001
+
+    def test_nbytes_is_total_size_of_stored_values(self, empty_storage: SQLitePipelineStorage):
+        empty_storage.store_many(name1="hello", name2=[1, 2])
+        assert empty_storage.nbytes("name1", "name2") == len('"hello"') + len("[1, 2]")
+        assert empty_storage.nbytes("name1", "name3") is None
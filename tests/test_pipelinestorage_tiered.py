@@ -0,0 +1,129 @@
+import pytest
+
+from tests.stubs import AppendOnlyPipelineStorage, StubPipelineStorage
+from tests.test_pipelinestorage_impl import BaseTestAnyPipelineStorage
+from timothy._pipelinestagerunner_impl import DAGPipelineStageRunner
+from timothy._pipelinestorage_cached import approximate_nbytes
+from timothy._pipelinestorage_impl import JSONFilePipelineStorage
+from timothy._pipelinestorage_tiered import TieredPipelineStorage
+from timothy.core import DeletablePipelineStorage, PipelineStage, PipelineStageSet
+from timothy.exceptions import CannotRunPipelineError
+
+
+class TestTieredPipelineStorage(BaseTestAnyPipelineStorage[TieredPipelineStorage]):
+    @pytest.fixture()
+    def empty_storage(self, tmp_path) -> TieredPipelineStorage:
+        return TieredPipelineStorage(JSONFilePipelineStorage(tmp_path), max_bytes=10_000)
+
+    def test_objects_stay_in_memory_within_budget(self, empty_storage: TieredPipelineStorage):
+        empty_storage.store_many(name1=[1], name2=[2])
+        assert empty_storage.in_memory("name1")
+        assert empty_storage.in_memory("name2")
+        assert list(empty_storage.disk.list_names()) == []
+
+    def test_spill_writes_all_objects_to_disk(self, empty_storage: TieredPipelineStorage):
+        empty_storage.store_many(name1=[1], name2=[2])
+        empty_storage.spill()
+        assert empty_storage.memory_nbytes == 0
+        assert empty_storage.disk.fetch_many("name1", "name2") == [[1], [2]]
+
+    def test_objects_already_on_disk_are_listed(self, tmp_path):
+        JSONFilePipelineStorage(tmp_path).store_one("name", 1)
+        storage = TieredPipelineStorage(JSONFilePipelineStorage(tmp_path), max_bytes=10_000)
+        assert list(storage.list_names()) == ["name"]
+        assert storage.fetch_one("name") == 1
+
+    def test_least_recently_used_objects_are_spilled_over_budget(self):
+        disk = StubPipelineStorage()
+        storage = TieredPipelineStorage(disk, max_bytes=2 * approximate_nbytes("a"))
+        storage.store_many(name1="a", name2="b")
+        storage.fetch_one("name1")
+        storage.store_one("name3", "c")
+
+        assert disk == {"name2": "b"}
+        assert storage.memory_nbytes <= storage.max_bytes
+        assert storage.fetch_one("name2") == "b"
+        assert storage.in_memory("name2")
+
+    def test_objects_larger_than_budget_go_straight_to_disk(self):
+        disk = StubPipelineStorage()
+        storage = TieredPipelineStorage(disk, max_bytes=10)
+        storage.store_one("name", "a" * 100)
+        assert disk == {"name": "a" * 100}
+        assert not storage.in_memory("name")
+
+    def test_paged_in_objects_are_not_written_again_when_evicted(self):
+        disk = StubPipelineStorage(name1="a")
+        storage = TieredPipelineStorage(disk, max_bytes=approximate_nbytes("a"))
+        storage.fetch_one("name1")
+        disk["name1"] = "changed on disk"
+        storage.store_one("name2", "b")
+        assert disk["name1"] == "changed on disk"
+
+    def test_objects_needed_latest_are_spilled_first_during_a_run(self):
+        disk = StubPipelineStorage()
+        storage = TieredPipelineStorage(disk, max_bytes=2 * approximate_nbytes(1))
+        spilled_before_d: list[str] = []
+
+        def make_a() -> int:
+            return 1
+
+        def make_b() -> int:
+            return 2
+
+        def make_c(a: int) -> int:
+            return a + 3
+
+        def make_d(b: int, c: int) -> int:
+            spilled_before_d.extend(disk)
+            return b + c
+
+        def make_e(a: int, d: int) -> int:
+            return a + d
+
+        stages = PipelineStageSet(
+            PipelineStage(make_a, ["a"]),
+            PipelineStage(make_b, ["b"]),
+            PipelineStage(make_c, ["c"]),
+            PipelineStage(make_d, ["d"]),
+            PipelineStage(make_e, ["e"]),
+        )
+
+        DAGPipelineStageRunner()(stages, storage)
+
+        assert spilled_before_d == ["a"]
+        assert storage.fetch_one("e") == 1 + 2 + 1 + 3
+
+    def test_overwriting_a_spilled_object_removes_the_stale_disk_copy(self):
+        disk = StubPipelineStorage()
+        storage = TieredPipelineStorage(disk, max_bytes=approximate_nbytes("a"))
+        storage.store_one("name1", "a")
+        storage.store_one("name2", "b")
+        storage.store_one("name1", "c")
+        assert "name1" not in disk
+        assert storage.fetch_one("name1") == "c"
+
+    def test_is_deletable_only_if_disk_is_deletable(self):
+        deletable = TieredPipelineStorage(StubPipelineStorage(), max_bytes=1)
+        assert isinstance(deletable, DeletablePipelineStorage)
+        append_only = TieredPipelineStorage(AppendOnlyPipelineStorage(), max_bytes=1)
+        assert not isinstance(append_only, DeletablePipelineStorage)
+
+    def test_concurrent_runs_are_rejected(self):
+        storage = TieredPipelineStorage(StubPipelineStorage(), max_bytes=10_000)
+        stages = PipelineStageSet()
+        storage.on_run_start(stages, storage)
+        with pytest.raises(CannotRunPipelineError):
+            storage.on_run_start(stages, storage)
+        storage.on_run_end()
+        storage.on_run_start(stages, storage)
+
+    def test_failed_run_does_not_block_later_runs(self):
+        def fail() -> int:
+            raise RuntimeError
+
+        storage = TieredPipelineStorage(StubPipelineStorage(), max_bytes=10_000)
+        stages = PipelineStageSet(PipelineStage(fail, ["a"]))
+        with pytest.raises(RuntimeError):
+            DAGPipelineStageRunner()(stages, storage)
+        storage.on_run_start(stages, storage)
@@ -0,0 +1,142 @@
+import threading
+from collections.abc import Iterator
+
+import pytest
+
+from tests.stubs import AppendOnlyPipelineStorage, StubPipelineStorage
+from tests.test_pipelinestorage_impl import BaseTestAnyPipelineStorage
+from timothy._pipelinestagerunner_impl import DAGPipelineStageRunner
+from timothy._pipelinestorage_impl import JSONFilePipelineStorage
+from timothy._pipelinestorage_writebehind import WriteBehindPipelineStorage
+from timothy.core import DeletablePipelineStorage, Obj, PipelineStage, PipelineStageSet
+from timothy.exceptions import CannotRunPipelineError
+
+
+class GatedPipelineStorage(StubPipelineStorage):
+    def __init__(self) -> None:
+        super().__init__()
+        self.gate = threading.Event()
+        self.fetched: list[tuple[str, str]] = []
+
+    def fetch_one(self, name: str) -> Obj:
+        self.fetched.append((name, threading.current_thread().name))
+        return super().fetch_one(name)
+
+    def store_many(self, **name_to_obj_map: Obj) -> None:
+        self.gate.wait(timeout=5)
+        super().store_many(**name_to_obj_map)
+
+    def nbytes(self, *names: str) -> int | None:
+        return len(names)
+
+
+@pytest.fixture()
+def gated_storage() -> Iterator[WriteBehindPipelineStorage]:
+    storage = WriteBehindPipelineStorage(GatedPipelineStorage())
+    yield storage
+    storage.inner.gate.set()  # type: ignore[attr-defined]
+    storage.close()
+
+
+class TestWriteBehindPipelineStorage(BaseTestAnyPipelineStorage[WriteBehindPipelineStorage]):
+    @pytest.fixture()
+    def empty_storage(self, tmp_path) -> Iterator[WriteBehindPipelineStorage]:
+        storage = WriteBehindPipelineStorage(JSONFilePipelineStorage(tmp_path))
+        yield storage
+        storage.close()
+
+    def test_flush_waits_for_writes(self, empty_storage: WriteBehindPipelineStorage):
+        empty_storage.store_many(name1=[1], name2=[2])
+        empty_storage.flush()
+        assert empty_storage.inner.fetch_many("name1", "name2") == [[1], [2]]
+
+
+def test_is_deletable_only_if_inner_storage_is_deletable(
+    gated_storage: WriteBehindPipelineStorage,
+):
+    assert isinstance(gated_storage, DeletablePipelineStorage)
+    append_only = WriteBehindPipelineStorage(AppendOnlyPipelineStorage())
+    assert not isinstance(append_only, DeletablePipelineStorage)
+    append_only.close()
+
+
+def test_store_returns_before_write_completes(gated_storage: WriteBehindPipelineStorage):
+    gated_storage.store_one("name", 1)
+    assert "name" not in gated_storage.inner.list_names()
+    assert list(gated_storage.list_names()) == ["name"]
+
+
+def test_readers_do_not_wait_for_pending_writes(gated_storage: WriteBehindPipelineStorage):
+    gated_storage.inner.gate.set()  # type: ignore[attr-defined]
+    gated_storage.inner.store_one("other", [2])
+    gated_storage.inner.gate.clear()  # type: ignore[attr-defined]
+    gated_storage.store_one("name", [1])
+
+    assert gated_storage.fetch_many("name", "other") == [[1], [2]]
+    assert "name" not in gated_storage.inner.list_names()
+
+
+def test_nbytes_of_pending_objects_is_unknown(gated_storage: WriteBehindPipelineStorage):
+    gated_storage.store_one("name", 1)
+    assert gated_storage.nbytes("name") is None
+    assert gated_storage.nbytes("other") == len(["other"])
+
+
+def test_written_and_fetched_objects_are_snapshots(gated_storage: WriteBehindPipelineStorage):
+    obj = [1, 2]
+    gated_storage.store_one("name", obj)
+    obj.append(3)
+    fetched = gated_storage.fetch_one("name")
+    assert isinstance(fetched, list)
+    fetched.append(4)
+    gated_storage.inner.gate.set()  # type: ignore[attr-defined]
+    gated_storage.flush()
+
+    assert gated_storage.inner.fetch_one("name") == [1, 2]
+    assert gated_storage.fetch_one("name") == [1, 2]
+
+
+def test_failed_writes_are_raised_on_flush():
+    class FailingPipelineStorage(StubPipelineStorage):
+        def store_many(self, **name_to_obj_map: Obj) -> None:
+            del name_to_obj_map
+            msg = "disk full"
+            raise OSError(msg)
+
+    storage = WriteBehindPipelineStorage(FailingPipelineStorage())
+    storage.store_one("name", 1)
+    with pytest.raises(OSError, match="disk full"):
+        storage.flush()
+    storage.flush()
+
+
+def test_inputs_of_upcoming_stages_are_prefetched_during_a_run():
+    inner = GatedPipelineStorage()
+    inner.gate.set()
+    inner.store_many(num1=1, num3=3)
+    storage = WriteBehindPipelineStorage(inner, lookahead=1)
+
+    def add_one(num1: int) -> int:
+        return num1 + 1
+
+    def add(num2: int, num3: int) -> int:
+        return num2 + num3
+
+    stages = PipelineStageSet(PipelineStage(add_one, ["num2"]), PipelineStage(add, ["num4"]))
+    DAGPipelineStageRunner()(stages, storage)
+
+    assert [name for name, _ in inner.fetched] == ["num1", "num3"]
+    assert inner.fetched[1][1].startswith("timothy-io")
+    assert inner == {"num1": 1, "num2": 2, "num3": 3, "num4": 5}
+    storage.close()
+
+
+def test_concurrent_runs_are_rejected():
+    storage = WriteBehindPipelineStorage(StubPipelineStorage())
+    stages = PipelineStageSet()
+    storage.on_run_start(stages, storage)
+    with pytest.raises(CannotRunPipelineError):
+        storage.on_run_start(stages, storage)
+    storage.on_run_end()
+    storage.on_run_start(stages, storage)
+    storage.close()
@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from timothy._pipelinestorage_impl import JSONFilePipelineStorage, MemoryPipelineStorage
+from timothy._stagecache_impl import FingerprintStageCache
+from timothy.core import NamespacedPipelineStorage, PipelineStage
+
+
+def square_num1(num1: int) -> int:
+    return num1**2
+
+
+def cube_num1(num1: int) -> int:
+    return num1**3
+
+
+class TestFingerprintStageCache:
+    @pytest.fixture()
+    def cache(self) -> FingerprintStageCache:
+        return FingerprintStageCache(MemoryPipelineStorage())
+
+    def test_fingerprint_is_stable_for_same_stage_and_inputs(self, cache: FingerprintStageCache):
+        stage = PipelineStage(square_num1, ["num2"])
+        assert cache.fingerprint(stage, [3]) == cache.fingerprint(stage, [3])
+
+    def test_fingerprint_changes_with_inputs(self, cache: FingerprintStageCache):
+        stage = PipelineStage(square_num1, ["num2"])
+        assert cache.fingerprint(stage, [3]) != cache.fingerprint(stage, [4])
+
+    def test_fingerprint_changes_with_function_code(self, cache: FingerprintStageCache):
+        square_stage = PipelineStage(square_num1, ["num2"], name="power")
+        cube_stage = PipelineStage(cube_num1, ["num2"], name="power")
+        assert cache.fingerprint(square_stage, [3]) != cache.fingerprint(cube_stage, [3])
+
+    def test_fingerprint_changes_with_returns(self, cache: FingerprintStageCache):
+        stage = PipelineStage(square_num1, ["num2"])
+        renamed_stage = PipelineStage(square_num1, ["num3"])
+        assert cache.fingerprint(stage, [3]) != cache.fingerprint(renamed_stage, [3])
+
+    def test_fingerprint_changes_with_combine_function(self, cache: FingerprintStageCache):
+        stage = PipelineStage(square_num1, ["num2"], map_over="num1", combine=lambda r: r[0])
+        other = PipelineStage(square_num1, ["num2"], map_over="num1", combine=lambda r: r[-1])
+        assert cache.fingerprint(stage, [[3]]) != cache.fingerprint(other, [[3]])
+
+    def test_fingerprint_of_sets_is_stable_across_hash_seeds(self):
+        code = (
+            "from tests.test_stagecache_impl import square_num1;"
+            "from timothy import FingerprintStageCache, MemoryPipelineStorage;"
+            "from timothy.core import NamespacedPipelineStorage, PipelineStage;"
+            "cache = FingerprintStageCache(MemoryPipelineStorage());"
+            "stage = PipelineStage(square_num1, ['num2']);"
+            "print(cache.fingerprint(stage, [{'a', 'b', 'c', 'd', frozenset({'e', 'f'})}]))"
+        )
+        fingerprints = {
+            subprocess.run(  # noqa: S603 - runs this interpreter on a fixed snippet
+                [sys.executable, "-c", code],
+                env={**os.environ, "PYTHONHASHSEED": seed},
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+            for seed in ("1", "2", "3")
+        }
+        assert len(fingerprints) == 1
+
+    def test_scope_depends_on_storage_location_and_namespace(self, tmp_path):
+        cache = FingerprintStageCache(MemoryPipelineStorage())
+        storage = JSONFilePipelineStorage(tmp_path / "a")
+        assert cache.scope(storage) == cache.scope(JSONFilePipelineStorage(tmp_path / "a"))
+        assert cache.scope(storage) != cache.scope(JSONFilePipelineStorage(tmp_path / "b"))
+        assert cache.scope(NamespacedPipelineStorage(storage, "run1")) != cache.scope(
+            NamespacedPipelineStorage(storage, "run2"),
+        )
+
+    def test_recorded_fingerprints_are_scoped(self, cache: FingerprintStageCache):
+        cache.record("square_num1", "abc", scope="first")
+        assert cache.lookup("square_num1", scope="first") == "abc"
+        assert cache.lookup("square_num1", scope="second") is None
+        assert cache.lookup("square_num1") is None
+
+    def test_fingerprint_is_none_if_inputs_cannot_be_pickled(self, cache: FingerprintStageCache):
+        stage = PipelineStage(square_num1, ["num2"])
+        assert cache.fingerprint(stage, [lambda: 3]) is None
+
+    def test_recorded_fingerprint_can_be_looked_up(self, cache: FingerprintStageCache):
+        assert cache.lookup("square_num1") is None
+        cache.record("square_num1", "abc")
+        assert cache.lookup("square_num1") == "abc"
+
+    def test_recorded_fingerprints_persist_in_index(self, tmp_path):
+        FingerprintStageCache(JSONFilePipelineStorage(tmp_path)).record("square_num1", "abc")
+        reloaded_cache = FingerprintStageCache(JSONFilePipelineStorage(tmp_path))
+        assert reloaded_cache.lookup("square_num1") == "abc"
@@ -1,13 +1,43 @@
 """Define processing pipelines via functions."""
 
-from timothy._pipeline_impl import json_pipeline, memory_pipeline
-from timothy._pipelinestagerunner_impl import DAGPipelineStageRunner
-from timothy._pipelinestorage_impl import MemoryPipelineStorage
+from timothy._codecs import Codec
+from timothy._pipeline_impl import json_pipeline, memory_pipeline, sqlite_pipeline
+from timothy._pipelinestagerunner_impl import (
+    AsyncDAGPipelineStageRunner,
+    DAGPipelineStageRunner,
+    ProcessPoolDAGPipelineStageRunner,
+    StreamingDAGPipelineStageRunner,
+    ThreadedDAGPipelineStageRunner,
+)
+from timothy._pipelinestorage_cached import CachedPipelineStorage, CacheStats
+from timothy._pipelinestorage_cas import ContentAddressedPipelineStorage
+from timothy._pipelinestorage_impl import ManifestEntry, MemoryPipelineStorage, RowStream
+from timothy._pipelinestorage_pickle import PicklePipelineStorage
+from timothy._pipelinestorage_sqlite import SQLitePipelineStorage
+from timothy._pipelinestorage_tiered import TieredPipelineStorage
+from timothy._pipelinestorage_writebehind import WriteBehindPipelineStorage
+from timothy._stagecache_impl import FingerprintStageCache
 
 __all__ = [
+    "AsyncDAGPipelineStageRunner",
     "DAGPipelineStageRunner",
+    "ProcessPoolDAGPipelineStageRunner",
+    "StreamingDAGPipelineStageRunner",
+    "ThreadedDAGPipelineStageRunner",
+    "FingerprintStageCache",
+    "Codec",
     "Pipeline",
+    "CachedPipelineStorage",
+    "ContentAddressedPipelineStorage",
+    "CacheStats",
+    "ManifestEntry",
     "MemoryPipelineStorage",
+    "PicklePipelineStorage",
+    "RowStream",
+    "SQLitePipelineStorage",
+    "TieredPipelineStorage",
+    "WriteBehindPipelineStorage",
     "memory_pipeline",
     "json_pipeline",
+    "sqlite_pipeline",
 ]
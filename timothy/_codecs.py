@@ -0,0 +1,45 @@
+import bz2
+import lzma
+import zlib
+from dataclasses import dataclass
+from typing import Literal
+
+CodecName = Literal["none", "zlib", "bz2", "lzma"]
+
+_ZLIB_MAGIC = b"\x78"
+_BZ2_MAGIC = b"BZh"
+_LZMA_MAGIC = b"\xfd7zXZ\x00"
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: CodecName = "none"
+    level: int | None = None
+
+    def __post_init__(self) -> None:
+        if self.name not in ("none", "zlib", "bz2", "lzma"):
+            msg = f"Unknown codec: {self.name!r}"
+            raise ValueError(msg)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.name == "zlib":
+            return zlib.compress(data, -1 if self.level is None else self.level)
+        if self.name == "bz2":
+            return bz2.compress(data, 9 if self.level is None else self.level)
+        if self.name == "lzma":
+            return lzma.compress(data, preset=self.level)
+        return data
+
+
+def as_codec(codec: Codec | CodecName) -> Codec:
+    return Codec(codec) if isinstance(codec, str) else codec
+
+
+def decompress(data: bytes) -> bytes:
+    if data.startswith(_LZMA_MAGIC):
+        return lzma.decompress(data)
+    if data.startswith(_BZ2_MAGIC):
+        return bz2.decompress(data)
+    if data.startswith(_ZLIB_MAGIC):
+        return zlib.decompress(data)
+    return data
@@ -0,0 +1,31 @@
+import sys
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+
+if sys.platform != "win32":
+    import fcntl
+
+_process_locks: dict[Path, Lock] = {}
+_process_locks_lock = Lock()
+
+
+@contextmanager
+def file_lock(path: Path, *, shared: bool = False) -> Iterator[None]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("ab") as f:
+        if sys.platform == "win32":
+            with _process_lock(path):
+                yield
+            return
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _process_lock(path: Path) -> Lock:
+    with _process_locks_lock:
+        return _process_locks.setdefault(path.resolve(), Lock())
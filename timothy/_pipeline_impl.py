@@ -1,9 +1,9 @@
-from copy import deepcopy
 from pathlib import Path
 from typing import ParamSpec, TypeVar
 
 from timothy._pipelinestagerunner_impl import DAGPipelineStageRunner
 from timothy._pipelinestorage_impl import JSONFilePipelineStorage, MemoryPipelineStorage
+from timothy._pipelinestorage_sqlite import SQLitePipelineStorage
 from timothy.core import Pipeline
 
 T = TypeVar("T")
@@ -12,14 +12,21 @@ _Pipeline = TypeVar("_Pipeline", bound=Pipeline)
 
 
 def memory_pipeline(pipeline: _Pipeline) -> _Pipeline:
-    pipeline = deepcopy(pipeline)
-    pipeline.storage = MemoryPipelineStorage()
-    pipeline.stagerunner = DAGPipelineStageRunner()
-    return pipeline
+    return pipeline.bind(
+        storage=MemoryPipelineStorage(),
+        stagerunner=DAGPipelineStageRunner(),
+    )
 
 
 def json_pipeline(pipeline: _Pipeline, location: Path) -> _Pipeline:
-    pipeline = deepcopy(pipeline)
-    pipeline.storage = JSONFilePipelineStorage(location)
-    pipeline.stagerunner = DAGPipelineStageRunner()
-    return pipeline
+    return pipeline.bind(
+        storage=JSONFilePipelineStorage(location),
+        stagerunner=DAGPipelineStageRunner(),
+    )
+
+
+def sqlite_pipeline(pipeline: _Pipeline, location: Path) -> _Pipeline:
+    return pipeline.bind(
+        storage=SQLitePipelineStorage(location),
+        stagerunner=DAGPipelineStageRunner(),
+    )
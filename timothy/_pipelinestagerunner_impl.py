@@ -1,28 +1,827 @@
+import asyncio
+import os
+import pickle
+from collections.abc import Callable, Collection, Iterator, Mapping, MutableMapping, Sequence
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import AbstractAsyncContextManager, nullcontext, suppress
+from functools import partial
 from graphlib import CycleError, TopologicalSorter
-from typing import cast
+from inspect import isgenerator
+from queue import Empty, Full, Queue
+from threading import Lock
+from time import perf_counter, thread_time
+from typing import Any, Self, cast
 
-from timothy.core import PipelineStageSet, PipelineStorage
-from timothy.exceptions import CannotRunPipelineError
+from timothy._stagecache_impl import FingerprintStageCache
+from timothy.core import (
+    CompressedPipelineStorage,
+    LazyPipelineStorage,
+    Obj,
+    PipelineHooks,
+    PipelineStage,
+    PipelineStageSet,
+    PipelineStorage,
+    SizedPipelineStorage,
+    StageTiming,
+    StorageAccess,
+)
+from timothy.exceptions import CannotRunPipelineError, UnpicklableStageError
+
+_END_OF_STREAM: Any = object()
+_ABORTED: Any = object()
+
+
+class _StageRecord:
+    __slots__ = ("cached", "compute_seconds", "cpu_seconds", "fetch", "started_at", "store")
+
+    def __init__(self) -> None:
+        self.started_at = perf_counter()
+        self.compute_seconds = 0.0
+        self.cpu_seconds: float | None = None
+        self.fetch: StorageAccess | None = None
+        self.store: StorageAccess | None = None
+        self.cached = False
+
+
+class _StageExecution:
+    def __init__(
+        self,
+        stages: PipelineStageSet,
+        storage: PipelineStorage,
+        cache: FingerprintStageCache | None,
+        hooks: Sequence[PipelineHooks],
+    ) -> None:
+        self._stages = stages
+        self._storage = storage
+        self._cache = cache
+        self._hooks = [*hooks, storage] if isinstance(storage, PipelineHooks) else hooks
+        self._sized = bool(hooks) and isinstance(storage, SizedPipelineStorage)
+        self._compressed = self._sized and isinstance(storage, CompressedPipelineStorage)
+        self._lazy = isinstance(storage, LazyPipelineStorage)
+        self._available = frozenset(storage.list_names() if cache is not None else ())
+        self._scope = cache.scope(storage) if cache is not None else ""
+        self._fingerprints: dict[str, str] = {}
+        self._records: dict[str, _StageRecord] = {}
+
+    def __enter__(self) -> Self:
+        for hook in self._hooks:
+            hook.on_run_start(self._stages, self._storage)
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        for hook in self._hooks:
+            hook.on_run_end()
+
+    def start(self, stage: PipelineStage) -> None:
+        if not self._hooks:
+            return
+        self._records[stage.name] = _StageRecord()
+        for hook in self._hooks:
+            hook.on_stage_start(stage)
+
+    def fetch(
+        self,
+        stage: PipelineStage,
+        streams: Mapping[str, Obj] | None = None,
+    ) -> Sequence[Obj]:
+        started_at = perf_counter()
+        names = [name for name in stage.params if not streams or name not in streams]
+        param_objs = self._storage.fetch_many(*names)
+        if streams:
+            fetched = dict(zip(names, param_objs, strict=True))
+            param_objs = [streams[n] if n in streams else fetched[n] for n in stage.params]
+        if self._hooks:
+            access = self._access(names, perf_counter() - started_at)
+            self._records[stage.name].fetch = access
+            for hook in self._hooks:
+                hook.on_fetch(stage, access)
+        return param_objs
+
+    def is_cached(self, stage: PipelineStage, param_objs: Sequence[Obj]) -> bool:
+        if self._cache is None:
+            return False
+        if (fingerprint := self._cache.fingerprint(stage, param_objs)) is None:
+            return False
+        recorded = self._cache.lookup(stage.name, scope=self._scope)
+        if self._available.issuperset(stage.returns) and recorded is not None:
+            recorded_fingerprint, _, outputs_digest = recorded.partition(":")
+            if recorded_fingerprint == fingerprint and self._outputs_match(stage, outputs_digest):
+                if self._hooks:
+                    self._records[stage.name].cached = True
+                return True
+        self._fingerprints[stage.name] = fingerprint
+        return False
+
+    def call(
+        self,
+        stage: PipelineStage,
+        param_objs: Sequence[Obj],
+        executor: Executor | None = None,
+    ) -> Sequence[Obj]:
+        started_at, cpu_started_at = perf_counter(), thread_time()
+        if stage.map_over is None:
+            return_objs = stage.call(param_objs)
+            cpu_seconds = thread_time() - cpu_started_at
+        else:
+            return_objs, cpu_seconds = _call_partitions(stage, param_objs, executor)
+        self.record_call(stage, perf_counter() - started_at, cpu_seconds)
+        return return_objs
+
+    async def acall(self, stage: PipelineStage, param_objs: Sequence[Obj]) -> Sequence[Obj]:
+        started_at = perf_counter()
+        return_objs = await stage.acall(param_objs)
+        self.record_call(stage, perf_counter() - started_at, None)
+        return return_objs
+
+    def record_call(self, stage: PipelineStage, seconds: float, cpu_seconds: float | None) -> None:
+        if self._hooks:
+            record = self._records[stage.name]
+            record.compute_seconds = seconds
+            record.cpu_seconds = cpu_seconds
+
+    def store(self, stage: PipelineStage, return_objs: Sequence[Obj]) -> None:
+        return_objs = [
+            obj if self._stores_lazily(name, obj) else _materialize(obj)
+            for name, obj in zip(stage.returns, return_objs, strict=True)
+        ]
+        started_at = perf_counter()
+        self._storage.store_many(**dict(zip(stage.returns, return_objs, strict=True)))
+        if self._hooks:
+            access = self._access(stage.returns, perf_counter() - started_at)
+            self._records[stage.name].store = access
+            for hook in self._hooks:
+                hook.on_store(stage, access)
+        if self._cache is not None and (fingerprint := self._fingerprints.pop(stage.name, None)):
+            if (outputs_digest := self._cache.digest(return_objs)) is not None:
+                fingerprint = f"{fingerprint}:{outputs_digest}"
+            self._cache.record(stage.name, fingerprint, scope=self._scope)
+
+    def run(self, stage: PipelineStage, executor: Executor | None = None) -> None:
+        self.start(stage)
+        param_objs = self.fetch(stage)
+        if not self.is_cached(stage, param_objs):
+            self.store(stage, self.call(stage, param_objs, executor))
+
+    def finish(self, stage: PipelineStage) -> None:
+        if not self._hooks:
+            return
+        record = self._records.pop(stage.name)
+        timing = StageTiming(
+            stage_name=stage.name,
+            started_at=record.started_at,
+            ended_at=perf_counter(),
+            compute_seconds=record.compute_seconds,
+            cpu_seconds=record.cpu_seconds,
+            fetch=record.fetch,
+            store=record.store,
+            cached=record.cached,
+        )
+        for hook in self._hooks:
+            hook.on_stage_end(stage, timing)
+
+    def _stores_lazily(self, name: str, obj: Obj) -> bool:
+        if not self._lazy or not isgenerator(obj):
+            return False
+        return cast(LazyPipelineStorage, self._storage).stores_lazily(name)
+
+    def _outputs_match(self, stage: PipelineStage, outputs_digest: str) -> bool:
+        if not outputs_digest or self._cache is None:
+            return True
+        return self._cache.digest(self._storage.fetch_many(*stage.returns)) == outputs_digest
+
+    def _access(self, names: Sequence[str], seconds: float) -> StorageAccess:
+        if not self._sized:
+            return StorageAccess(tuple(names), seconds)
+        nbytes = cast(SizedPipelineStorage, self._storage).nbytes(*names)
+        if not self._compressed:
+            return StorageAccess(tuple(names), seconds, nbytes)
+        raw_nbytes = cast(CompressedPipelineStorage, self._storage).raw_nbytes(*names)
+        return StorageAccess(tuple(names), seconds, nbytes, raw_nbytes)
 
 
 class DAGPipelineStageRunner:
-    def __call__(self, stages: PipelineStageSet, storage: PipelineStorage) -> None:
-        dag: TopologicalSorter = TopologicalSorter()
+    def __init__(self, *, cache: FingerprintStageCache | None = None) -> None:
+        self._cache = cache
+
+    @property
+    def cache(self) -> FingerprintStageCache | None:
+        return self._cache
+
+    def __call__(
+        self,
+        stages: PipelineStageSet,
+        storage: PipelineStorage,
+        *,
+        hooks: Sequence[PipelineHooks] = (),
+    ) -> None:
+        plan = stages.plan
+        with _StageExecution(stages, storage, self._cache, hooks) as execution:
+            for stage_group_names in plan.levels:
+                for name in stage_group_names:
+                    stage = plan.stages[name]
+                    execution.run(stage)
+                    execution.finish(stage)
+
+
+class ThreadedDAGPipelineStageRunner:
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        *,
+        cache: FingerprintStageCache | None = None,
+    ) -> None:
+        self._max_workers = max_workers
+        self._cache = cache
+
+    @property
+    def max_workers(self) -> int | None:
+        return self._max_workers
 
+    @property
+    def cache(self) -> FingerprintStageCache | None:
+        return self._cache
+
+    def __call__(
+        self,
+        stages: PipelineStageSet,
+        storage: PipelineStorage,
+        *,
+        hooks: Sequence[PipelineHooks] = (),
+    ) -> None:
+        plan = stages.plan
+        dag = plan.sorter()
+        stages_by_name = plan.stages
+        running: dict[Future[None], str] = {}
+
+        with (
+            _StageExecution(stages, storage, self._cache, hooks) as execution,
+            ThreadPoolExecutor(max_workers=self._max_workers) as executor,
+        ):
+            try:
+                while dag.is_active():
+                    for name in cast(tuple[str, ...], dag.get_ready()):
+                        future = executor.submit(execution.run, stages_by_name[name], executor)
+                        running[future] = name
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        name = running.pop(future)
+                        future.result()
+                        execution.finish(stages_by_name[name])
+                        dag.done(name)
+            except BaseException:
+                for future in running:
+                    future.cancel()
+                raise
+
+
+class ProcessPoolDAGPipelineStageRunner:
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        *,
+        default_run_in_process: bool = True,
+        cache: FingerprintStageCache | None = None,
+    ) -> None:
+        self._max_workers = max_workers
+        self._default_run_in_process = default_run_in_process
+        self._cache = cache
+
+    @property
+    def max_workers(self) -> int | None:
+        return self._max_workers
+
+    @property
+    def cache(self) -> FingerprintStageCache | None:
+        return self._cache
+
+    @property
+    def default_run_in_process(self) -> bool:
+        return self._default_run_in_process
+
+    def runs_in_process(self, stage: PipelineStage) -> bool:
+        if stage.run_in_process is None:
+            return self._default_run_in_process
+        return stage.run_in_process
+
+    def __call__(
+        self,
+        stages: PipelineStageSet,
+        storage: PipelineStorage,
+        *,
+        hooks: Sequence[PipelineHooks] = (),
+    ) -> None:
+        plan = stages.plan
+        dag = plan.sorter()
+        stages_by_name = plan.stages
         for stage in stages:
-            depends_on = tuple(pred.name for pn in stage.params if (pred := stages.returns.get(pn)))
-            dag.add(stage.name, *depends_on)
+            if self.runs_in_process(stage):
+                _ensure_picklable(stage)
+        running: dict[Future[tuple[Sequence[Obj], float, float]], str] = {}
+
+        with (
+            _StageExecution(stages, storage, self._cache, hooks) as execution,
+            ProcessPoolExecutor(max_workers=self._max_workers) as executor,
+        ):
+            try:
+                while dag.is_active():
+                    for name in cast(tuple[str, ...], dag.get_ready()):
+                        stage = stages_by_name[name]
+                        if (future := self._submit(stage, execution, executor)) is None:
+                            execution.finish(stage)
+                            dag.done(name)
+                        else:
+                            running[future] = name
+                    if not running:
+                        continue
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        stage = stages_by_name[running.pop(future)]
+                        return_objs, seconds, cpu_seconds = future.result()
+                        execution.record_call(stage, seconds, cpu_seconds)
+                        execution.store(stage, return_objs)
+                        execution.finish(stage)
+                        dag.done(stage.name)
+            except BaseException:
+                for future in running:
+                    future.cancel()
+                raise
+
+    def _submit(
+        self,
+        stage: PipelineStage,
+        execution: _StageExecution,
+        executor: Executor,
+    ) -> Future[tuple[Sequence[Obj], float, float]] | None:
+        if not self.runs_in_process(stage):
+            execution.run(stage)
+            return None
+        execution.start(stage)
+        param_objs = execution.fetch(stage)
+        if execution.is_cached(stage, param_objs):
+            return None
+        return _submit_call(executor, stage, param_objs)
+
+
+class AsyncDAGPipelineStageRunner:
+    def __init__(
+        self,
+        max_concurrency: int | None = None,
+        max_workers: int | None = None,
+        *,
+        cache: FingerprintStageCache | None = None,
+    ) -> None:
+        self._max_concurrency = max_concurrency
+        self._max_workers = max_workers
+        self._cache = cache
 
+    @property
+    def max_concurrency(self) -> int | None:
+        return self._max_concurrency
+
+    @property
+    def max_workers(self) -> int | None:
+        return self._max_workers
+
+    @property
+    def cache(self) -> FingerprintStageCache | None:
+        return self._cache
+
+    def __call__(
+        self,
+        stages: PipelineStageSet,
+        storage: PipelineStorage,
+        *,
+        hooks: Sequence[PipelineHooks] = (),
+    ) -> None:
+        coro = self.arun(stages, storage, hooks=hooks)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(coro)
+            return
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="timothy-async") as executor:
+            executor.submit(partial(asyncio.run, coro)).result()
+
+    async def arun(
+        self,
+        stages: PipelineStageSet,
+        storage: PipelineStorage,
+        *,
+        hooks: Sequence[PipelineHooks] = (),
+    ) -> None:
+        plan = stages.plan
+        dag = plan.sorter()
+        stages_by_name = plan.stages
+        limit: AbstractAsyncContextManager[object] = nullcontext()
+        if self._max_concurrency is not None:
+            limit = asyncio.Semaphore(self._max_concurrency)
+        running: dict[asyncio.Task[None], str] = {}
+
+        with (
+            _StageExecution(stages, storage, self._cache, hooks) as execution,
+            ThreadPoolExecutor(max_workers=self._max_workers) as executor,
+        ):
+            try:
+                while dag.is_active():
+                    for name in cast(tuple[str, ...], dag.get_ready()):
+                        coro = _arun_stage(stages_by_name[name], execution, executor, limit)
+                        running[asyncio.create_task(coro)] = name
+                    finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for task in finished:
+                        name = running.pop(task)
+                        task.result()
+                        execution.finish(stages_by_name[name])
+                        dag.done(name)
+            except BaseException:
+                for task in running:
+                    task.cancel()
+                await asyncio.gather(*running, return_exceptions=True)
+                raise
+
+
+class StreamingDAGPipelineStageRunner:
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        *,
+        queue_size: int = 16,
+        cache: FingerprintStageCache | None = None,
+    ) -> None:
+        if queue_size < 1:
+            msg = f"queue_size must be at least 1, not {queue_size}"
+            raise ValueError(msg)
+        self._max_workers = max_workers
+        self._queue_size = queue_size
+        self._cache = cache
+
+    @property
+    def max_workers(self) -> int | None:
+        return self._max_workers
+
+    @property
+    def queue_size(self) -> int:
+        return self._queue_size
+
+    @property
+    def cache(self) -> FingerprintStageCache | None:
+        return self._cache
+
+    def __call__(
+        self,
+        stages: PipelineStageSet,
+        storage: PipelineStorage,
+        *,
+        hooks: Sequence[PipelineHooks] = (),
+    ) -> None:
+        groups = _StreamGroups(stages)
+        dag = groups.sorter()
+        max_workers = self._worker_count()
+        self._ensure_groups_can_run(groups, max_workers)
+        ready: list[str] = []
+        running: dict[Future[None], str] = {}
+        group_runs: dict[str, _StreamGroupRun] = {}
+
+        with (
+            _StageExecution(stages, storage, self._cache, hooks) as execution,
+            ThreadPoolExecutor(max_workers=max_workers) as executor,
+        ):
+            try:
+                while dag.is_active():
+                    ready.extend(cast(tuple[str, ...], dag.get_ready()))
+                    while ready and len(running) + len(groups.members[ready[0]]) <= max_workers:
+                        group = ready.pop(0)
+                        group_runs[group] = _StreamGroupRun(groups, group, self._queue_size)
+                        futures = group_runs[group].submit(execution, executor)
+                        running.update(dict.fromkeys(futures, group))
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        group = running.pop(future)
+                        if group_runs[group].member_done(future):
+                            group_runs.pop(group).finish(execution)
+                            dag.done(group)
+            except BaseException:
+                for future in running:
+                    future.cancel()
+                for group_run in group_runs.values():
+                    group_run.abort()
+                raise
+
+    def _worker_count(self) -> int:
+        if self._max_workers is None:
+            return min(32, (os.cpu_count() or 1) + 4)
+        return self._max_workers
+
+    def _ensure_groups_can_run(self, groups: "_StreamGroups", max_workers: int) -> None:
+        for members in groups.members.values():
+            if len(members) == 1:
+                continue
+            names = ", ".join(f"'{stage.name}'" for stage in members)
+            if self._cache is not None:
+                msg = f"Stages {names} stream to each other, so their results cannot be cached."
+                raise CannotRunPipelineError(msg)
+            if len(members) > max_workers:
+                msg = (
+                    f"Stages {names} stream to each other and need {len(members)} workers, "
+                    f"but max_workers is {max_workers}."
+                )
+                raise CannotRunPipelineError(msg)
+
+
+class _StreamGroups:
+    def __init__(self, stages: PipelineStageSet) -> None:
+        plan = stages.plan
+        self.streamed: Mapping[str, tuple[PipelineStage, ...]] = {
+            name: consumers
+            for stage in stages
+            if stage.is_generator
+            for name in stage.returns
+            if (consumers := tuple(c for c in stages if c.streaming and name in c.params))
+        }
+        self.materialized = frozenset(
+            name
+            for name, streaming_consumers in self.streamed.items()
+            if len(plan.consumers.get(name, ())) != len(streaming_consumers)
+        )
+
+        group_of = {stage.name: stage.name for stage in stages}
+
+        def find(name: str) -> str:
+            while group_of[name] != name:
+                group_of[name] = name = group_of[group_of[name]]
+            return name
+
+        for name, consumers in self.streamed.items():
+            for consumer in consumers:
+                group_of[find(consumer.name)] = find(plan.producers[name].name)
+
+        members: dict[str, list[PipelineStage]] = {}
+        for stage_name in plan.order:
+            members.setdefault(find(stage_name), []).append(plan.stages[stage_name])
+        self.members: Mapping[str, Sequence[PipelineStage]] = members
+        self._dependencies = self._group_dependencies(stages, find)
+
+    def sorter(self) -> TopologicalSorter[str]:
+        dag = TopologicalSorter(self._dependencies)
         try:
             dag.prepare()
         except CycleError as e:
-            msg = "Cycle detected in pipeline stage dependency graph."
+            msg = "Streamed stages depend on each other through a stage that needs a whole object."
             raise CannotRunPipelineError(msg) from e
+        return dag
+
+    def _group_dependencies(
+        self,
+        stages: PipelineStageSet,
+        find: Callable[[str], str],
+    ) -> MutableMapping[str, set[str]]:
+        producers = stages.plan.producers
+        dependencies: MutableMapping[str, set[str]] = {group: set() for group in self.members}
+        for stage in stages:
+            group = find(stage.name)
+            for param in stage.params:
+                if (producer := producers.get(param)) is None:
+                    continue
+                if (producer_group := find(producer.name)) != group:
+                    dependencies[group].add(producer_group)
+                elif stage not in self.streamed.get(param, ()):
+                    msg = (
+                        f"Stage '{stage.name}' needs all of {param!r} while it also consumes "
+                        "a stream from the same producers, which cannot run concurrently."
+                    )
+                    raise CannotRunPipelineError(msg)
+        return dependencies
+
+
+class _StreamGroupRun:
+    def __init__(self, groups: "_StreamGroups", group: str, queue_size: int) -> None:
+        self._members = groups.members[group]
+        self._materialized = groups.materialized
+        self._streams = {
+            (name, consumer.name): _ChunkStream(queue_size)
+            for member in self._members
+            for name in member.returns
+            for consumer in groups.streamed.get(name, ())
+        }
+        self._remaining = len(self._members)
+        self._errors: list[BaseException] = []
+        self._lock = Lock()
+
+    def submit(self, execution: _StageExecution, executor: Executor) -> list[Future[None]]:
+        if len(self._members) == 1:
+            return [executor.submit(execution.run, self._members[0], executor)]
+        return [executor.submit(self.run_member, stage, execution) for stage in self._members]
+
+    def run_member(self, stage: PipelineStage, execution: _StageExecution) -> None:
+        streams = self._streams
+        inputs = {n: streams[n, stage.name] for n in stage.params if (n, stage.name) in streams}
+        outputs = [stream for (n, _), stream in streams.items() if n in stage.returns]
+        try:
+            _run_streaming_stage(stage, execution, inputs, outputs, self._materialized)
+        except BaseException as e:
+            with self._lock:
+                self._errors.append(e)
+            self.abort()
+            raise
+
+    def member_done(self, future: Future[None]) -> bool:
+        if future.exception() is not None and self._errors:
+            raise self._errors[0]
+        future.result()
+        self._remaining -= 1
+        return not self._remaining
+
+    def finish(self, execution: _StageExecution) -> None:
+        for stage in self._members:
+            execution.finish(stage)
+
+    def abort(self) -> None:
+        for stream in self._streams.values():
+            stream.abort()
+
+
+class _ChunkStream:
+    def __init__(self, maxsize: int) -> None:
+        self._queue: Queue[Obj] = Queue(maxsize)
+        self._lock = Lock()
+        self._aborted = False
+        self._detached = False
+
+    def put(self, chunk: Obj) -> None:
+        self._raise_if_aborted()
+        if not self._detached:
+            self._queue.put(chunk)
+
+    def close(self) -> None:
+        self.put(_END_OF_STREAM)
+
+    def abort(self) -> None:
+        with self._lock:
+            self._aborted = True
+            self._drain()
+            if not self._detached:
+                with suppress(Full):
+                    self._queue.put_nowait(_ABORTED)
+
+    def detach(self) -> None:
+        with self._lock:
+            self._detached = True
+            self._drain()
+
+    def __iter__(self) -> Iterator[Obj]:
+        while (chunk := self._queue.get()) is not _END_OF_STREAM:
+            self._raise_if_aborted()
+            yield chunk
+
+    def _drain(self) -> None:
+        with suppress(Empty):
+            while True:
+                self._queue.get_nowait()
+
+    def _raise_if_aborted(self) -> None:
+        if self._aborted:
+            msg = "Streaming stage group was aborted because another stage failed."
+            raise CannotRunPipelineError(msg)
+
+
+def _run_streaming_stage(
+    stage: PipelineStage,
+    execution: _StageExecution,
+    inputs: Mapping[str, _ChunkStream],
+    outputs: Sequence[_ChunkStream],
+    materialized: Collection[str],
+) -> None:
+    execution.start(stage)
+    param_objs = execution.fetch(stage, inputs)
+    started_at, cpu_started_at = perf_counter(), thread_time()
+    try:
+        if not outputs:
+            return_objs = stage.call(param_objs)
+        else:
+            (name,) = stage.returns
+            chunks: list[Obj] | None = [] if name in materialized else None
+            for chunk in stage.func(*param_objs):
+                for stream in outputs:
+                    stream.put(chunk)
+                if chunks is not None:
+                    chunks.append(chunk)
+            for stream in outputs:
+                stream.close()
+            return_objs = [chunks] if chunks is not None else []
+    finally:
+        for stream in inputs.values():
+            stream.detach()
+    execution.record_call(stage, perf_counter() - started_at, thread_time() - cpu_started_at)
+    if len(return_objs) == len(stage.returns):
+        execution.store(stage, return_objs)
+
+
+async def _arun_stage(
+    stage: PipelineStage,
+    execution: _StageExecution,
+    executor: Executor,
+    limit: AbstractAsyncContextManager[object],
+) -> None:
+    loop = asyncio.get_running_loop()
+    async with limit:
+        if not stage.is_async:
+            await loop.run_in_executor(executor, execution.run, stage, executor)
+            return
+        execution.start(stage)
+        param_objs = await loop.run_in_executor(executor, execution.fetch, stage)
+        if await loop.run_in_executor(executor, execution.is_cached, stage, param_objs):
+            return
+        return_objs = await execution.acall(stage, param_objs)
+        await loop.run_in_executor(executor, execution.store, stage, return_objs)
+
+
+def _timed_call(
+    stage: PipelineStage,
+    param_objs: Sequence[Obj],
+) -> tuple[Sequence[Obj], float, float]:
+    started_at, cpu_started_at = perf_counter(), thread_time()
+    return_objs = [_materialize(obj) for obj in stage.call(param_objs)]
+    return return_objs, perf_counter() - started_at, thread_time() - cpu_started_at
+
+
+def _timed_partition_call(stage: PipelineStage, param_objs: Sequence[Obj]) -> tuple[Any, float]:
+    cpu_started_at = thread_time()
+    result = stage.call_partition(param_objs)
+    return result, thread_time() - cpu_started_at
+
+
+def _call_partitions(
+    stage: PipelineStage,
+    param_objs: Sequence[Obj],
+    executor: Executor | None,
+) -> tuple[Sequence[Obj], float]:
+    first, *rest = stage.split(param_objs)
+    if executor is None:
+        results = [_timed_partition_call(stage, partition) for partition in (first, *rest)]
+    else:
+        futures = [executor.submit(_timed_partition_call, stage, partition) for partition in rest]
+        try:
+            results = [_timed_partition_call(stage, first)]
+            results.extend(
+                _timed_partition_call(stage, partition) if future.cancel() else future.result()
+                for future, partition in zip(futures, rest, strict=True)
+            )
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return stage.gather([r for r, _ in results]), sum(cpu for _, cpu in results)
+
+
+def _submit_call(
+    executor: Executor,
+    stage: PipelineStage,
+    param_objs: Sequence[Obj],
+) -> Future[tuple[Sequence[Obj], float, float]]:
+    if stage.map_over is None:
+        return executor.submit(_timed_call, stage, param_objs)
+
+    started_at = perf_counter()
+    futures = [executor.submit(_timed_partition_call, stage, p) for p in stage.split(param_objs)]
+    gathered: Future[tuple[Sequence[Obj], float, float]] = Future()
+    remaining = [len(futures)]
+    lock = Lock()
+
+    def partition_done(_: Future[tuple[Any, float]]) -> None:
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        try:
+            results = [future.result() for future in futures]
+            return_objs = stage.gather([r for r, _ in results])
+        except BaseException as e:  # noqa: BLE001
+            gathered.set_exception(e)
+        else:
+            cpu_seconds = sum(cpu for _, cpu in results)
+            gathered.set_result((return_objs, perf_counter() - started_at, cpu_seconds))
+
+    for future in futures:
+        future.add_done_callback(partition_done)
+    return gathered
+
+
+def _materialize(obj: Obj) -> Obj:
+    return list(obj) if isgenerator(obj) else obj
+
 
-        while dag.is_active():
-            stage_group_names = list(cast(tuple[str], dag.get_ready()))
-            stage_group = stages[stage_group_names]
-            for stage in stage_group:
-                return_objs = stage.call(storage.fetch_many(*stage.params))
-                storage.store_many(**dict(zip(stage.returns, return_objs, strict=True)))
-            dag.done(*stage_group_names)
+def _ensure_picklable(stage: PipelineStage) -> None:
+    try:
+        pickle.dumps(stage)
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        msg = (
+            f"Stage '{stage.name}' cannot be pickled to run in a worker process ({e}). "
+            "Define its function at module level or register it with run_in_process=False."
+        )
+        raise UnpicklableStageError(msg) from e
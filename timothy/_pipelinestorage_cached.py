@@ -0,0 +1,226 @@
+import sys
+from collections import OrderedDict
+from collections.abc import Mapping, MutableMapping, Sequence
+from copy import deepcopy
+from dataclasses import dataclass
+from threading import RLock
+from typing import Any, Literal, cast
+
+from timothy.core import (
+    DeletablePipelineStorage,
+    Obj,
+    PipelineHooks,
+    PipelineStorage,
+    SizedPipelineStorage,
+)
+
+CachePolicy = Literal["lru", "fifo"]
+CacheMode = Literal["write-through", "write-back"]
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    nbytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class CachedPipelineStorage(PipelineHooks):
+    """Keep recently used objects in memory in front of another storage.
+
+    Cached objects are shared with every caller that stores or fetches them, so they must be
+    treated as immutable. Pass share_objects=False to hand each fetch its own deep copy.
+    """
+
+    def __new__(cls, *args: Any, **kwargs: Any) -> "CachedPipelineStorage":
+        inner = args[0] if args else kwargs.get("inner")
+        if cls is CachedPipelineStorage and isinstance(inner, DeletablePipelineStorage):
+            return super().__new__(_DeletableCachedPipelineStorage)
+        return super().__new__(cls)
+
+    def __init__(
+        self,
+        inner: PipelineStorage,
+        *,
+        max_bytes: int,
+        policy: CachePolicy = "lru",
+        mode: CacheMode = "write-through",
+        share_objects: bool = True,
+    ) -> None:
+        if policy not in ("lru", "fifo"):
+            msg = f"Unknown cache policy: {policy!r}"
+            raise ValueError(msg)
+        if mode not in ("write-through", "write-back"):
+            msg = f"Unknown cache mode: {mode!r}"
+            raise ValueError(msg)
+
+        self._inner = inner
+        self._max_bytes = max_bytes
+        self._policy = policy
+        self._mode = mode
+        self._share_objects = share_objects
+        self._entries: OrderedDict[str, tuple[Obj, int]] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._versions: MutableMapping[str, int] = {}
+        self._nbytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = RLock()
+
+    @property
+    def inner(self) -> PipelineStorage:
+        return self._inner
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @property
+    def policy(self) -> CachePolicy:
+        return self._policy
+
+    @property
+    def mode(self) -> CacheMode:
+        return self._mode
+
+    @property
+    def share_objects(self) -> bool:
+        return self._share_objects
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions, self._nbytes)
+
+    def fetch_one(self, name: str) -> Obj:
+        return self.fetch_many(name)[0]
+
+    def fetch_many(self, *names: str) -> Sequence[Obj]:
+        found: dict[str, Obj] = {}
+        with self._lock:
+            for name in names:
+                if name in self._entries:
+                    found[name] = self._lookup(name)
+            misses = sum(1 for name in names if name not in found)
+            self._hits += len(names) - misses
+            self._misses += misses
+            missing = list(dict.fromkeys(name for name in names if name not in found))
+            versions = {name: self._versions.get(name, 0) for name in missing}
+
+        if missing:
+            loaded = dict(zip(missing, self._inner.fetch_many(*missing), strict=True))
+            with self._lock:
+                for name, obj in loaded.items():
+                    if self._versions.get(name, 0) == versions[name]:
+                        self._insert(name, obj, dirty=False)
+            found.update(loaded)
+
+        return [found[name] for name in names]
+
+    def store_one(self, name: str, obj: Obj) -> None:
+        self.store_many(**{name: obj})
+
+    def store_many(self, **name_to_obj_map: Obj) -> None:
+        with self._lock:
+            if self._mode == "write-through":
+                self._inner.store_many(**name_to_obj_map)
+            for name, obj in name_to_obj_map.items():
+                self._versions[name] = self._versions.get(name, 0) + 1
+                self._insert(name, obj, dirty=self._mode == "write-back")
+
+    def list_names(self) -> Sequence[str]:
+        with self._lock:
+            return sorted({*self._inner.list_names(), *self._dirty})
+
+    def nbytes(self, *names: str) -> int | None:
+        with self._lock:
+            if not isinstance(self._inner, SizedPipelineStorage) or self._dirty.intersection(names):
+                return None
+            return self._inner.nbytes(*names)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._dirty:
+                self._inner.store_many(**{name: self._entries[name][0] for name in self._dirty})
+                self._dirty.clear()
+
+    def on_run_end(self) -> None:
+        self.flush()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.flush()
+            self._entries.clear()
+            self._nbytes = 0
+
+    def _lookup(self, name: str) -> Obj:
+        if self._policy == "lru":
+            self._entries.move_to_end(name)
+        obj = self._entries[name][0]
+        return obj if self._share_objects else deepcopy(obj)
+
+    def _insert(self, name: str, obj: Obj, *, dirty: bool) -> None:
+        self._remove(name)
+        size = approximate_nbytes(obj)
+        if size > self._max_bytes:
+            if dirty:
+                self._inner.store_one(name, obj)
+            self._dirty.discard(name)
+            return
+
+        self._entries[name] = (obj, size)
+        self._nbytes += size
+        if dirty:
+            self._dirty.add(name)
+        else:
+            self._dirty.discard(name)
+
+        while self._nbytes > self._max_bytes:
+            evicted_name, (evicted_obj, _) = next(iter(self._entries.items()))
+            if evicted_name in self._dirty:
+                self._inner.store_one(evicted_name, evicted_obj)
+                self._dirty.discard(evicted_name)
+            self._remove(evicted_name)
+            self._evictions += 1
+
+    def _remove(self, name: str) -> None:
+        if (entry := self._entries.pop(name, None)) is not None:
+            self._nbytes -= entry[1]
+
+
+class _DeletableCachedPipelineStorage(CachedPipelineStorage):
+    def delete_one(self, name: str) -> None:
+        self.delete_many(name)
+
+    def delete_many(self, *names: str) -> None:
+        with self._lock:
+            for name in names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+                self._remove(name)
+                self._dirty.discard(name)
+            cast(DeletablePipelineStorage, self._inner).delete_many(*names)
+
+
+def approximate_nbytes(obj: Obj) -> int:
+    seen: set[int] = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, Mapping):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, list | tuple | set | frozenset):
+            stack.extend(item)
+    return total
@@ -0,0 +1,129 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import Counter
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+
+from timothy._atomicfile import atomic_write
+from timothy._filelock import file_lock
+from timothy.core import Obj
+
+
+class ContentAddressedPipelineStorage:
+    def __init__(self, root: Path, *, namespace: str = "default") -> None:
+        self._root = root
+        self._namespace = namespace
+
+    @property
+    def root(self) -> Path:
+        return self._root
+
+    @property
+    def namespace(self) -> str:
+        return self._namespace
+
+    def fetch_one(self, name: str) -> Obj:
+        with self._blob_path(self.digest(name)).open("rb") as f:
+            return json.load(f)
+
+    def fetch_many(self, *names: str) -> Sequence[Obj]:
+        return [self.fetch_one(name) for name in names]
+
+    def store_one(self, name: str, obj: Obj) -> None:
+        data = json.dumps(obj).encode()
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(digest)
+        with file_lock(self._lock_path(), shared=True):
+            if blob_path.exists():
+                os.utime(blob_path)
+            else:
+                blob_path.parent.mkdir(parents=True, exist_ok=True)
+                with atomic_write(blob_path, "wb") as f:
+                    f.write(data)
+            self._write_ref(name, digest)
+
+    def store_many(self, **name_to_obj_map: Obj) -> None:
+        for name, obj in name_to_obj_map.items():
+            self.store_one(name, obj)
+
+    def delete_one(self, name: str) -> None:
+        self._ref_path(name).unlink(missing_ok=True)
+
+    def delete_many(self, *names: str) -> None:
+        for name in names:
+            self.delete_one(name)
+
+    def list_names(self) -> Sequence[str]:
+        return sorted(p.stem for p in self._refs_dir().glob("*.ref"))
+
+    def nbytes(self, *names: str) -> int | None:
+        try:
+            return sum(self._blob_path(self.digest(name)).stat().st_size for name in names)
+        except FileNotFoundError:
+            return None
+
+    def digest(self, name: str) -> str:
+        return self._ref_path(name).read_text()
+
+    def link(self, name: str, digest: str) -> None:
+        with file_lock(self._lock_path(), shared=True):
+            if not (blob_path := self._blob_path(digest)).exists():
+                msg = f"No blob with digest {digest!r}"
+                raise KeyError(msg)
+            os.utime(blob_path)
+            self._write_ref(name, digest)
+
+    def refcounts(self) -> Mapping[str, int]:
+        refs_root = self.root / "refs"
+        return Counter(path.read_text() for path in refs_root.glob("*/*.ref"))
+
+    def collect_garbage(self, *, min_age_seconds: float = 3600.0) -> int:
+        with file_lock(self._lock_path()):
+            referenced = self.refcounts()
+            cutoff = time.time() - min_age_seconds
+            removed = 0
+            for blob_path in (self.root / "blobs").glob("*/*.json"):
+                digest = blob_path.parent.name + blob_path.stem
+                if digest in referenced:
+                    continue
+                try:
+                    if blob_path.stat().st_mtime < cutoff:
+                        blob_path.unlink()
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+            return removed
+
+    def _write_ref(self, name: str, digest: str) -> None:
+        self._refs_dir().mkdir(parents=True, exist_ok=True)
+        with atomic_write(self._ref_path(name)) as f:
+            f.write(digest)
+
+    def _lock_path(self) -> Path:
+        return self.root / ".lock"
+
+    def _refs_dir(self) -> Path:
+        return self.root / "refs" / self.namespace
+
+    def _ref_path(self, name: str) -> Path:
+        return self._refs_dir() / f"{name}.ref"
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.root / "blobs" / digest[:2] / f"{digest[2:]}.json"
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        "timothy-cas-gc",
+        description="Remove unreferenced blobs from a content-addressed pipeline store.",
+    )
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--min-age-seconds", type=float, default=3600.0)
+    args = parser.parse_args(argv)
+    storage = ContentAddressedPipelineStorage(args.root)
+    removed = storage.collect_garbage(min_age_seconds=args.min_age_seconds)
+    sys.stdout.write(f"Removed {removed} unreferenced blobs\n")
@@ -1,8 +1,21 @@
+import hashlib
 import json
-from collections.abc import MutableMapping, Sequence
+import os
+import secrets
+import time
+from collections.abc import Collection, Iterable, Iterator, Mapping, MutableMapping, Sequence
+from contextlib import suppress
+from dataclasses import asdict, dataclass
 from pathlib import Path
+from threading import Lock
+from types import MappingProxyType
+from typing import IO, Any
 
-from timothy.core import Obj
+from timothy._atomicfile import atomic_write
+from timothy._codecs import Codec, CodecName, as_codec, decompress
+from timothy._filelock import file_lock
+from timothy.core import NamespacedPipelineStorage, Obj
+from timothy.exceptions import StaleRowStreamError
 
 
 class MemoryPipelineStorage:
@@ -21,33 +34,320 @@ class MemoryPipelineStorage:
     def store_one(self, name: str, obj: Obj) -> None:
         self.store_many(**{name: obj})
 
+    def delete_one(self, name: str) -> None:
+        self._storage.pop(name, None)
+
+    def delete_many(self, *names: str) -> None:
+        for name in names:
+            self.delete_one(name)
+
     def list_names(self) -> Sequence[str]:
         return sorted(self._storage.keys())
 
 
+class RowStream:
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._version = _file_version(path.stat())
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def __iter__(self) -> Iterator[Obj]:
+        with self._open() as f:
+            for line in f:
+                yield json.loads(line)
+
+    def __len__(self) -> int:
+        with self._open() as f:
+            return sum(1 for _ in f)
+
+    def _open(self) -> IO[bytes]:
+        try:
+            f = self._path.open("rb")
+        except FileNotFoundError:
+            msg = f"Rows at {self._path} were deleted after they were fetched"
+            raise StaleRowStreamError(msg) from None
+        if _file_version(os.fstat(f.fileno())) != self._version:
+            f.close()
+            msg = f"Rows at {self._path} were overwritten after they were fetched"
+            raise StaleRowStreamError(msg)
+        return f
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._path!r})"
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    nbytes: int
+    stored_at: float
+    raw_nbytes: int | None = None
+
+
 class JSONFilePipelineStorage:
-    def __init__(self, location: Path) -> None:
+    def __init__(  # noqa: PLR0913
+        self,
+        location: Path,
+        *,
+        fsync: bool = False,
+        shard_depth: int = 0,
+        codec: Codec | CodecName = "none",
+        codecs: Mapping[str, Codec | CodecName] | None = None,
+        rows: Collection[str] = (),
+    ) -> None:
         self._location = location
+        self._fsync = fsync
+        self._shard_depth = shard_depth
+        self._codec = as_codec(codec)
+        self._codecs = {name: as_codec(c) for name, c in (codecs or {}).items()}
+        self._rows = frozenset(rows)
+        self._namespaces: set[str] = set()
+        self._entries: dict[str, ManifestEntry] = {}
+        self._manifest_id: tuple[int, int, bytes] | None = None
+        self._manifest_offset = 0
+        self._indexed = False
+        self._lock = Lock()
 
     @property
     def location(self) -> Path:
         return self._location
 
+    @property
+    def shard_depth(self) -> int:
+        return self._shard_depth
+
+    @property
+    def codec(self) -> Codec:
+        return self._codec
+
+    def codec_for(self, name: str) -> Codec:
+        return self._codecs.get(self._base_name(name), self._codec)
+
+    @property
+    def rows(self) -> Collection[str]:
+        return self._rows
+
+    def stores_lazily(self, name: str) -> bool:
+        return self._stores_rows(name)
+
+    def add_namespace(self, namespace: str) -> None:
+        self._namespaces.add(namespace)
+
+    @property
+    def manifest(self) -> Mapping[str, ManifestEntry]:
+        with self._lock:
+            self._refresh_manifest()
+            return MappingProxyType(dict(self._entries))
+
     def fetch_one(self, name: str) -> Obj:
-        with (self.location / f"{name}.json").open("r") as f:
-            return json.load(f)
+        if self._stores_rows(name):
+            return RowStream(self._path(name))
+        return json.loads(decompress(self._path(name).read_bytes()))
 
     def fetch_many(self, *names: str) -> Sequence[Obj]:
         return [self.fetch_one(name) for name in names]
 
     def store_one(self, name: str, obj: Obj) -> None:
-        self.location.mkdir(parents=True, exist_ok=True)
-        with (self.location / f"{name}.json").open("w") as f:
-            return json.dump(obj, f)
+        if self._stores_rows(name):
+            self._store_rows(name, obj)
+            return
+        path = self._path(name)
+        raw = json.dumps(obj).encode()
+        data = self.codec_for(name).compress(raw)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(path, "wb", fsync=self._fsync) as f:
+            f.write(data)
+        self._append_to_manifest(
+            {"name": name, "nbytes": len(data), "raw_nbytes": len(raw), "stored_at": time.time()},
+        )
 
     def store_many(self, **name_to_obj_map: Obj) -> None:
         for name, obj in name_to_obj_map.items():
             self.store_one(name, obj)
 
+    def delete_one(self, name: str) -> None:
+        self._path(name).unlink(missing_ok=True)
+        self._append_to_manifest({"name": name, "deleted": True})
+
+    def delete_many(self, *names: str) -> None:
+        for name in names:
+            self.delete_one(name)
+
+    def nbytes(self, *names: str) -> int | None:
+        with self._lock:
+            self._refresh_manifest()
+            entries = [self._entry(name) for name in names]
+            if any(entry is None for entry in entries):
+                return None
+            return sum(entry.nbytes for entry in entries if entry is not None)
+
+    def raw_nbytes(self, *names: str) -> int | None:
+        with self._lock:
+            self._refresh_manifest()
+            total = 0
+            for name in names:
+                if (entry := self._entry(name)) is None or entry.raw_nbytes is None:
+                    return None
+                total += entry.raw_nbytes
+            return total
+
     def list_names(self) -> Sequence[str]:
-        return [p.stem for p in self.location.glob("*")]
+        with self._lock:
+            self._refresh_manifest()
+            return sorted(self._entries)
+
+    def compact_manifest(self) -> None:
+        with self._lock, file_lock(self._manifest_lock_path()):
+            self._refresh_manifest()
+            self._write_manifest(self._entries)
+
+    def reindex(self) -> None:
+        with self._lock, file_lock(self._manifest_lock_path()):
+            self._refresh_manifest()
+            self._index_unlisted_files()
+            self._write_manifest(self._entries)
+
+    def _store_rows(self, name: str, rows: Obj) -> None:
+        if isinstance(rows, Mapping | str | bytes) or not isinstance(rows, Iterable):
+            msg = f"Object {name!r} is stored as rows and must be an iterable of rows"
+            raise TypeError(msg)
+        path = self._path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        nbytes = 0
+        with atomic_write(path, "wb", fsync=self._fsync) as f:
+            for row in rows:
+                nbytes += f.write(json.dumps(row).encode() + b"\n")
+        self._append_to_manifest(
+            {"name": name, "nbytes": nbytes, "raw_nbytes": nbytes, "stored_at": time.time()},
+        )
+
+    def _stores_rows(self, name: str) -> bool:
+        return self._base_name(name) in self._rows
+
+    def _base_name(self, name: str) -> str:
+        parts = name.split(NamespacedPipelineStorage.separator)
+        for i in range(len(parts) - 1, 0, -1):
+            if NamespacedPipelineStorage.separator.join(parts[:i]) in self._namespaces:
+                return NamespacedPipelineStorage.separator.join(parts[i:])
+        return name
+
+    def _path(self, name: str) -> Path:
+        filename = f"{name}.jsonl" if self._stores_rows(name) else f"{name}.json"
+        if not self._shard_depth:
+            return self.location / filename
+        digest = hashlib.blake2b(name.encode(), digest_size=self._shard_depth).hexdigest()
+        shards = (digest[i : i + 2] for i in range(0, 2 * self._shard_depth, 2))
+        return self.location.joinpath(*shards, filename)
+
+    def _manifest_path(self) -> Path:
+        return self.location / _MANIFEST_NAME
+
+    def _manifest_lock_path(self) -> Path:
+        return self.location / _MANIFEST_LOCK_NAME
+
+    def _entry(self, name: str) -> ManifestEntry | None:
+        if (entry := self._entries.get(name)) is None and (path := self._path(name)).is_file():
+            stat = path.stat()
+            entry = self._entries[name] = ManifestEntry(stat.st_size, stat.st_mtime)
+        return entry
+
+    def _append_to_manifest(self, record: Mapping[str, object]) -> None:
+        with self._lock:
+            self._refresh_manifest()
+            if not self._manifest_path().exists():
+                with file_lock(self._manifest_lock_path()):
+                    self._refresh_manifest()
+                    if not self._manifest_path().exists():
+                        self._write_manifest(self._entries)
+            with (
+                file_lock(self._manifest_lock_path(), shared=True),
+                self._manifest_path().open("ab+") as f,
+            ):
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+                f.write(json.dumps(record).encode() + b"\n")
+            self._apply_manifest_record(record)
+
+    def _refresh_manifest(self) -> None:
+        with suppress(FileNotFoundError), self._manifest_path().open("rb") as f:
+            stat = os.fstat(f.fileno())
+            if (manifest_id := (stat.st_dev, stat.st_ino, f.readline())) != self._manifest_id:
+                self._manifest_id = manifest_id
+                self._manifest_offset = 0
+                self._entries = {}
+                self._indexed = False
+            self._read_manifest(f, stat.st_size)
+            return
+        if not self._indexed:
+            self._index_unlisted_files()
+
+    def _read_manifest(self, f: IO[bytes], size: int) -> None:
+        if size <= self._manifest_offset:
+            return
+        f.seek(self._manifest_offset)
+        data = f.read(size - self._manifest_offset)
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].splitlines():
+            if (record := _parse_manifest_line(line)) is not None:
+                self._apply_manifest_record(record)
+        self._manifest_offset += complete
+
+    def _index_unlisted_files(self) -> None:
+        self._indexed = True
+        pattern = "**/*.json*" if self._shard_depth else "*.json*"
+        for path in self.location.glob(pattern):
+            if (
+                path.name == _MANIFEST_NAME
+                or path.stem in self._entries
+                or path != self._path(path.stem)
+            ):
+                continue
+            with suppress(FileNotFoundError):
+                stat = path.stat()
+                self._entries[path.stem] = ManifestEntry(stat.st_size, stat.st_mtime)
+
+    def _write_manifest(self, entries: Mapping[str, ManifestEntry]) -> None:
+        header = {"shard_depth": self._shard_depth, "generation": secrets.token_hex(8)}
+        lines = [json.dumps(header)]
+        lines.extend(json.dumps({"name": name, **asdict(entry)}) for name, entry in entries.items())
+        with atomic_write(self._manifest_path(), fsync=self._fsync) as f:
+            f.write("\n".join(lines) + "\n")
+        stat = self._manifest_path().stat()
+        self._entries = dict(entries)
+        self._manifest_id = (stat.st_dev, stat.st_ino, lines[0].encode() + b"\n")
+        self._manifest_offset = stat.st_size
+
+    def _apply_manifest_record(self, record: Mapping[str, Any]) -> None:
+        if "shard_depth" in record:
+            if record["shard_depth"] != self._shard_depth:
+                msg = (
+                    f"Storage at {self.location} uses shard_depth={record['shard_depth']}, "
+                    f"not {self._shard_depth}"
+                )
+                raise ValueError(msg)
+        elif record.get("deleted"):
+            self._entries.pop(record["name"], None)
+        else:
+            self._entries[record["name"]] = ManifestEntry(
+                record["nbytes"],
+                record["stored_at"],
+                record.get("raw_nbytes"),
+            )
+
+
+_MANIFEST_NAME = ".manifest.jsonl"
+_MANIFEST_LOCK_NAME = ".manifest.lock"
+
+
+def _file_version(stat: os.stat_result) -> tuple[int, int, int, int]:
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _parse_manifest_line(line: bytes) -> Mapping[str, Any] | None:
+    with suppress(json.JSONDecodeError):
+        return json.loads(line)
+    return None
@@ -0,0 +1,149 @@
+import array
+import io
+import mmap
+import pickle
+import shutil
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import Any
+
+from timothy._atomicfile import atomic_write
+from timothy.core import Obj
+
+_DEFAULT_MIN_BUFFER_BYTES = 64 * 1024
+
+
+class PicklePipelineStorage:
+    def __init__(
+        self,
+        location: Path,
+        *,
+        min_buffer_bytes: int = _DEFAULT_MIN_BUFFER_BYTES,
+    ) -> None:
+        self._location = location
+        self._min_buffer_bytes = min_buffer_bytes
+
+    @property
+    def location(self) -> Path:
+        return self._location
+
+    @property
+    def min_buffer_bytes(self) -> int:
+        return self._min_buffer_bytes
+
+    def fetch_one(self, name: str) -> Obj:
+        buffers = [_mapped(path) for path in self._buffer_paths(name)]
+        with self._pickle_path(name).open("rb") as f:
+            return _OutOfBandUnpickler(f, buffers=buffers).load()
+
+    def fetch_many(self, *names: str) -> Sequence[Obj]:
+        return [self.fetch_one(name) for name in names]
+
+    def store_one(self, name: str, obj: Obj) -> None:
+        buffers: list[pickle.PickleBuffer] = []
+        data = io.BytesIO()
+        _OutOfBandPickler(data, self._min_buffer_bytes, buffers.append).dump(obj)
+
+        self.location.mkdir(parents=True, exist_ok=True)
+        self._pickle_path(name).unlink(missing_ok=True)
+        shutil.rmtree(self._buffers_dir(name), ignore_errors=True)
+        if buffers:
+            self._buffers_dir(name).mkdir()
+        for i, buffer in enumerate(buffers):
+            with (self._buffers_dir(name) / str(i)).open("wb") as f:
+                f.write(buffer.raw())
+        with atomic_write(self._pickle_path(name), "wb") as f:
+            f.write(data.getbuffer())
+
+    def store_many(self, **name_to_obj_map: Obj) -> None:
+        for name, obj in name_to_obj_map.items():
+            self.store_one(name, obj)
+
+    def delete_one(self, name: str) -> None:
+        self._pickle_path(name).unlink(missing_ok=True)
+        shutil.rmtree(self._buffers_dir(name), ignore_errors=True)
+
+    def delete_many(self, *names: str) -> None:
+        for name in names:
+            self.delete_one(name)
+
+    def list_names(self) -> Sequence[str]:
+        return sorted(p.stem for p in self.location.glob("*.pkl"))
+
+    def nbytes(self, *names: str) -> int | None:
+        try:
+            return sum(
+                path.stat().st_size
+                for name in names
+                for path in (self._pickle_path(name), *self._buffer_paths(name))
+            )
+        except FileNotFoundError:
+            return None
+
+    def _pickle_path(self, name: str) -> Path:
+        return self.location / f"{name}.pkl"
+
+    def _buffers_dir(self, name: str) -> Path:
+        return self.location / f"{name}.buffers"
+
+    def _buffer_paths(self, name: str) -> list[Path]:
+        if not (buffers_dir := self._buffers_dir(name)).is_dir():
+            return []
+        return sorted(buffers_dir.iterdir(), key=lambda p: int(p.name))
+
+
+class _OutOfBandPickler(pickle.Pickler):
+    def __init__(
+        self,
+        file: io.BytesIO,
+        min_buffer_bytes: int,
+        collect_buffer: Callable[[pickle.PickleBuffer], None],
+    ) -> None:
+        def buffer_callback(buffer: pickle.PickleBuffer) -> bool:
+            if buffer.raw().nbytes < min_buffer_bytes:
+                return True
+            collect_buffer(buffer)
+            return False
+
+        super().__init__(file, protocol=5, buffer_callback=buffer_callback)
+        self._min_buffer_bytes = min_buffer_bytes
+
+    def persistent_id(self, obj: Any) -> Any:
+        if type(obj) not in _BUFFER_TYPES:
+            return None
+        view = memoryview(obj)
+        if view.nbytes < self._min_buffer_bytes or not view.contiguous:
+            return None
+        if isinstance(obj, array.array):
+            return "array", pickle.PickleBuffer(obj), obj.typecode
+        if isinstance(obj, memoryview):
+            return "memoryview", pickle.PickleBuffer(obj), (view.format, view.shape)
+        return type(obj).__name__, pickle.PickleBuffer(obj), None
+
+
+class _OutOfBandUnpickler(pickle.Unpickler):
+    def persistent_load(self, pid: Any) -> Any:
+        kind, buffer, extra = pid
+        if kind == "bytes":
+            return bytes(buffer)
+        if kind == "bytearray":
+            return bytearray(buffer)
+        if kind == "array":
+            arr = array.array(extra)
+            arr.frombytes(buffer)
+            return arr
+        if kind == "memoryview":
+            fmt, shape = extra
+            return memoryview(buffer).cast("B").cast(fmt, shape)
+        msg = f"Unknown out-of-band object kind: {kind!r}"
+        raise pickle.UnpicklingError(msg)
+
+
+_BUFFER_TYPES = frozenset({bytes, bytearray, array.array, memoryview})
+
+
+def _mapped(path: Path) -> memoryview:
+    with path.open("rb") as f:
+        if path.stat().st_size == 0:
+            return memoryview(b"")
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY))
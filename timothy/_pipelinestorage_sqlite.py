@@ -0,0 +1,142 @@
+import json
+import sqlite3
+import threading
+import weakref
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import Any
+
+from timothy.core import Obj
+
+_MAX_VARIABLES_PER_QUERY = 900
+
+
+class SQLitePipelineStorage:
+    def __init__(self, location: Path) -> None:
+        self._location = location
+        self._local = threading.local()
+        self._connections: set[sqlite3.Connection] = set()
+        self._connections_lock = threading.Lock()
+
+        with self._transaction() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS objects (name TEXT PRIMARY KEY, value TEXT NOT NULL)"
+                " WITHOUT ROWID",
+            )
+
+    @property
+    def location(self) -> Path:
+        return self._location
+
+    def fetch_one(self, name: str) -> Obj:
+        return self.fetch_many(name)[0]
+
+    def fetch_many(self, *names: str) -> Sequence[Obj]:
+        values = self._select_by_name("value", names)
+        if missing := tuple(dict.fromkeys(name for name in names if name not in values)):
+            raise KeyError(missing if len(missing) > 1 else missing[0])
+        return [json.loads(values[name]) for name in names]
+
+    def store_one(self, name: str, obj: Obj) -> None:
+        self.store_many(**{name: obj})
+
+    def store_many(self, **name_to_obj_map: Obj) -> None:
+        rows = [(name, json.dumps(obj)) for name, obj in name_to_obj_map.items()]
+        with self._transaction() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO objects (name, value) VALUES (?, ?)",
+                rows,
+            )
+
+    def delete_one(self, name: str) -> None:
+        self.delete_many(name)
+
+    def delete_many(self, *names: str) -> None:
+        with self._transaction() as connection:
+            connection.executemany("DELETE FROM objects WHERE name = ?", [(n,) for n in names])
+
+    def list_names(self) -> Sequence[str]:
+        rows = self._connection().execute("SELECT name FROM objects ORDER BY name")
+        return [name for (name,) in rows]
+
+    def nbytes(self, *names: str) -> int | None:
+        sizes = self._select_by_name("length(CAST(value AS BLOB))", names)
+        if any(name not in sizes for name in names):
+            return None
+        return sum(sizes[name] for name in names)
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def _select_by_name(self, column: str, names: Sequence[str]) -> dict[str, Any]:
+        selected: dict[str, Any] = {}
+        for chunk in _chunks(list(dict.fromkeys(names)), _MAX_VARIABLES_PER_QUERY):
+            where = f"name IN ({', '.join('?' * len(chunk))})"
+            query = f"SELECT name, {column} FROM objects WHERE {where}"  # noqa: S608
+            selected.update(self._connection().execute(query, chunk))
+        return selected
+
+    def _connection(self) -> sqlite3.Connection:
+        holder: _ConnectionHolder | None = getattr(self._local, "holder", None)
+        if holder is None:
+            self._location.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                self._location,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA busy_timeout=30000")
+            holder = _ConnectionHolder(connection)
+            weakref.finalize(
+                holder,
+                _close_connection,
+                connection,
+                self._connections,
+                self._connections_lock,
+            )
+            self._local.holder = holder
+            with self._connections_lock:
+                self._connections.add(connection)
+        return holder.connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+
+class _ConnectionHolder:
+    __slots__ = ("__weakref__", "connection")
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+
+
+def _close_connection(
+    connection: sqlite3.Connection,
+    connections: set[sqlite3.Connection],
+    lock: threading.Lock,
+) -> None:
+    with lock:
+        connections.discard(connection)
+    connection.close()
+
+
+def _chunks(names: list[str], size: int) -> Iterator[list[str]]:
+    it = iter(names)
+    while chunk := list(islice(it, size)):
+        yield chunk
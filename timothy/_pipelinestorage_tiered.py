@@ -0,0 +1,173 @@
+import math
+from collections import OrderedDict
+from collections.abc import MutableMapping, Sequence
+from threading import RLock
+from typing import Any, cast
+
+from timothy._pipelinestorage_cached import approximate_nbytes
+from timothy.core import (
+    DeletablePipelineStorage,
+    Obj,
+    PipelineHooks,
+    PipelineStage,
+    PipelineStageSet,
+    PipelineStorage,
+    SizedPipelineStorage,
+    StorageAccess,
+)
+from timothy.exceptions import CannotRunPipelineError
+
+
+class TieredPipelineStorage(PipelineHooks):
+    def __new__(cls, *args: Any, **kwargs: Any) -> "TieredPipelineStorage":
+        disk = args[0] if args else kwargs.get("disk")
+        if cls is TieredPipelineStorage and isinstance(disk, DeletablePipelineStorage):
+            return super().__new__(_DeletableTieredPipelineStorage)
+        return super().__new__(cls)
+
+    def __init__(self, disk: PipelineStorage, *, max_bytes: int) -> None:
+        self._disk = disk
+        self._max_bytes = max_bytes
+        self._memory: OrderedDict[str, tuple[Obj, int]] = OrderedDict()
+        self._on_disk: set[str] = set(disk.list_names())
+        self._memory_nbytes = 0
+        self._remaining_uses: MutableMapping[str, set[int]] = {}
+        self._positions: MutableMapping[str, int] = {}
+        self._running = False
+        self._lock = RLock()
+
+    @property
+    def disk(self) -> PipelineStorage:
+        return self._disk
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @property
+    def memory_nbytes(self) -> int:
+        return self._memory_nbytes
+
+    def in_memory(self, name: str) -> bool:
+        return name in self._memory
+
+    def fetch_one(self, name: str) -> Obj:
+        with self._lock:
+            if name in self._memory:
+                self._memory.move_to_end(name)
+                return self._memory[name][0]
+            obj = self._disk.fetch_one(name)
+            self._keep_in_memory(name, obj)
+            return obj
+
+    def fetch_many(self, *names: str) -> Sequence[Obj]:
+        return [self.fetch_one(name) for name in names]
+
+    def store_one(self, name: str, obj: Obj) -> None:
+        with self._lock:
+            self._forget_in_memory(name)
+            if name in self._on_disk and isinstance(self._disk, DeletablePipelineStorage):
+                self._disk.delete_one(name)
+                self._on_disk.discard(name)
+            elif name in self._on_disk:
+                self._disk.store_one(name, obj)
+            self._keep_in_memory(name, obj)
+
+    def store_many(self, **name_to_obj_map: Obj) -> None:
+        for name, obj in name_to_obj_map.items():
+            self.store_one(name, obj)
+
+    def list_names(self) -> Sequence[str]:
+        with self._lock:
+            return sorted(self._memory.keys() | self._on_disk)
+
+    def nbytes(self, *names: str) -> int | None:
+        with self._lock:
+            on_disk = [name for name in names if name not in self._memory]
+            in_memory = sum(self._memory[name][1] for name in names if name in self._memory)
+            if not on_disk:
+                return in_memory
+            if not isinstance(self._disk, SizedPipelineStorage):
+                return None
+            disk_nbytes = self._disk.nbytes(*on_disk)
+            return None if disk_nbytes is None else in_memory + disk_nbytes
+
+    def spill(self) -> None:
+        with self._lock:
+            while self._memory:
+                self._spill(next(iter(self._memory)))
+
+    def on_run_start(self, stages: PipelineStageSet, storage: PipelineStorage) -> None:
+        del storage
+        plan = stages.plan
+        positions = {name: i for i, name in enumerate(n for level in plan.levels for n in level)}
+        remaining_uses: dict[str, set[int]] = {}
+        for stage_name, position in positions.items():
+            for param in plan.stages[stage_name].params:
+                remaining_uses.setdefault(param, set()).add(position)
+        with self._lock:
+            if self._running:
+                msg = f"{type(self).__name__} cannot be used by concurrent runs"
+                raise CannotRunPipelineError(msg)
+            self._running = True
+            self._positions = positions
+            self._remaining_uses = remaining_uses
+
+    def on_fetch(self, stage: PipelineStage, access: StorageAccess) -> None:
+        del access
+        with self._lock:
+            if (position := self._positions.get(stage.name)) is None:
+                return
+            for param in stage.params:
+                self._remaining_uses.get(param, set()).discard(position)
+
+    def on_run_end(self) -> None:
+        with self._lock:
+            self._running = False
+            self._positions = {}
+            self._remaining_uses = {}
+
+    def _keep_in_memory(self, name: str, obj: Obj) -> None:
+        size = approximate_nbytes(obj)
+        if size > self._max_bytes:
+            if name not in self._on_disk:
+                self._disk.store_one(name, obj)
+                self._on_disk.add(name)
+            return
+
+        self._memory[name] = (obj, size)
+        self._memory_nbytes += size
+        while self._memory_nbytes > self._max_bytes:
+            self._spill(self._victim(keep=name))
+
+    def _victim(self, keep: str) -> str:
+        candidates = (name for name in self._memory if name != keep)
+        if not self._remaining_uses:
+            return next(candidates)
+        return max(candidates, key=self._next_use)
+
+    def _next_use(self, name: str) -> float:
+        return min(self._remaining_uses.get(name) or (math.inf,))
+
+    def _spill(self, name: str) -> None:
+        obj, _ = self._memory[name]
+        if name not in self._on_disk:
+            self._disk.store_one(name, obj)
+            self._on_disk.add(name)
+        self._forget_in_memory(name)
+
+    def _forget_in_memory(self, name: str) -> None:
+        if (entry := self._memory.pop(name, None)) is not None:
+            self._memory_nbytes -= entry[1]
+
+
+class _DeletableTieredPipelineStorage(TieredPipelineStorage):
+    def delete_one(self, name: str) -> None:
+        self.delete_many(name)
+
+    def delete_many(self, *names: str) -> None:
+        with self._lock:
+            for name in names:
+                self._forget_in_memory(name)
+            self._on_disk.difference_update(names)
+            cast(DeletablePipelineStorage, self._disk).delete_many(*names)
@@ -0,0 +1,191 @@
+import pickle
+from collections.abc import Mapping, MutableMapping, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from threading import Lock
+from typing import Any, cast
+
+from timothy.core import (
+    DeletablePipelineStorage,
+    Obj,
+    PipelineHooks,
+    PipelineStage,
+    PipelineStagePlan,
+    PipelineStageSet,
+    PipelineStorage,
+    SizedPipelineStorage,
+    StageTiming,
+    StorageAccess,
+)
+from timothy.exceptions import CannotRunPipelineError
+
+
+class WriteBehindPipelineStorage(PipelineHooks):
+    def __new__(cls, *args: Any, **kwargs: Any) -> "WriteBehindPipelineStorage":
+        inner = args[0] if args else kwargs.get("inner")
+        if cls is WriteBehindPipelineStorage and isinstance(inner, DeletablePipelineStorage):
+            return super().__new__(_DeletableWriteBehindPipelineStorage)
+        return super().__new__(cls)
+
+    def __init__(self, inner: PipelineStorage, *, lookahead: int = 2) -> None:
+        self._inner = inner
+        self._lookahead = lookahead
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="timothy-io")
+        self._pending: MutableMapping[str, tuple[bytes, Future[None]]] = {}
+        self._prefetched: MutableMapping[str, Future[Obj]] = {}
+        self._errors: list[BaseException] = []
+        self._lock = Lock()
+        self._plan: PipelineStagePlan | None = None
+        self._schedule: tuple[str, ...] = ()
+        self._positions: MutableMapping[str, int] = {}
+        self._started: set[str] = set()
+        self._finished: set[str] = set()
+        self._running = False
+
+    @property
+    def inner(self) -> PipelineStorage:
+        return self._inner
+
+    @property
+    def lookahead(self) -> int:
+        return self._lookahead
+
+    def fetch_one(self, name: str) -> Obj:
+        with self._lock:
+            pending = self._pending.get(name)
+            prefetched = self._prefetched.pop(name, None)
+        if pending is not None:
+            return pickle.loads(pending[0])  # noqa: S301
+        if prefetched is not None and prefetched.exception() is None:
+            return prefetched.result()
+        return self._inner.fetch_one(name)
+
+    def fetch_many(self, *names: str) -> Sequence[Obj]:
+        return [self.fetch_one(name) for name in names]
+
+    def store_one(self, name: str, obj: Obj) -> None:
+        self.store_many(**{name: obj})
+
+    def store_many(self, **name_to_obj_map: Obj) -> None:
+        snapshots = {
+            name: pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+            for name, obj in name_to_obj_map.items()
+        }
+        with self._lock:
+            written = self._executor.submit(self._write, snapshots)
+            for name, snapshot in snapshots.items():
+                self._prefetched.pop(name, None)
+                self._pending[name] = (snapshot, written)
+        names = tuple(snapshots)
+        written.add_done_callback(lambda _: self._written(written, names))
+
+    def list_names(self) -> Sequence[str]:
+        with self._lock:
+            pending = set(self._pending)
+        return sorted(pending.union(self._inner.list_names()))
+
+    def nbytes(self, *names: str) -> int | None:
+        if not isinstance(self._inner, SizedPipelineStorage):
+            return None
+        with self._lock:
+            if not self._pending.keys().isdisjoint(names):
+                return None
+        return self._inner.nbytes(*names)
+
+    def prefetch(self, *names: str) -> None:
+        with self._lock:
+            for name in names:
+                if name not in self._pending and name not in self._prefetched:
+                    self._prefetched[name] = self._executor.submit(self._inner.fetch_one, name)
+
+    def flush(self) -> None:
+        with self._lock:
+            writes = {written for _, written in self._pending.values()}
+        wait(writes)
+        with self._lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            raise errors[0]
+
+    def close(self) -> None:
+        self.flush()
+        self._executor.shutdown()
+
+    def on_run_start(self, stages: PipelineStageSet, storage: PipelineStorage) -> None:
+        del storage
+        plan = stages.plan
+        with self._lock:
+            if self._running:
+                msg = f"{type(self).__name__} cannot be used by concurrent runs"
+                raise CannotRunPipelineError(msg)
+            self._running = True
+            self._plan = plan
+            self._schedule = tuple(name for level in plan.levels for name in level)
+            self._positions = {name: i for i, name in enumerate(self._schedule)}
+            self._started = set()
+            self._finished = set()
+
+    def on_stage_start(self, stage: PipelineStage) -> None:
+        with self._lock:
+            self._started.add(stage.name)
+
+    def on_fetch(self, stage: PipelineStage, access: StorageAccess) -> None:
+        del access
+        if (plan := self._plan) is None or (position := self._positions.get(stage.name)) is None:
+            return
+        upcoming: list[str] = []
+        with self._lock:
+            for i in range(position + 1, len(self._schedule)):
+                if len(upcoming) >= self._lookahead:
+                    break
+                if (name := self._schedule[i]) not in self._started:
+                    upcoming.append(name)
+            ready = [
+                param
+                for name in upcoming
+                for param in plan.stages[name].params
+                if (producer := plan.producers.get(param)) is None
+                or producer.name in self._finished
+            ]
+        self.prefetch(*ready)
+
+    def on_stage_end(self, stage: PipelineStage, timing: StageTiming) -> None:
+        del timing
+        with self._lock:
+            self._finished.add(stage.name)
+
+    def on_run_end(self) -> None:
+        with self._lock:
+            self._running = False
+            self._plan = None
+            self._prefetched.clear()
+        self.flush()
+
+    def _write(self, snapshots: Mapping[str, bytes]) -> None:
+        objs = {name: pickle.loads(snapshot) for name, snapshot in snapshots.items()}  # noqa: S301
+        self._inner.store_many(**objs)
+
+    def _written(self, written: Future[None], names: Sequence[str]) -> None:
+        with self._lock:
+            for name in names:
+                if (pending := self._pending.get(name)) is not None and pending[1] is written:
+                    del self._pending[name]
+            if (error := written.exception()) is not None:
+                self._errors.append(error)
+
+    def _wait_for_writes(self, names: Sequence[str]) -> None:
+        with self._lock:
+            writes = [pending[1] for name in names if (pending := self._pending.get(name))]
+        for written in writes:
+            written.result()
+
+
+class _DeletableWriteBehindPipelineStorage(WriteBehindPipelineStorage):
+    def delete_one(self, name: str) -> None:
+        self.delete_many(name)
+
+    def delete_many(self, *names: str) -> None:
+        self._wait_for_writes(names)
+        with self._lock:
+            for name in names:
+                self._prefetched.pop(name, None)
+        cast(DeletablePipelineStorage, self._inner).delete_many(*names)
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import pickle
+from collections.abc import Callable, MutableMapping, Sequence
+from pathlib import Path
+from threading import RLock
+from types import CodeType
+
+from timothy.core import Obj, PipelineStage, PipelineStorage
+
+
+class FingerprintStageCache:
+    def __init__(self, index: PipelineStorage) -> None:
+        self._index = index
+        self._fingerprints: MutableMapping[str, str] | None = None
+        self._lock = RLock()
+
+    @property
+    def index(self) -> PipelineStorage:
+        return self._index
+
+    def fingerprint(self, stage: PipelineStage, param_objs: Sequence[Obj]) -> str | None:
+        code = getattr(stage.func, "__code__", None)
+        if not isinstance(code, CodeType):
+            return None
+
+        if (encoded := _canonical_bytes([stage.params, stage.returns, list(param_objs)])) is None:
+            return None
+        digest = hashlib.sha256(encoded)
+        qualname = getattr(stage.func, "__qualname__", repr(stage.func))
+        digest.update(f"{stage.name}:{stage.func.__module__}.{qualname}".encode())
+        _update_with_code(digest.update, code)
+        if stage.map_over is not None:
+            digest.update(f"map_over:{stage.map_over}".encode())
+            if isinstance(combine_code := getattr(stage.combine, "__code__", None), CodeType):
+                _update_with_code(digest.update, combine_code)
+        return digest.hexdigest()
+
+    def digest(self, objs: Sequence[Obj]) -> str | None:
+        if (encoded := _canonical_bytes(list(objs))) is None:
+            return None
+        return hashlib.sha256(encoded).hexdigest()
+
+    def scope(self, storage: PipelineStorage) -> str:
+        return hashlib.sha256(_storage_identity(storage).encode()).hexdigest()[:16]
+
+    def lookup(self, stage_name: str, *, scope: str = "") -> str | None:
+        return self._loaded_fingerprints().get(_index_key(stage_name, scope))
+
+    def record(self, stage_name: str, fingerprint: str, *, scope: str = "") -> None:
+        key = _index_key(stage_name, scope)
+        with self._lock:
+            self._index.store_one(key, fingerprint)
+            self._loaded_fingerprints()[key] = fingerprint
+
+    def _loaded_fingerprints(self) -> MutableMapping[str, str]:
+        with self._lock:
+            if self._fingerprints is None:
+                names = self._index.list_names()
+                fingerprints = self._index.fetch_many(*names)
+                self._fingerprints = {n: str(f) for n, f in zip(names, fingerprints, strict=True)}
+            return self._fingerprints
+
+
+def _update_with_code(update: Callable[[bytes], None], code: CodeType) -> None:
+    update(code.co_code)
+    update(repr((code.co_names, code.co_varnames)).encode())
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            _update_with_code(update, const)
+        else:
+            update(repr(const).encode())
+
+
+def _index_key(stage_name: str, scope: str) -> str:
+    return f"{stage_name}.{scope}" if scope else stage_name
+
+
+def _storage_identity(storage: PipelineStorage) -> str:
+    parts = [
+        f"{attr}={Path(value).resolve() if isinstance(value, Path) else value}"
+        for attr in ("location", "root", "namespace")
+        if (value := getattr(storage, attr, None)) is not None
+    ]
+    parts.extend(
+        f"{attr}={_storage_identity(wrapped)}"
+        for attr in ("inner", "top", "base", "disk")
+        if (wrapped := getattr(storage, attr, None)) is not None
+    )
+    return f"{type(storage).__qualname__}({', '.join(parts) or id(storage)})"
+
+
+def _canonical_bytes(obj: Obj) -> bytes | None:
+    try:
+        return json.dumps(obj, sort_keys=True, default=_canonical_default).encode()
+    except (pickle.PicklingError, AttributeError, TypeError, ValueError):
+        return None
+
+
+def _canonical_default(obj: Obj) -> Obj:
+    if isinstance(obj, set | frozenset):
+        items = (json.dumps(item, sort_keys=True, default=_canonical_default) for item in obj)
+        return {"__set__": sorted(items)}
+    if isinstance(obj, bytes | bytearray):
+        return {"__bytes__": bytes(obj).hex()}
+    return {"__pickle__": hashlib.sha256(pickle.dumps(obj, protocol=5)).hexdigest()}
@@ -1,16 +1,59 @@
 """Core functionality."""
 
 from timothy.core._pipeline import Pipeline
-from timothy.core._pipelinestage import PipelineStage, PipelineStageSet
-from timothy.core._pipelinestagerunner import PipelineStageRunner
-from timothy.core._pipelinestorage import PipelineStorage
+from timothy.core._pipelinehooks import (
+    ConsumerCountingEvictor,
+    PipelineHooks,
+    StageTiming,
+    StorageAccess,
+)
+from timothy.core._pipelinestage import (
+    PipelineStage,
+    PipelineStagePlan,
+    PipelineStageSet,
+    concatenate,
+)
+from timothy.core._pipelinestagerunner import (
+    AsyncPipelineStageRunner,
+    HookedPipelineStageRunner,
+    PipelineStageRunner,
+)
+from timothy.core._pipelinestorage import (
+    CompressedPipelineStorage,
+    DeletablePipelineStorage,
+    LazyPipelineStorage,
+    NamespaceAwarePipelineStorage,
+    PipelineStorage,
+    SizedPipelineStorage,
+)
+from timothy.core._pipelinestorage_namespaced import NamespacedPipelineStorage
+from timothy.core._pipelinestorage_overlay import OverlayPipelineStorage
+from timothy.core._runreport import BatchRunReport, RunReport, RunReportCollector
 from timothy.core._typedefs import Obj
 
 __all__ = [
     "PipelineStage",
     "PipelineStageSet",
+    "PipelineStagePlan",
+    "concatenate",
     "Pipeline",
     "PipelineStageRunner",
+    "HookedPipelineStageRunner",
+    "AsyncPipelineStageRunner",
     "PipelineStorage",
     "Obj",
+    "PipelineHooks",
+    "ConsumerCountingEvictor",
+    "StageTiming",
+    "StorageAccess",
+    "DeletablePipelineStorage",
+    "SizedPipelineStorage",
+    "CompressedPipelineStorage",
+    "LazyPipelineStorage",
+    "NamespaceAwarePipelineStorage",
+    "NamespacedPipelineStorage",
+    "OverlayPipelineStorage",
+    "RunReport",
+    "BatchRunReport",
+    "RunReportCollector",
 ]
@@ -19,7 +19,13 @@ class InvalidParamsError(PipelineError): ...
 class CannotRunPipelineError(PipelineError): ...
 
 
+class UnpicklableStageError(CannotRunPipelineError): ...
+
+
 class PipelineConfigError(PipelineError): ...
 
 
 class MissingPipelineStageError(PipelineError): ...
+
+
+class StaleRowStreamError(PipelineError): ...
@@ -1,9 +1,22 @@
-from collections.abc import Callable, Mapping, Sequence
-from typing import Any, Generic, ParamSpec, TypeVar
+import asyncio
+from collections.abc import Callable, Collection, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
+from inspect import Parameter, signature
+from time import perf_counter
+from typing import Any, Generic, ParamSpec, Self, TypeGuard, TypeVar
 
-from timothy.core._pipelinestage import PipelineStage, PipelineStageSet
-from timothy.core._pipelinestagerunner import PipelineStageRunner
+from timothy.core._pipelinehooks import ConsumerCountingEvictor, PipelineHooks
+from timothy.core._pipelinestage import CombineFunction, PipelineStage, PipelineStageSet
+from timothy.core._pipelinestagerunner import (
+    AsyncPipelineStageRunner,
+    HookedPipelineStageRunner,
+    PipelineStageRunner,
+)
 from timothy.core._pipelinestorage import PipelineStorage
+from timothy.core._pipelinestorage_namespaced import NamespacedPipelineStorage
+from timothy.core._pipelinestorage_overlay import OverlayPipelineStorage
+from timothy.core._runreport import BatchRunReport, RunReport, RunReportCollector
 from timothy.core._typedefs import Obj
 from timothy.exceptions import PipelineConfigError
 
@@ -35,7 +48,8 @@ class Pipeline:
 
     def __init__(self, name: str, *, stages: PipelineStageSet | None = None) -> None:
         self._name = name
-        self._stages = stages or PipelineStageSet()
+        self._stages = stages if stages is not None else PipelineStageSet()
+        self._stages_shared = stages is not None
         self._maybe_storage: PipelineStorage | None = None
         self._maybe_stagerunner: PipelineStageRunner | None = None
 
@@ -45,22 +59,188 @@ class Pipeline:
 
     @property
     def stages(self) -> PipelineStageSet:
+        self._stages_shared = True
         return self._stages
 
+    def bind(
+        self,
+        *,
+        storage: PipelineStorage | None = None,
+        stagerunner: PipelineStageRunner | None = None,
+    ) -> Self:
+        bound = copy(self)
+        if storage is not None:
+            bound.storage = storage
+        if stagerunner is not None:
+            bound.stagerunner = stagerunner
+        return bound
+
+    def __copy__(self) -> Self:
+        self._stages_shared = True
+        copied = object.__new__(type(self))
+        copied.__dict__.update(self.__dict__)
+        return copied
+
     def add_stage(self, stage: PipelineStage) -> None:
-        self._stages += stage
+        if self._stages_shared:
+            self._stages = self._stages.copy()
+            self._stages_shared = False
+        self._stages.add(stage)
+
+    def run(  # noqa: PLR0913
+        self,
+        *,
+        run_id: str | None = None,
+        inputs: Mapping[str, Obj] | None = None,
+        targets: Sequence[str] | None = None,
+        resume: bool = False,
+        evict: bool = False,
+        pinned: Collection[str] = (),
+        hooks: Sequence[PipelineHooks] = (),
+    ) -> RunReport:
+        storage = self._run_storage(run_id, inputs)
+        return self._call_stagerunner(
+            self._stages_to_run(storage, targets, resume=resume),
+            storage,
+            [*hooks, *self._run_hooks(targets, evict=evict, pinned=pinned)],
+        )
+
+    async def arun(  # noqa: PLR0913
+        self,
+        *,
+        run_id: str | None = None,
+        inputs: Mapping[str, Obj] | None = None,
+        targets: Sequence[str] | None = None,
+        resume: bool = False,
+        evict: bool = False,
+        pinned: Collection[str] = (),
+        hooks: Sequence[PipelineHooks] = (),
+    ) -> RunReport:
+        storage = await asyncio.to_thread(self._run_storage, run_id, inputs)
+        stages = self._stages_to_run(storage, targets, resume=resume)
+        run_hooks = [*hooks, *self._run_hooks(targets, evict=evict, pinned=pinned)]
+        stagerunner = self.stagerunner
+        if not isinstance(stagerunner, AsyncPipelineStageRunner):
+            return await asyncio.to_thread(self._call_stagerunner, stages, storage, run_hooks)
+        collector = RunReportCollector()
+        await stagerunner.arun(stages, storage, hooks=[collector, *run_hooks])
+        return collector.report
+
+    def run_many(
+        self,
+        inputs: Sequence[Mapping[str, Obj]],
+        *,
+        run_ids: Sequence[str] | None = None,
+        shared_run_id: str | None = None,
+        max_workers: int | None = None,
+        hooks_factory: Callable[[], Sequence[PipelineHooks]] = tuple,
+    ) -> BatchRunReport:
+        if run_ids is None:
+            run_ids = [f"variation{i}" for i in range(len(inputs))]
+        if len(run_ids) != len(inputs) or len(set(run_ids)) != len(run_ids):
+            msg = "run_ids must be unique and match inputs one to one"
+            raise PipelineConfigError(msg)
+
+        started_at = perf_counter()
+        shared_inputs, varying = _split_inputs(inputs)
+        shared_storage = self._run_storage(shared_run_id, shared_inputs)
+        dependent = self._stages.downstream(varying)
+        dependent_names = set(dependent.names())
+        invariant = self._stages[[n for n in self._stages.names() if n not in dependent_names]]
+        shared_report = self._call_stagerunner(invariant, shared_storage, hooks_factory())
+
+        def run_variation(run_id: str, variation_inputs: Mapping[str, Obj]) -> RunReport:
+            storage = OverlayPipelineStorage(self.run_storage(run_id), shared_storage)
+            storage.store_many(**{n: obj for n, obj in variation_inputs.items() if n in varying})
+            return self._call_stagerunner(dependent, storage, hooks_factory())
+
+        if isinstance(self.storage, PipelineHooks):
+            max_workers = 1
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            reports = list(executor.map(run_variation, run_ids, inputs))
+        return BatchRunReport(
+            shared=shared_report,
+            runs=dict(zip(run_ids, reports, strict=True)),
+            wall_seconds=perf_counter() - started_at,
+        )
+
+    def run_storage(self, run_id: str | None) -> PipelineStorage:
+        if run_id is None:
+            return self.storage
+        return NamespacedPipelineStorage(self.storage, run_id)
 
-    def run(self) -> None:
-        self.stagerunner(self._stages, self.storage)
+    def _run_storage(self, run_id: str | None, inputs: Mapping[str, Obj] | None) -> PipelineStorage:
+        storage = self.run_storage(run_id)
+        if inputs:
+            storage.store_many(**inputs)
+        return storage
 
-    def register(
+    def _stages_to_run(
+        self,
+        storage: PipelineStorage,
+        targets: Sequence[str] | None,
+        *,
+        resume: bool,
+    ) -> PipelineStageSet:
+        if targets is None and not resume:
+            return self._stages
+        available = storage.list_names()
+        stages = self._stages if targets is None else self._stages.required(targets, available)
+        return stages.unfinished(available) if resume else stages
+
+    def _call_stagerunner(
+        self,
+        stages: PipelineStageSet,
+        storage: PipelineStorage,
+        hooks: Sequence[PipelineHooks],
+    ) -> RunReport:
+        stagerunner = self.stagerunner
+        if not _accepts_hooks(stagerunner):
+            if hooks:
+                msg = f"Stage runner {stagerunner!r} does not accept hooks"
+                raise PipelineConfigError(msg)
+            stagerunner(stages, storage)
+            return RunReport()
+        collector = RunReportCollector()
+        stagerunner(stages, storage, hooks=[collector, *hooks])
+        return collector.report
+
+    def _run_hooks(
+        self,
+        targets: Sequence[str] | None,
+        *,
+        evict: bool,
+        pinned: Collection[str],
+    ) -> list[PipelineHooks]:
+        hooks: list[PipelineHooks] = []
+        if evict:
+            hooks.append(ConsumerCountingEvictor(keep={*pinned, *(targets or ())}))
+        return hooks
+
+    def register(  # noqa: PLR0913
         self,
         returns: Sequence[str],
         name: str | None = None,
         params: Sequence[str] | None = None,
+        *,
+        run_in_process: bool | None = None,
+        map_over: str | None = None,
+        partitions: int | None = None,
+        combine: CombineFunction | None = None,
+        streaming: bool = False,
     ) -> Callable[[Callable[P, T]], Callable[P, T]]:
         def dec(f: Callable[P, T]) -> Callable[P, T]:
-            stage = PipelineStage(f, returns, name=name, params=params)
+            stage = PipelineStage(
+                f,
+                returns,
+                name=name,
+                params=params,
+                run_in_process=run_in_process,
+                map_over=map_over,
+                partitions=partitions,
+                combine=combine,
+                streaming=streaming,
+            )
             self.add_stage(stage)
             return f
 
@@ -69,7 +249,34 @@ class Pipeline:
     def set_values(self, **kwargs: Any) -> None:
         self.storage.store_many(**kwargs)
 
-    def get_values(self, *names: str) -> Mapping[str, Obj]:
+    def get_values(self, *names: str, run_id: str | None = None) -> Mapping[str, Obj]:
+        storage = self.run_storage(run_id)
         if not names:
-            names = tuple(self.storage.list_names())
-        return dict(zip(names, self.storage.fetch_many(*names), strict=True))
+            names = tuple(storage.list_names())
+        return dict(zip(names, storage.fetch_many(*names), strict=True))
+
+
+_MISSING: Any = object()
+
+
+def _accepts_hooks(stagerunner: PipelineStageRunner) -> TypeGuard[HookedPipelineStageRunner]:
+    try:
+        parameters = signature(stagerunner).parameters.values()
+    except (TypeError, ValueError):
+        return True
+    return any(p.name == "hooks" or p.kind is Parameter.VAR_KEYWORD for p in parameters)
+
+
+def _split_inputs(inputs: Sequence[Mapping[str, Obj]]) -> tuple[dict[str, Obj], set[str]]:
+    shared: dict[str, Obj] = {}
+    varying: set[str] = set()
+    for name in {name: None for variation in inputs for name in variation}:
+        first, *rest = (variation.get(name, _MISSING) for variation in inputs)
+        if first is _MISSING or any(obj is _MISSING for obj in rest):
+            msg = f"Input {name!r} must be given in every variation"
+            raise PipelineConfigError(msg)
+        if any(obj != first for obj in rest):
+            varying.add(name)
+        else:
+            shared[name] = first
+    return shared, varying
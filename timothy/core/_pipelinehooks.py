@@ -0,0 +1,80 @@
+from collections import Counter
+from collections.abc import Collection
+from dataclasses import dataclass
+from threading import Lock
+
+from timothy.core._exceptions import PipelineConfigError
+from timothy.core._pipelinestage import PipelineStage, PipelineStageSet
+from timothy.core._pipelinestorage import DeletablePipelineStorage, PipelineStorage
+
+
+@dataclass(frozen=True)
+class StorageAccess:
+    names: tuple[str, ...]
+    seconds: float
+    nbytes: int | None = None
+    raw_nbytes: int | None = None
+
+
+@dataclass(frozen=True)
+class StageTiming:
+    stage_name: str
+    started_at: float
+    ended_at: float
+    compute_seconds: float = 0.0
+    cpu_seconds: float | None = None
+    fetch: StorageAccess | None = None
+    store: StorageAccess | None = None
+    cached: bool = False
+
+    @property
+    def wall_seconds(self) -> float:
+        return self.ended_at - self.started_at
+
+
+class PipelineHooks:
+    def on_run_start(self, stages: PipelineStageSet, storage: PipelineStorage) -> None: ...
+    def on_stage_start(self, stage: PipelineStage) -> None: ...
+    def on_fetch(self, stage: PipelineStage, access: StorageAccess) -> None: ...
+    def on_store(self, stage: PipelineStage, access: StorageAccess) -> None: ...
+    def on_stage_end(self, stage: PipelineStage, timing: StageTiming) -> None: ...
+    def on_run_end(self) -> None: ...
+
+
+class ConsumerCountingEvictor(PipelineHooks):
+    def __init__(self, keep: Collection[str] = ()) -> None:
+        self._keep = frozenset(keep)
+        self._remaining_consumers: Counter[str] = Counter()
+        self._maybe_storage: DeletablePipelineStorage | None = None
+        self._lock = Lock()
+
+    @property
+    def keep(self) -> frozenset[str]:
+        return self._keep
+
+    def on_run_start(self, stages: PipelineStageSet, storage: PipelineStorage) -> None:
+        returns = stages.returns
+        self._remaining_consumers = Counter(
+            param_name
+            for stage in stages
+            for param_name in stage.params
+            if param_name in returns and param_name not in self._keep
+        )
+        if self._remaining_consumers and not isinstance(storage, DeletablePipelineStorage):
+            msg = f"Cannot evict intermediates from storage {storage!r} that cannot delete objects"
+            raise PipelineConfigError(msg)
+        self._maybe_storage = storage if isinstance(storage, DeletablePipelineStorage) else None
+
+    def on_stage_end(self, stage: PipelineStage, timing: StageTiming) -> None:
+        del timing
+        released: list[str] = []
+        with self._lock:
+            for param_name in stage.params:
+                if param_name not in self._remaining_consumers:
+                    continue
+                self._remaining_consumers[param_name] -= 1
+                if self._remaining_consumers[param_name] == 0:
+                    del self._remaining_consumers[param_name]
+                    released.append(param_name)
+        if released and self._maybe_storage is not None:
+            self._maybe_storage.delete_many(*released)
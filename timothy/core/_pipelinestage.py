@@ -1,11 +1,28 @@
+import asyncio
+import os
 from collections import Counter, defaultdict
-from collections.abc import Collection, Iterator, Mapping, Sequence
-from inspect import signature
-from itertools import chain
+from collections.abc import (
+    Awaitable,
+    Callable,
+    Collection,
+    Coroutine,
+    Iterable,
+    Iterator,
+    Mapping,
+    Sequence,
+)
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
+from functools import cached_property
+from graphlib import CycleError, TopologicalSorter
+from inspect import iscoroutinefunction, isgeneratorfunction, signature
+from itertools import chain, pairwise
+from types import MappingProxyType
 from typing import Any, Self, TypeVar, cast, overload
 
 from timothy.core._exceptions import (
     CannotCallStageError,
+    CannotRunPipelineError,
     DuplicateReturnError,
     DuplicateStageError,
     InvalidParamsError,
@@ -16,14 +33,22 @@ from timothy.core._typedefs import Obj, StageFunction
 
 T = TypeVar("T")
 
+CombineFunction = Callable[[list[Any]], Any]
+
 
 class PipelineStage:
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         func: StageFunction,
         returns: Sequence[str],
         name: str | None = None,
         params: Sequence[str] | None = None,
+        *,
+        run_in_process: bool | None = None,
+        map_over: str | None = None,
+        partitions: int | None = None,
+        combine: CombineFunction | None = None,
+        streaming: bool = False,
     ) -> None:
         self._func = func
         self._name = name if name is not None else self._func.__name__
@@ -38,6 +63,27 @@ class PipelineStage:
             self._params = list(params)
 
         self._returns = list(returns)
+        self._run_in_process = run_in_process
+
+        if map_over is not None and map_over not in self._params:
+            msg = f"Stage '{self._name}' cannot map over {map_over!r}, which is not a param."
+            raise InvalidParamsError(msg)
+        if map_over is None and (partitions is not None or combine is not None):
+            msg = f"Stage '{self._name}' sets partitions or combine without map_over."
+            raise InvalidParamsError(msg)
+        if map_over is not None and combine is None:
+            msg = f"Stage '{self._name}' maps over {map_over!r} but does not set combine."
+            raise InvalidParamsError(msg)
+        if map_over is not None and streaming:
+            msg = f"Stage '{self._name}' cannot both map over {map_over!r} and stream its params."
+            raise InvalidParamsError(msg)
+        if partitions is not None and partitions < 1:
+            msg = f"Stage '{self._name}' needs at least one partition, not {partitions}."
+            raise InvalidParamsError(msg)
+        self._map_over = map_over
+        self._partitions = partitions if partitions is not None else os.cpu_count() or 1
+        self._combine = combine
+        self._streaming = streaming
 
     @property
     def name(self) -> str:
@@ -55,13 +101,102 @@ class PipelineStage:
     def returns(self) -> list[str]:
         return self._returns
 
+    @property
+    def run_in_process(self) -> bool | None:
+        return self._run_in_process
+
+    @property
+    def map_over(self) -> str | None:
+        return self._map_over
+
+    @property
+    def partitions(self) -> int:
+        return self._partitions
+
+    @property
+    def combine(self) -> CombineFunction | None:
+        return self._combine
+
+    @property
+    def streaming(self) -> bool:
+        return self._streaming
+
+    @property
+    def is_async(self) -> bool:
+        return iscoroutinefunction(self._func)
+
+    @property
+    def is_generator(self) -> bool:
+        single_return = len(self._returns) == 1
+        return isgeneratorfunction(self._func) and self._map_over is None and single_return
+
+    def with_prefix(self, prefix: str) -> Self:
+        stage = copy(self)
+        stage._params = [prefix + name for name in self._params]  # noqa: SLF001
+        stage._returns = [prefix + name for name in self._returns]  # noqa: SLF001
+        if self._map_over is not None:
+            stage._map_over = prefix + self._map_over  # noqa: SLF001
+        return stage
+
     def call(self, param_objs: Sequence[Obj]) -> Sequence[Obj]:
+        self._ensure_valid_param_objs(param_objs)
+
+        if self._map_over is not None:
+            return self.gather([self.call_partition(p) for p in self.split(param_objs)])
+        if self.is_async:
+            return self._ensure_valid_results(_run_coroutine(self._await_func(param_objs)))
+        return self._ensure_valid_results(self.func(*param_objs))
+
+    async def acall(self, param_objs: Sequence[Obj]) -> Sequence[Obj]:
+        self._ensure_valid_param_objs(param_objs)
+
+        if self._map_over is not None and self.is_async:
+            partitions = self.split(param_objs)
+            return self.gather(list(await asyncio.gather(*map(self._await_func, partitions))))
+        if self._map_over is not None:
+            return self.gather([self.call_partition(p) for p in self.split(param_objs)])
+        if self.is_async:
+            return self._ensure_valid_results(await self._await_func(param_objs))
+        return self._ensure_valid_results(self.func(*param_objs))
+
+    def split(self, param_objs: Sequence[Obj]) -> list[Sequence[Obj]]:
+        if self._map_over is None:
+            return [param_objs]
+        self._ensure_valid_param_objs(param_objs)
+
+        index = self._params.index(self._map_over)
+        mapped = param_objs[index]
+        if not isinstance(mapped, Iterable) or isinstance(mapped, str | Mapping):
+            msg = f"Stage '{self.name}' cannot map over {self._map_over!r} of type {type(mapped)}."
+            raise CannotCallStageError(msg)
+        items = mapped if isinstance(mapped, Sequence) else list(mapped)
+        n_partitions = max(1, min(self._partitions, len(items)))
+        size, extra = divmod(len(items), n_partitions)
+        bounds = [i * size + min(i, extra) for i in range(n_partitions + 1)]
+        return [
+            [*param_objs[:index], items[start:end], *param_objs[index + 1 :]]
+            for start, end in pairwise(bounds)
+        ]
+
+    def call_partition(self, param_objs: Sequence[Obj]) -> Any:
+        if self.is_async:
+            return _run_coroutine(self._await_func(param_objs))
+        return self.func(*param_objs)
+
+    def gather(self, partition_results: list[Any]) -> Sequence[Obj]:
+        if self._combine is None:
+            msg = f"Stage '{self.name}' does not map over a param."
+            raise CannotCallStageError(msg)
+        return self._ensure_valid_results(self._combine(partition_results))
+
+    async def _await_func(self, param_objs: Sequence[Obj]) -> Any:
+        return await cast(Awaitable[Any], self.func(*param_objs))
+
+    def _ensure_valid_param_objs(self, param_objs: Sequence[Obj]) -> None:
         if (n_param_objs := len(param_objs)) != (n_params := len(self._params)):
             msg = f"Stage '{self.name}' has {n_params} param(s) but called with {n_param_objs}."
             raise CannotCallStageError(msg)
 
-        return self._ensure_valid_results(self.func(*param_objs))
-
     def _ensure_valid_results(self, raw_result: T | list[Any]) -> T | list[Any]:
         if raw_result is None:
             result: Any = self._validate_returns_none(raw_result)
@@ -102,18 +237,55 @@ class PipelineStage:
         return return_value
 
 
+def _run_coroutine(coro: Coroutine[Any, Any, T]) -> T:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="timothy-async") as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+def concatenate(partition_results: list[Any]) -> list[Any]:
+    return list(chain.from_iterable(partition_results))
+
+
 class PipelineStageSet:
     def __init__(self, *stages: PipelineStage) -> None:
-        name_counts = Counter(p.name for p in stages)
-        if duplicate_names := tuple(name for name, count in name_counts.items() if count > 1):
-            msg = f"Pipeline stage names {duplicate_names} appear more than once."
+        self._stages: dict[str, PipelineStage] = {}
+        self._returns: dict[str, PipelineStage] = {}
+        for stage in stages:
+            self.add(stage)
+
+    @classmethod
+    def _from_valid_stages(cls, stages: Iterable[PipelineStage]) -> Self:
+        stage_set = cls()
+        for stage in stages:
+            stage_set._stages[stage.name] = stage  # noqa: SLF001
+            stage_set._returns.update(dict.fromkeys(stage.returns, stage))  # noqa: SLF001
+        return stage_set
+
+    def add(self, stage: PipelineStage) -> None:
+        if stage.name in self._stages:
+            msg = f"Pipeline stage names {(stage.name,)} appear more than once."
             raise DuplicateStageError(msg)
-        return_counts = Counter(chain(*(p.returns for p in stages)))
-        if duplicate_returns := tuple(name for name, count in return_counts.items() if count > 1):
+        return_counts = Counter(stage.returns)
+        if duplicate_returns := tuple(
+            name for name, count in return_counts.items() if count > 1 or name in self._returns
+        ):
             msg = f"Objects {duplicate_returns} should not be returned by multiple stages."
             raise DuplicateReturnError(msg)
 
-        self._stages: dict[str, PipelineStage] = {s.name: s for s in stages}
+        self._stages[stage.name] = stage
+        self._returns.update(dict.fromkeys(stage.returns, stage))
+        for derived in ("params", "plan"):
+            self.__dict__.pop(derived, None)
+
+    def copy(self) -> Self:
+        return self._from_valid_stages(self._stages.values())
+
+    def with_prefix(self, prefix: str) -> Self:
+        return self._from_valid_stages(stage.with_prefix(prefix) for stage in self)
 
     def names(self) -> Iterator[str]:
         yield from self._stages.keys()
@@ -121,8 +293,13 @@ class PipelineStageSet:
     def __iter__(self) -> Iterator[PipelineStage]:
         yield from self._stages.values()
 
+    def __len__(self) -> int:
+        return len(self._stages)
+
     def __add__(self, other: PipelineStage) -> Self:
-        return self.__class__(*self._stages.values(), other)
+        stage_set = self.copy()
+        stage_set.add(other)
+        return stage_set
 
     @overload
     def __getitem__(self, names: str) -> PipelineStage: ...
@@ -134,23 +311,132 @@ class PipelineStageSet:
         if isinstance(names, str):
             for first in self[[names]]:
                 return first
-        if missing_stages := tuple(set(names) - set(self.names())):
+        if missing_stages := tuple(n for n in names if n not in self._stages):
             msg = f"No such pipeline stages {missing_stages}."
             raise MissingPipelineStageError(msg)
-        return self.__class__(*(self._stages[n] for n in names))
+        return self._from_valid_stages(self._stages[n] for n in names)
 
     @property
     def returns(self) -> Mapping[str, PipelineStage]:
-        returns: dict[str, PipelineStage] = {}
-        for stage in self._stages.values():
-            for return_name in stage.returns:
-                returns[return_name] = stage
-        return returns
+        return MappingProxyType(self._returns)
 
-    @property
+    @cached_property
     def params(self) -> Mapping[str, Collection[PipelineStage]]:
         params: dict[str, set[PipelineStage]] = defaultdict(set)
         for stage in self._stages.values():
             for param_name in stage.params:
                 params[param_name].add(stage)
-        return params
+        return MappingProxyType({name: frozenset(stages) for name, stages in params.items()})
+
+    @cached_property
+    def plan(self) -> "PipelineStagePlan":
+        return PipelineStagePlan(self)
+
+    def required(self, targets: Iterable[str], available: Collection[str] = ()) -> Self:
+        targets = list(targets)
+        returns = self.returns
+        available = set(available)
+        if missing_targets := tuple(t for t in targets if t not in returns and t not in available):
+            msg = f"Objects {missing_targets} are not returned by any stage and are not available."
+            raise MissingPipelineStageError(msg)
+
+        required_names: set[str] = set()
+        seen: set[str] = set()
+        pending = list(targets)
+        while pending:
+            if (name := pending.pop()) in seen or name in available:
+                continue
+            seen.add(name)
+            if (stage := returns.get(name)) is not None and stage.name not in required_names:
+                required_names.add(stage.name)
+                pending.extend(stage.params)
+
+        return self._from_valid_stages(s for s in self._stages.values() if s.name in required_names)
+
+    def unfinished(self, available: Collection[str]) -> Self:
+        available = set(available)
+        return self._with_downstream(
+            s for s in self._stages.values() if not s.returns or not available.issuperset(s.returns)
+        )
+
+    def downstream(self, names: Iterable[str]) -> Self:
+        consumers = self.params
+        return self._with_downstream(stage for n in names for stage in consumers.get(n, ()))
+
+    def _with_downstream(self, stages: Iterable[PipelineStage]) -> Self:
+        consumers = self.params
+        downstream_names: set[str] = set()
+        pending = list(stages)
+        while pending:
+            if (stage := pending.pop()).name in downstream_names:
+                continue
+            downstream_names.add(stage.name)
+            for return_name in stage.returns:
+                pending.extend(consumers.get(return_name, ()))
+
+        return self._from_valid_stages(
+            s for s in self._stages.values() if s.name in downstream_names
+        )
+
+
+class PipelineStagePlan:
+    def __init__(self, stages: PipelineStageSet) -> None:
+        producers = MappingProxyType(dict(stages.returns))
+        self._stages: Mapping[str, PipelineStage] = MappingProxyType({s.name: s for s in stages})
+        self._producers = producers
+        self._consumers = stages.params
+        self._dependencies: Mapping[str, tuple[str, ...]] = MappingProxyType(
+            {
+                stage.name: tuple(
+                    dict.fromkeys(pred.name for pn in stage.params if (pred := producers.get(pn))),
+                )
+                for stage in stages
+            },
+        )
+
+        dag = self._unprepared_sorter()
+        try:
+            dag.prepare()
+        except CycleError as e:
+            msg = "Cycle detected in pipeline stage dependency graph."
+            raise CannotRunPipelineError(msg) from e
+
+        levels: list[tuple[str, ...]] = []
+        while dag.is_active():
+            level = cast(tuple[str, ...], dag.get_ready())
+            levels.append(level)
+            dag.done(*level)
+        self._levels = tuple(levels)
+        self._order = tuple(chain.from_iterable(levels))
+
+    @property
+    def stages(self) -> Mapping[str, PipelineStage]:
+        return self._stages
+
+    @property
+    def producers(self) -> Mapping[str, PipelineStage]:
+        return self._producers
+
+    @property
+    def consumers(self) -> Mapping[str, Collection[PipelineStage]]:
+        return self._consumers
+
+    @property
+    def dependencies(self) -> Mapping[str, tuple[str, ...]]:
+        return self._dependencies
+
+    @property
+    def order(self) -> tuple[str, ...]:
+        return self._order
+
+    @property
+    def levels(self) -> tuple[tuple[str, ...], ...]:
+        return self._levels
+
+    def sorter(self) -> TopologicalSorter[str]:
+        dag = self._unprepared_sorter()
+        dag.prepare()
+        return dag
+
+    def _unprepared_sorter(self) -> TopologicalSorter[str]:
+        return TopologicalSorter(self._dependencies)
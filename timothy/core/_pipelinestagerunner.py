@@ -1,8 +1,31 @@
-from typing import Protocol
+from collections.abc import Sequence
+from typing import Protocol, runtime_checkable
 
+from timothy.core._pipelinehooks import PipelineHooks
 from timothy.core._pipelinestage import PipelineStageSet
 from timothy.core._pipelinestorage import PipelineStorage
 
 
 class PipelineStageRunner(Protocol):
     def __call__(self, stages: PipelineStageSet, storage: PipelineStorage) -> None: ...
+
+
+class HookedPipelineStageRunner(PipelineStageRunner, Protocol):
+    def __call__(
+        self,
+        stages: PipelineStageSet,
+        storage: PipelineStorage,
+        *,
+        hooks: Sequence[PipelineHooks] = (),
+    ) -> None: ...
+
+
+@runtime_checkable
+class AsyncPipelineStageRunner(HookedPipelineStageRunner, Protocol):
+    async def arun(
+        self,
+        stages: PipelineStageSet,
+        storage: PipelineStorage,
+        *,
+        hooks: Sequence[PipelineHooks] = (),
+    ) -> None: ...
@@ -1,5 +1,5 @@
 from collections.abc import Sequence
-from typing import Protocol
+from typing import Protocol, runtime_checkable
 
 from timothy.core._typedefs import Obj
 
@@ -10,3 +10,29 @@ class PipelineStorage(Protocol):
     def store_one(self, name: str, obj: Obj) -> None: ...
     def store_many(self, **name_to_obj_map: Obj) -> None: ...
     def list_names(self) -> Sequence[str]: ...
+
+
+@runtime_checkable
+class DeletablePipelineStorage(PipelineStorage, Protocol):
+    def delete_one(self, name: str) -> None: ...
+    def delete_many(self, *names: str) -> None: ...
+
+
+@runtime_checkable
+class SizedPipelineStorage(PipelineStorage, Protocol):
+    def nbytes(self, *names: str) -> int | None: ...
+
+
+@runtime_checkable
+class CompressedPipelineStorage(SizedPipelineStorage, Protocol):
+    def raw_nbytes(self, *names: str) -> int | None: ...
+
+
+@runtime_checkable
+class LazyPipelineStorage(PipelineStorage, Protocol):
+    def stores_lazily(self, name: str) -> bool: ...
+
+
+@runtime_checkable
+class NamespaceAwarePipelineStorage(PipelineStorage, Protocol):
+    def add_namespace(self, namespace: str) -> None: ...
@@ -0,0 +1,149 @@
+from collections.abc import Sequence
+from dataclasses import replace
+from typing import Any, cast
+
+from timothy.core._exceptions import PipelineConfigError
+from timothy.core._pipelinehooks import PipelineHooks, StageTiming, StorageAccess
+from timothy.core._pipelinestage import PipelineStage, PipelineStageSet
+from timothy.core._pipelinestorage import (
+    DeletablePipelineStorage,
+    LazyPipelineStorage,
+    NamespaceAwarePipelineStorage,
+    PipelineStorage,
+    SizedPipelineStorage,
+)
+from timothy.core._typedefs import Obj
+
+_PATH_SEPARATORS = ("/", "\\")
+
+
+class NamespacedPipelineStorage:
+    separator = "."
+
+    def __new__(cls, *args: Any, **kwargs: Any) -> "NamespacedPipelineStorage":
+        inner = args[0] if args else kwargs.get("inner")
+        if cls is NamespacedPipelineStorage:
+            hooked = isinstance(inner, PipelineHooks)
+            deletable = isinstance(inner, DeletablePipelineStorage)
+            return super().__new__(_NAMESPACED_STORAGE_TYPES[hooked, deletable])
+        return super().__new__(cls)
+
+    def __init__(self, inner: PipelineStorage, namespace: str) -> None:
+        if (
+            not namespace
+            or self.separator in namespace
+            or any(separator in namespace for separator in _PATH_SEPARATORS)
+        ):
+            msg = (
+                f"Namespace must be non-empty and must not contain {self.separator!r} "
+                f"or a path separator, not {namespace!r}"
+            )
+            raise PipelineConfigError(msg)
+        self._inner = inner
+        self._namespace = namespace
+        self._prefix = f"{namespace}{self.separator}"
+        if isinstance(inner, NamespaceAwarePipelineStorage):
+            inner.add_namespace(namespace)
+
+    @property
+    def inner(self) -> PipelineStorage:
+        return self._inner
+
+    @property
+    def namespace(self) -> str:
+        return self._namespace
+
+    def fetch_one(self, name: str) -> Obj:
+        return self._inner.fetch_one(self._prefix + name)
+
+    def fetch_many(self, *names: str) -> Sequence[Obj]:
+        return self._inner.fetch_many(*(self._prefix + name for name in names))
+
+    def store_one(self, name: str, obj: Obj) -> None:
+        self._inner.store_one(self._prefix + name, obj)
+
+    def store_many(self, **name_to_obj_map: Obj) -> None:
+        self._inner.store_many(**{self._prefix + n: obj for n, obj in name_to_obj_map.items()})
+
+    def list_names(self) -> Sequence[str]:
+        prefix_length = len(self._prefix)
+        return [n[prefix_length:] for n in self._inner.list_names() if n.startswith(self._prefix)]
+
+    def nbytes(self, *names: str) -> int | None:
+        if not isinstance(self._inner, SizedPipelineStorage):
+            return None
+        return self._inner.nbytes(*(self._prefix + name for name in names))
+
+    def stores_lazily(self, name: str) -> bool:
+        if not isinstance(self._inner, LazyPipelineStorage):
+            return False
+        return self._inner.stores_lazily(self._prefix + name)
+
+    def add_namespace(self, namespace: str) -> None:
+        if isinstance(self._inner, NamespaceAwarePipelineStorage):
+            self._inner.add_namespace(self._prefix + namespace)
+
+
+class _DeletableNamespacedPipelineStorage(NamespacedPipelineStorage):
+    def delete_one(self, name: str) -> None:
+        self.delete_many(name)
+
+    def delete_many(self, *names: str) -> None:
+        inner = cast(DeletablePipelineStorage, self._inner)
+        inner.delete_many(*(self._prefix + name for name in names))
+
+
+class _HookedNamespacedPipelineStorage(NamespacedPipelineStorage, PipelineHooks):
+    def __init__(self, inner: PipelineStorage, namespace: str) -> None:
+        super().__init__(inner, namespace)
+        self._inner_hooks = cast(PipelineHooks, inner)
+        self._prefixed_stages: dict[str, PipelineStage] = {}
+
+    def on_run_start(self, stages: PipelineStageSet, storage: PipelineStorage) -> None:
+        del storage
+        prefixed = stages.with_prefix(self._prefix)
+        self._prefixed_stages = {stage.name: stage for stage in prefixed}
+        self._inner_hooks.on_run_start(prefixed, self._inner)
+
+    def on_stage_start(self, stage: PipelineStage) -> None:
+        self._inner_hooks.on_stage_start(self._prefixed_stage(stage))
+
+    def on_fetch(self, stage: PipelineStage, access: StorageAccess) -> None:
+        self._inner_hooks.on_fetch(self._prefixed_stage(stage), self._prefixed_access(access))
+
+    def on_store(self, stage: PipelineStage, access: StorageAccess) -> None:
+        self._inner_hooks.on_store(self._prefixed_stage(stage), self._prefixed_access(access))
+
+    def on_stage_end(self, stage: PipelineStage, timing: StageTiming) -> None:
+        timing = replace(
+            timing,
+            fetch=timing.fetch and self._prefixed_access(timing.fetch),
+            store=timing.store and self._prefixed_access(timing.store),
+        )
+        self._inner_hooks.on_stage_end(self._prefixed_stage(stage), timing)
+
+    def on_run_end(self) -> None:
+        self._prefixed_stages = {}
+        self._inner_hooks.on_run_end()
+
+    def _prefixed_stage(self, stage: PipelineStage) -> PipelineStage:
+        if (prefixed := self._prefixed_stages.get(stage.name)) is not None:
+            return prefixed
+        return stage.with_prefix(self._prefix)
+
+    def _prefixed_access(self, access: StorageAccess) -> StorageAccess:
+        return replace(access, names=tuple(self._prefix + name for name in access.names))
+
+
+class _HookedDeletableNamespacedPipelineStorage(
+    _HookedNamespacedPipelineStorage,
+    _DeletableNamespacedPipelineStorage,
+): ...
+
+
+_NAMESPACED_STORAGE_TYPES: dict[tuple[bool, bool], type[NamespacedPipelineStorage]] = {
+    (False, False): NamespacedPipelineStorage,
+    (False, True): _DeletableNamespacedPipelineStorage,
+    (True, False): _HookedNamespacedPipelineStorage,
+    (True, True): _HookedDeletableNamespacedPipelineStorage,
+}
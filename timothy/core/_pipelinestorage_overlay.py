@@ -0,0 +1,131 @@
+from collections.abc import Sequence
+from threading import Lock
+from typing import Any, cast
+
+from timothy.core._pipelinehooks import PipelineHooks, StageTiming, StorageAccess
+from timothy.core._pipelinestage import PipelineStage, PipelineStageSet
+from timothy.core._pipelinestorage import (
+    DeletablePipelineStorage,
+    LazyPipelineStorage,
+    PipelineStorage,
+    SizedPipelineStorage,
+)
+from timothy.core._typedefs import Obj
+
+
+class OverlayPipelineStorage:
+    def __new__(cls, *args: Any, **kwargs: Any) -> "OverlayPipelineStorage":
+        top = args[0] if args else kwargs.get("top")
+        if cls is OverlayPipelineStorage:
+            hooked = isinstance(top, PipelineHooks)
+            deletable = isinstance(top, DeletablePipelineStorage)
+            return super().__new__(_OVERLAY_STORAGE_TYPES[hooked, deletable])
+        return super().__new__(cls)
+
+    def __init__(self, top: PipelineStorage, base: PipelineStorage) -> None:
+        self._top = top
+        self._base = base
+        self._top_names: set[str] = set()
+        self._lock = Lock()
+
+    @property
+    def top(self) -> PipelineStorage:
+        return self._top
+
+    @property
+    def base(self) -> PipelineStorage:
+        return self._base
+
+    def fetch_one(self, name: str) -> Obj:
+        return self.fetch_many(name)[0]
+
+    def fetch_many(self, *names: str) -> Sequence[Obj]:
+        with self._lock:
+            in_top = [name for name in names if name in self._top_names]
+            in_base = [name for name in names if name not in self._top_names]
+        found = dict(zip(in_top, self._top.fetch_many(*in_top), strict=True)) if in_top else {}
+        if in_base:
+            found.update(zip(in_base, self._base.fetch_many(*in_base), strict=True))
+        return [found[name] for name in names]
+
+    def store_one(self, name: str, obj: Obj) -> None:
+        self.store_many(**{name: obj})
+
+    def store_many(self, **name_to_obj_map: Obj) -> None:
+        self._top.store_many(**name_to_obj_map)
+        with self._lock:
+            self._top_names.update(name_to_obj_map)
+
+    def list_names(self) -> Sequence[str]:
+        with self._lock:
+            top_names = set(self._top_names)
+        return sorted(top_names.union(self._base.list_names()))
+
+    def nbytes(self, *names: str) -> int | None:
+        with self._lock:
+            in_top = [name for name in names if name in self._top_names]
+            in_base = [name for name in names if name not in self._top_names]
+        total = 0
+        for storage, storage_names in ((self._top, in_top), (self._base, in_base)):
+            if not storage_names:
+                continue
+            if not isinstance(storage, SizedPipelineStorage):
+                return None
+            if (nbytes := storage.nbytes(*storage_names)) is None:
+                return None
+            total += nbytes
+        return total
+
+    def stores_lazily(self, name: str) -> bool:
+        if not isinstance(self._top, LazyPipelineStorage):
+            return False
+        return self._top.stores_lazily(name)
+
+
+class _DeletableOverlayPipelineStorage(OverlayPipelineStorage):
+    def delete_one(self, name: str) -> None:
+        self.delete_many(name)
+
+    def delete_many(self, *names: str) -> None:
+        cast(DeletablePipelineStorage, self._top).delete_many(*names)
+        with self._lock:
+            self._top_names.difference_update(names)
+
+
+class _HookedOverlayPipelineStorage(OverlayPipelineStorage, PipelineHooks):
+    def __init__(self, top: PipelineStorage, base: PipelineStorage) -> None:
+        super().__init__(top, base)
+        self._top_hooks = cast(PipelineHooks, top)
+
+    def on_run_start(self, stages: PipelineStageSet, storage: PipelineStorage) -> None:
+        del storage
+        self._top_hooks.on_run_start(stages, self._top)
+
+    def on_stage_start(self, stage: PipelineStage) -> None:
+        self._top_hooks.on_stage_start(stage)
+
+    def on_fetch(self, stage: PipelineStage, access: StorageAccess) -> None:
+        self._top_hooks.on_fetch(stage, access)
+
+    def on_store(self, stage: PipelineStage, access: StorageAccess) -> None:
+        self._top_hooks.on_store(stage, access)
+
+    def on_stage_end(self, stage: PipelineStage, timing: StageTiming) -> None:
+        self._top_hooks.on_stage_end(stage, timing)
+
+    def on_run_end(self) -> None:
+        self._top_hooks.on_run_end()
+
+
+class _HookedDeletableOverlayPipelineStorage(
+    _HookedOverlayPipelineStorage,
+    _DeletableOverlayPipelineStorage,
+): ...
+
+
+_OVERLAY_STORAGE_TYPES: dict[tuple[bool, bool], type[OverlayPipelineStorage]] = {
+    (False, False): OverlayPipelineStorage,
+    (False, True): _DeletableOverlayPipelineStorage,
+    (True, False): _HookedOverlayPipelineStorage,
+    (True, True): _HookedDeletableOverlayPipelineStorage,
+}
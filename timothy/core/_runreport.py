@@ -0,0 +1,78 @@
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from threading import Lock
+from time import perf_counter
+from types import MappingProxyType
+
+from timothy.core._pipelinehooks import PipelineHooks, StageTiming
+from timothy.core._pipelinestage import PipelineStage, PipelineStageSet
+from timothy.core._pipelinestorage import PipelineStorage
+
+
+@dataclass(frozen=True)
+class RunReport:
+    stages: Mapping[str, StageTiming] = field(default_factory=dict)
+    wall_seconds: float = 0.0
+    critical_path: tuple[str, ...] = ()
+
+    @property
+    def critical_path_seconds(self) -> float:
+        return sum(self.stages[name].wall_seconds for name in self.critical_path)
+
+
+class RunReportCollector(PipelineHooks):
+    def __init__(self) -> None:
+        self._timings: dict[str, StageTiming] = {}
+        self._dependencies: Mapping[str, tuple[str, ...]] = {}
+        self._order: tuple[str, ...] = ()
+        self._started_at = self._ended_at = perf_counter()
+        self._lock = Lock()
+
+    def on_run_start(self, stages: PipelineStageSet, storage: PipelineStorage) -> None:
+        del storage
+        self._dependencies = stages.plan.dependencies
+        self._order = stages.plan.order
+        self._started_at = self._ended_at = perf_counter()
+
+    def on_stage_end(self, stage: PipelineStage, timing: StageTiming) -> None:
+        with self._lock:
+            self._timings[stage.name] = timing
+
+    def on_run_end(self) -> None:
+        self._ended_at = perf_counter()
+
+    @property
+    def report(self) -> RunReport:
+        with self._lock:
+            timings = dict(self._timings)
+        return RunReport(
+            stages=MappingProxyType(timings),
+            wall_seconds=self._ended_at - self._started_at,
+            critical_path=self._critical_path(timings),
+        )
+
+    def _critical_path(self, timings: Mapping[str, StageTiming]) -> tuple[str, ...]:
+        path_seconds: dict[str, float] = {}
+        path_predecessor: dict[str, str | None] = {}
+        for name in self._order:
+            if name not in timings:
+                continue
+            predecessors = [d for d in self._dependencies.get(name, ()) if d in path_seconds]
+            predecessor = max(predecessors, key=path_seconds.__getitem__, default=None)
+            before = path_seconds[predecessor] if predecessor is not None else 0.0
+            path_seconds[name] = before + timings[name].wall_seconds
+            path_predecessor[name] = predecessor
+
+        path: list[str] = []
+        maybe_name = max(path_seconds, key=path_seconds.__getitem__, default=None)
+        while maybe_name is not None:
+            path.append(maybe_name)
+            maybe_name = path_predecessor[maybe_name]
+        return tuple(reversed(path))
+
+
+@dataclass(frozen=True)
+class BatchRunReport:
+    shared: RunReport = field(default_factory=RunReport)
+    runs: Mapping[str, RunReport] = field(default_factory=dict)
+    wall_seconds: float = 0.0
@@ -5,6 +5,8 @@ from timothy.core._exceptions import (
     DuplicateReturnError,
     PipelineConfigError,
     PipelineError,
+    StaleRowStreamError,
+    UnpicklableStageError,
 )
 
 __all__ = [
@@ -12,4 +14,6 @@ __all__ = [
     "CannotRunPipelineError",
     "PipelineConfigError",
     "DuplicateReturnError",
+    "UnpicklableStageError",
+    "StaleRowStreamError",
 ]